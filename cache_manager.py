@@ -1,11 +1,24 @@
 """
 キャッシュ管理モジュール
 Notionデータ取得の結果をキャッシュして、同じ条件での再取得を高速化する
+（notion_api は部署1つずつの結果を保存し、複数の部署の選択はそれらを組み合わせて返す）
+
+有効期限が切れた後も CACHE_STALE_TTL の間は「古いデータ」として返せるようにし、
+呼び出し側がバックグラウンドで再取得している間の表示に使う（stale-while-revalidate）。
+
+キャッシュは概算のバイト数が AppConstants.NOTION_CACHE_MAX_BYTES を超えないよう、
+最近使っていない順（LRU）に削除する。古いデータとしても使えなくなったものは
+バックグラウンドのスレッドが定期的に削除する。
 """
 import hashlib
 import json
+import sys
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import config
 import logger_config
 
 logger = logger_config.get_logger(__name__)
@@ -13,8 +26,30 @@ logger = logger_config.get_logger(__name__)
 # キャッシュの有効期限（秒）
 CACHE_TTL = 300  # 5分
 
-# メモリキャッシュ
-_cache: Dict[str, Dict[str, Any]] = {}
+# 有効期限が切れた後、再取得中の表示用に古いデータを残しておく期間（秒）
+CACHE_STALE_TTL = 3600  # 1時間
+
+# メモリキャッシュ（先頭が最も長く使われていないもの）
+_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = threading.Lock()
+
+# 統計情報（clear_cache でリセットする）
+_stats: Dict[str, int] = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+_total_bytes = 0
+
+# 期限切れのキャッシュを削除するスレッド
+_sweeper: Optional[threading.Thread] = None
+
+# バックグラウンドで再取得中のキャッシュキー（同じ部署の再取得を重ねないため）
+_revalidating: set = set()
+_revalidating_changed = threading.Condition()
+
+
+class CacheLookup(NamedTuple):
+    """キャッシュの検索結果"""
+    data: Dict[str, Any]
+    age: float    # 保存してからの経過秒数
+    stale: bool   # 有効期限が切れているか
 
 
 def _generate_cache_key(department_names: Optional[List[str]]) -> str:
@@ -36,32 +71,164 @@ def _generate_cache_key(department_names: Optional[List[str]]) -> str:
     return hashlib.md5(key_data.encode('utf-8')).hexdigest()
 
 
-def get_cached_data(department_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+def _estimate_size(data: Any) -> int:
     """
-    キャッシュからデータを取得する
+    データのおおよそのメモリ使用量（バイト）を求める
+
+    同じオブジェクトを複数箇所から参照している場合（all_orders と orders_by_supplier など）は1回だけ数える。
+    """
+    seen = set()
+    stack = [data]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+
+def _remove(cache_key: str) -> None:
+    """キャッシュから1件削除する（_lock を取得した状態で呼ぶ）"""
+    global _total_bytes
+    cached_item = _cache.pop(cache_key, None)
+    if cached_item is not None:
+        _total_bytes -= cached_item['size']
+
+
+def _evict(max_bytes: int) -> None:
+    """上限を超えている間、最近使っていない順に削除する（_lock を取得した状態で呼ぶ）"""
+    while _cache and _total_bytes > max_bytes:
+        cache_key = next(iter(_cache))
+        _remove(cache_key)
+        _stats['evictions'] += 1
+        logger.debug(f"キャッシュの上限を超えたため削除: {cache_key}")
+
+
+def sweep_expired(now: Optional[float] = None) -> int:
+    """
+    古いデータとしても使えなくなったキャッシュを削除する
+
+    Args:
+        now: 現在時刻（省略時は time.time()）
+
+    Returns:
+        削除した件数
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        expired_keys = [
+            cache_key for cache_key, cached_item in _cache.items()
+            if now - cached_item['timestamp'] > CACHE_TTL + CACHE_STALE_TTL
+        ]
+        for cache_key in expired_keys:
+            _remove(cache_key)
+        _stats['expirations'] += len(expired_keys)
+    if expired_keys:
+        logger.debug(f"期限切れのキャッシュを{len(expired_keys)}件削除しました")
+    return len(expired_keys)
+
+
+def _sweep_loop() -> None:
+    while True:
+        time.sleep(config.AppConstants.NOTION_CACHE_SWEEP_INTERVAL)
+        sweep_expired()
+
+
+def _ensure_sweeper() -> None:
+    """期限切れのキャッシュを削除するスレッドを必要になった時点で起動する"""
+    global _sweeper
+    with _lock:
+        if _sweeper is not None:
+            return
+        _sweeper = threading.Thread(target=_sweep_loop, name="NotionCacheSweeper", daemon=True)
+        _sweeper.start()
+
+
+def lookup_cached_data(department_names: Optional[List[str]]) -> Optional[CacheLookup]:
+    """
+    期限切れのデータも含めてキャッシュを検索する
     
     Args:
         department_names: 部署名のリスト
     
     Returns:
-        キャッシュされたデータ、またはNone（キャッシュなし/期限切れ）
+        検索結果、またはNone（キャッシュなし/古いデータとしても使えない）
     """
     cache_key = _generate_cache_key(department_names)
     
-    if cache_key not in _cache:
-        return None
+    with _lock:
+        cached_item = _cache.get(cache_key)
+        if cached_item is None:
+            _stats['misses'] += 1
+            return None
+        
+        age = time.time() - cached_item['timestamp']
+        if age > CACHE_TTL + CACHE_STALE_TTL:
+            logger.debug(f"キャッシュが期限切れです: {cache_key}")
+            _remove(cache_key)
+            _stats['expirations'] += 1
+            _stats['misses'] += 1
+            return None
+        
+        _cache.move_to_end(cache_key)
+        stale = age > CACHE_TTL
+        _stats['stale_hits' if stale else 'hits'] += 1
     
-    cached_item = _cache[cache_key]
-    current_time = time.time()
+    logger.debug(f"キャッシュからデータを取得: {cache_key}{' (期限切れ)' if stale else ''}")
+    return CacheLookup(cached_item['data'], age, stale)
+
+
+def get_cached_data(department_names: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    キャッシュからデータを取得する
     
-    # キャッシュの有効期限チェック
-    if current_time - cached_item['timestamp'] > CACHE_TTL:
-        logger.debug(f"キャッシュが期限切れです: {cache_key}")
-        del _cache[cache_key]
+    Args:
+        department_names: 部署名のリスト
+    
+    Returns:
+        キャッシュされたデータ、またはNone（キャッシュなし/期限切れ）
+    """
+    cached = lookup_cached_data(department_names)
+    if cached is None or cached.stale:
         return None
+    return cached.data
+
+
+def begin_revalidation(department_names: Optional[List[str]]) -> bool:
+    """
+    バックグラウンドでの再取得の開始を記録する
     
-    logger.debug(f"キャッシュからデータを取得: {cache_key}")
-    return cached_item['data']
+    Returns:
+        開始してよい場合はTrue（同じ条件で再取得中の場合はFalse）
+    """
+    cache_key = _generate_cache_key(department_names)
+    with _revalidating_changed:
+        if cache_key in _revalidating:
+            return False
+        _revalidating.add(cache_key)
+        return True
+
+
+def end_revalidation(department_names: Optional[List[str]]) -> None:
+    """バックグラウンドでの再取得の終了を記録する"""
+    with _revalidating_changed:
+        _revalidating.discard(_generate_cache_key(department_names))
+        _revalidating_changed.notify_all()
+
+
+def wait_for_revalidation(department_names: Optional[List[str]]) -> None:
+    """同じ条件のバックグラウンドでの再取得が終わるまで待つ"""
+    cache_key = _generate_cache_key(department_names)
+    with _revalidating_changed:
+        while cache_key in _revalidating:
+            _revalidating_changed.wait()
 
 
 def set_cached_data(department_names: Optional[List[str]], data: Dict[str, Any]) -> None:
@@ -72,19 +239,36 @@ def set_cached_data(department_names: Optional[List[str]], data: Dict[str, Any])
         department_names: 部署名のリスト
         data: キャッシュするデータ
     """
+    global _total_bytes
     cache_key = _generate_cache_key(department_names)
-    _cache[cache_key] = {
-        'data': data,
-        'timestamp': time.time()
-    }
-    logger.debug(f"データをキャッシュに保存: {cache_key}")
+    size = _estimate_size(data)
+    max_bytes = config.AppConstants.NOTION_CACHE_MAX_BYTES
+    with _lock:
+        _remove(cache_key)
+        if size > max_bytes:
+            logger.debug(f"キャッシュの上限を超えるため保存しません: {cache_key} ({size}バイト)")
+            return
+        _cache[cache_key] = {
+            'data': data,
+            'timestamp': time.time(),
+            'size': size,
+        }
+        _total_bytes += size
+        _evict(max_bytes)
+    logger.debug(f"データをキャッシュに保存: {cache_key} ({size}バイト)")
+    _ensure_sweeper()
 
 
 def clear_cache() -> None:
     """
-    キャッシュをクリアする
+    キャッシュと統計情報をクリアする
     """
-    _cache.clear()
+    global _total_bytes
+    with _lock:
+        _cache.clear()
+        _total_bytes = 0
+        for name in _stats:
+            _stats[name] = 0
     logger.info("キャッシュをクリアしました")
 
 
@@ -93,21 +277,26 @@ def get_cache_stats() -> Dict[str, Any]:
     キャッシュの統計情報を取得する
     
     Returns:
-        キャッシュの統計情報
+        キャッシュの統計情報（件数、概算のバイト数と上限、
+        hits/stale_hits/misses/evictions/expirations の回数）
     """
     current_time = time.time()
     valid_count = 0
     expired_count = 0
     
-    for item in _cache.values():
-        if current_time - item['timestamp'] <= CACHE_TTL:
-            valid_count += 1
-        else:
-            expired_count += 1
-    
-    return {
-        'total': len(_cache),
-        'valid': valid_count,
-        'expired': expired_count
-    }
+    with _lock:
+        for item in _cache.values():
+            if current_time - item['timestamp'] <= CACHE_TTL:
+                valid_count += 1
+            else:
+                expired_count += 1
+        
+        return {
+            'total': len(_cache),
+            'valid': valid_count,
+            'expired': expired_count,
+            'bytes': _total_bytes,
+            'max_bytes': config.AppConstants.NOTION_CACHE_MAX_BYTES,
+            **_stats,
+        }
 
@@ -2,7 +2,7 @@ import os
 import sys
 import json
 from dotenv import load_dotenv
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 def _get_resource_path(relative_path: str) -> str:
     """
@@ -101,9 +101,48 @@ class AppConstants:
     # UI関連
     SPINNER_ANIMATION_DELAY: int = 80  # ミリ秒
     QUEUE_CHECK_INTERVAL: int = 100    # ミリ秒
+    PROGRESSIVE_SUPPLIER_LIST: bool = True  # Notionのバッチが届くたびに仕入先リストへ追加表示する
+    PDF_PIPELINE_DURING_FETCH: bool = True  # 取得中から、注文が判明した仕入先のPDF生成を始める
+    PDF_PREGENERATE_WORKERS: int = 4     # PDF事前生成の最大並列数（スレッドで生成する場合）
+    PDF_RENDER_BACKEND: str = "process"  # "process": プロセスプールで生成 / "thread": アプリ内のスレッドで生成
+    PDF_RENDER_PROCESSES: int = 0        # PDF生成プロセス数（0ならCPUコア数）
+    PDF_CACHE_ENABLED: bool = True       # 同じ内容の注文書PDFを再生成せずに再利用する
+    PDF_CACHE_MAX_BYTES: int = 200 * 1024 * 1024  # PDFキャッシュの上限サイズ（超えたら古い順に削除）
     
     # Notion API関連
-    NOTION_API_DELAY: float = 0.35       # 秒
+    NOTION_API_DELAY: float = 0.35       # 秒（リトライ時の指数バックオフの基準値）
+    NOTION_MAX_ATTEMPTS: int = 5         # 一時的なエラー（429/5xx/通信エラー）時の最大試行回数
+    NOTION_RETRY_MAX_DELAY: float = 30.0  # 秒（リトライ1回あたりの最大待機時間）
+    NOTION_RATE_LIMIT_PER_SEC: float = 3.0  # Notion APIの平均リクエスト上限（回/秒）
+    NOTION_RATE_LIMIT_BURST: int = 3     # 瞬間的に許容するリクエスト数
+    NOTION_UPDATE_WORKERS: int = 6       # 発注日更新の最大並列数（速度はレートリミッターで制御）
+    NOTION_INCREMENTAL_SYNC: bool = True  # last_edited_time による増分同期を行う
+    NOTION_FULL_SYNC_INTERVAL: int = 1800  # 秒（この間隔を超えたら全件を再取得する）
+    NOTION_SYNC_OVERLAP: int = 120       # 秒（last_edited_time は分単位のため、ウォーターマークを重ねて取得する）
+    NOTION_MEMBERSHIP_CHECK_INTERVAL: int = 300  # 秒（増分同期で、要発注の対象ページをサーバー側の条件で確認し直す間隔）
+    ORDER_RETRIEVE_WORKERS: int = 3      # 対象の確認で見つかった注文ページを個別取得する際の最大並列数
+    SUPPLIER_FULL_SYNC_INTERVAL: int = 86400  # 秒（仕入先キャッシュを全件で再検証する間隔）
+    SUPPLIER_JOIN_MODE: str = "lazy"     # "lazy": 注文が参照する仕入先のみ取得 / "full": 仕入先DBを全件同期
+    SUPPLIER_RESOLVE_WORKERS: int = 3    # 仕入先ページを個別取得する際の最大並列数
+    NOTION_USE_ASYNC_CLIENT: bool = False  # asyncio版クライアント(notion_async)で取得・更新する
+    NOTION_ASYNC_CONCURRENCY: int = 6    # asyncio版での最大同時リクエスト数（速度はレートリミッターで制御）
+    NOTION_STALE_WHILE_REVALIDATE: bool = True  # 期限切れのキャッシュをすぐに表示し、バックグラウンドで再取得して差分を反映する
+    NOTION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 取得結果のメモリキャッシュの上限（概算、超えたら最近使っていない順に削除）
+    NOTION_CACHE_SWEEP_INTERVAL: float = 60.0  # 秒（期限切れのキャッシュをバックグラウンドで削除する間隔）
+    
+    # メール送信関連
+    SMTP_RECONNECT_ATTEMPTS: int = 1     # 一括送信中にSMTP接続が切れた場合の再接続回数（1通あたり）
+    SMTP_MAX_CONNECTIONS: int = 3        # 一括送信で同時に使うSMTPセッション数（smtp_limits で上書き可能）
+    SMTP_MESSAGES_PER_MINUTE: int = 30   # 1分あたりの最大送信数（Office365の上限、0なら制限しない）
+    MAIL_STREAM_ATTACHMENT_BYTES: int = 2 * 1024 * 1024  # これ以上の添付ファイルは事前に組み立てず、少しずつ変換しながら送信する
+
+    # 送信待ちキュー（outbox）関連
+    OUTBOX_POLL_INTERVAL: float = 30.0        # 送信待ちのメール・Notion更新を確認する間隔（秒）
+    OUTBOX_MAX_SEND_ATTEMPTS: int = 10        # 1通あたりの最大送信回数（超えたら送信失敗として扱う）
+    OUTBOX_RETRY_BASE_SECONDS: float = 30.0   # 再試行の待機秒数の基準（失敗するたびに2倍にする）
+    OUTBOX_RETRY_MAX_SECONDS: float = 1800.0  # 再試行の最大待機秒数
+    OUTBOX_RETENTION_DAYS: int = 30           # 処理が終わった記録を残す日数
+    OUTBOX_UPDATE_NOTION_AFTER_RESEND: bool = True  # 自動で再送できた注文の「発注日」も更新する
     
     # 会社情報
     COMPANY_INFO: Dict[str, str] = {
@@ -153,6 +192,19 @@ def load_department_name_mapping() -> Dict[str, str]:
     """
     return _settings.get("department_name_mapping", {})
 
+def load_smtp_limits(smtp_server: Optional[str] = None) -> Dict[str, int]:
+    """
+    読み込まれた設定からSMTPサーバーごとの送信設定を返します。
+    email_accounts.json の "smtp_limits" にサーバー名をキーとして
+    "max_connections"（同時セッション数）と "messages_per_minute"（1分あたりの送信数）を設定できます。
+    設定されていない項目は AppConstants の既定値を使います。
+    """
+    server_limits = _settings.get("smtp_limits", {}).get(smtp_server or SMTP_SERVER, {})
+    return {
+        "max_connections": max(1, int(server_limits.get("max_connections", AppConstants.SMTP_MAX_CONNECTIONS))),
+        "messages_per_minute": int(server_limits.get("messages_per_minute", AppConstants.SMTP_MESSAGES_PER_MINUTE)),
+    }
+
 def convert_display_name_to_notion_name(display_name: str) -> str:
     """
     表示名（アプリで使用する名前）をNotion名に変換します。
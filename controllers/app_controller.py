@@ -4,9 +4,10 @@ import queue
 import threading
 import tempfile
 import shutil
+import sqlite3
 import contextlib
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List, Optional, Tuple, Callable
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Callable
 import tkinter as tk
 from tkinter import messagebox, ttk
 
@@ -15,8 +16,12 @@ from version import APP_NAME, APP_VERSION, BUILD_DATE
 # 作成したモジュールをインポート
 import config
 import notion_api
+import notion_async
 import email_service
+import outbox
+import pdf_cache
 import pdf_generator
+import pdf_scheduler
 import settings_gui
 import logger_config
 
@@ -43,6 +48,10 @@ class Application(ttk.Frame):
         # --- 一時フォルダと事前生成PDFの管理 ---
         self.temp_dir = tempfile.TemporaryDirectory()
         self.pregenerated_pdfs: Dict[str, str] = {}
+        self.prepared_mails: Dict[str, email_service.PreparedMail] = {}  # 仕入先名 -> PDF生成直後に組み立てたメール
+        self.pdf_scheduler: Optional[pdf_scheduler.PdfRenderScheduler] = None
+        self.pdf_process_pool: Optional[pdf_scheduler.PdfProcessPool] = None
+        self.streamed_orders_by_supplier: Dict[str, List[Dict[str, Any]]] = {}
         
         # --- 状態管理 ---
         self.processing = False
@@ -51,6 +60,15 @@ class Application(ttk.Frame):
         self.current_pdf_path: Optional[str] = None
         self.sent_suppliers: set = set()
         self.selected_departments: List[str] = []
+        self.receiving_orders = False  # Notionからバッチ単位で注文データを受信中か
+        self.fetch_generation = 0  # データ取得の回数（古い取得の再検証結果を反映しないため）
+        self.data_is_stale = False  # 期限切れのキャッシュを表示中か（最新の状態を確認するまで送信させない）
+        # 注文データの発注日の写し（page_id -> YYYY-MM-DD）。Tkスレッドで作り直して差し替え、ワーカーは読むだけにする
+        self.order_dates: Dict[str, str] = {}
+        self.updated_order_dates: Dict[str, str] = {}  # このアプリで更新した発注日（古いデータを取り直しても再更新しない）
+        
+        # --- Notion asyncio クライアント（NOTION_USE_ASYNC_CLIENT 有効時に初回使用で起動） ---
+        self.notion_loop = notion_async.NotionEventLoop()
         
         # --- Tkinter変数 ---
         self.department_vars: Dict[str, tk.BooleanVar] = {}
@@ -76,6 +94,18 @@ class Application(ttk.Frame):
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
         
         self.initialize_app_state()
+        
+        # 仕入先キャッシュを起動時に読み込み、Notionとの差分をバックグラウンドで反映する
+        threading.Thread(target=self.warm_supplier_store, daemon=True).start()
+        
+        # 送信待ちキュー（前回起動時に送信・更新できなかった分を含む）をバックグラウンドで処理する
+        self.outbox_worker = outbox.OutboxWorker(self.update_notion_pages, on_event=self.on_outbox_event)
+        pending_mails, pending_updates, unknown_mails = self.outbox_worker.start()
+        if pending_mails or pending_updates:
+            self.log(f"前回送信できなかったメール{pending_mails}件・Notion更新{pending_updates}件をバックグラウンドで再試行します。", "emphasis")
+        if unknown_mails:
+            self.log(f"⚠ 送信結果を確認できなかったメールが{unknown_mails}件あります。該当の仕入先で「メール送信」を押すと確認できます。", "error")
+        self.master.after(config.AppConstants.QUEUE_CHECK_INTERVAL, self.check_queue)
     
     def configure_styles(self) -> None:
         """UIスタイルを設定する"""
@@ -174,7 +204,9 @@ class Application(ttk.Frame):
         send_button_container = ttk.Frame(send_button_area)
         send_button_container.pack(expand=True)
         self.send_mail_button = ttk.Button(send_button_container, text="メール送信", command=self.send_single_mail, state="disabled", style="Primary.TButton")
-        self.send_mail_button.pack(ipadx=40, ipady=15)
+        self.send_mail_button.pack(side=tk.LEFT, ipadx=40, ipady=15)
+        self.send_all_button = ttk.Button(send_button_container, text="未送信を一括送信", command=self.send_all_mails, state="disabled")
+        self.send_all_button.pack(side=tk.LEFT, padx=(15, 0), ipadx=10, ipady=15)
     
     def initialize_app_state(self) -> None:
         """アプリケーションの初期状態を設定する"""
@@ -227,6 +259,7 @@ class Application(ttk.Frame):
         """データ取得を開始する"""
         if self.processing: return
         self.selected_departments = [name for name, var in self.department_vars.items() if var.get()]
+        self.fetch_generation += 1
         self.reset_temp_storage()
         self.processing = True
         self.toggle_buttons(False)
@@ -238,7 +271,8 @@ class Application(ttk.Frame):
     def on_supplier_select(self, event: tk.Event) -> None:
         """仕入先選択時のハンドラ"""
         selected_iid = self.middle_pane.supplier_listbox.identify_row(event.y)
-        if not selected_iid or self.processing: return
+        # 受信中は、届いた分の仕入先を選択して注文データを確認できる
+        if not selected_iid or (self.processing and not self.receiving_orders): return
         self.middle_pane.supplier_listbox.selection_set(selected_iid)
         selected_supplier = self.middle_pane.supplier_listbox.item(selected_iid, 'values')[0]
         
@@ -267,6 +301,9 @@ class Application(ttk.Frame):
     def send_single_mail(self) -> None:
         """単一メールを送信する"""
         if self.processing or not self.current_pdf_path: return
+        if self.data_is_stale:
+            self.log("最新の注文データを確認中のため、まだ送信できません。反映されるまでお待ちください。", "error")
+            return
         
         selected_iids = self.middle_pane.supplier_listbox.selection()
         if not selected_iids: return
@@ -275,36 +312,19 @@ class Application(ttk.Frame):
         if not items:
             messagebox.showerror("データなし", f"「{selected_supplier}」の注文データが見つかりません。")
             return
-        supplier_departments = []
-        for item in items:
-            for dept in (item.get("departments") or []):
-                dept = dept.strip()
-                if dept:
-                    # Notion名を表示名に変換
-                    display_name = config.convert_notion_name_to_display_name(dept)
-                    if display_name not in supplier_departments:
-                        supplier_departments.append(display_name)
-        department_for_pdf = next((dept for dept in self.selected_departments if dept in supplier_departments), None)
-        if not department_for_pdf and supplier_departments:
-            department_for_pdf = supplier_departments[0]
+        pending_entries = outbox.find_pending([item['page_id'] for item in items])
+        unknown_entries = [entry for entry in pending_entries if entry.status == outbox.STATUS_UNKNOWN]
+        if unknown_entries:
+            if not self.confirm_unknown_delivery(selected_supplier, unknown_entries):
+                return
+        elif pending_entries:
+            messagebox.showinfo("送信待ち", f"「{selected_supplier}」のメールは送信待ちです。接続が回復すると自動で送信されます。")
+            return
+        department_for_pdf = self.get_department_for_items(items)
         
         # PDFを本保存先にコピー
         try:
-            # --- 保存先パスの計算ロジックを追加 ---
-            base_dest_dir = config.PDF_SAVE_DIR
-            final_dest_dir = base_dest_dir
-            
-            # 部署フォルダを補完
-            if department_for_pdf:
-                department_dir = os.path.join(base_dest_dir, department_for_pdf)
-                os.makedirs(department_dir, exist_ok=True) # フォルダがなければ作成
-                final_dest_dir = department_dir
-            
-            # 最終的なパスを構築
-            final_dest_path = os.path.join(final_dest_dir, os.path.basename(self.current_pdf_path))
-            # --- ここまで ---
-            
-            shutil.copy2(self.current_pdf_path, final_dest_path)
+            final_dest_path = self.copy_pdf_to_save_dir(self.current_pdf_path, department_for_pdf)
             self.log(f"注文書を正式な保存先にコピーしました: {final_dest_path}")
         except Exception as e:
             messagebox.showerror("ファイルコピーエラー", f"PDFを保存フォルダにコピーできませんでした。\n{e}")
@@ -318,6 +338,88 @@ class Application(ttk.Frame):
         threading.Thread(target=self.run_thread, args=(self.send_mail_task,)).start()
         self.master.after(config.AppConstants.QUEUE_CHECK_INTERVAL, self.check_queue)
     
+    def confirm_unknown_delivery(self, supplier: str, entries: List[outbox.OutboxEntry]) -> bool:
+        """
+        送信結果が不明のメールが届いていたかをユーザーに確認する
+
+        Returns:
+            届いていなかったため、もう一度送信する場合はTrue
+        """
+        answer = messagebox.askyesnocancel(
+            "送信結果の確認",
+            f"「{supplier}」宛のメールは、送信中に接続が切れたため送信されたか確認できませんでした。\n"
+            "送信済みフォルダや相手先で、メールが届いているか確認してください。\n\n"
+            "届いていた場合は「はい」（送信済みにします）、\n"
+            "届いていなかった場合は「いいえ」（もう一度送信します）を選んでください。",
+        )
+        if answer is None:
+            return False
+        outbox.resolve_unknown(entries, delivered=answer)
+        if answer:
+            self.log(f"「{supplier}」宛のメールは届いていたことを確認しました。")
+            self.ask_and_update_notion(supplier, [entry.id for entry in entries])
+            return False
+        self.log(f"「{supplier}」宛のメールは届いていなかったため、もう一度送信します。")
+        return True
+    
+    def send_all_mails(self) -> None:
+        """PDFの準備ができている未送信の仕入先へ、1つのSMTP接続でまとめてメールを送信する"""
+        if self.processing: return
+        if self.data_is_stale:
+            self.log("最新の注文データを確認中のため、まだ送信できません。反映されるまでお待ちください。", "error")
+            return
+        
+        orders = []
+        waiting_suppliers = []
+        unknown_suppliers = []
+        pending_entries = outbox.find_pending([item['page_id'] for item in self.order_data])
+        queued_page_ids = {page_id for entry in pending_entries for page_id in entry.page_ids}
+        unknown_page_ids = {
+            page_id for entry in pending_entries if entry.status == outbox.STATUS_UNKNOWN for page_id in entry.page_ids
+        }
+        for supplier, items in self.orders_by_supplier.items():
+            if not items or supplier in self.sent_suppliers:
+                continue
+            if any(item['page_id'] in unknown_page_ids for item in items):
+                # 送信結果が不明の注文は、届いているかを確認するまで送信しない
+                unknown_suppliers.append(supplier)
+                continue
+            if any(item['page_id'] in queued_page_ids for item in items):
+                # 再送待ちの注文は、送信待ちキューから自動で送信される
+                continue
+            pdf_path = self.pregenerated_pdfs.get(supplier)
+            if not pdf_path:
+                waiting_suppliers.append(supplier)
+                continue
+            orders.append(email_service.OrderMail(
+                supplier, items, pdf_path, self.get_department_for_items(items), self.prepared_mails.get(supplier)
+            ))
+        
+        if not orders:
+            messagebox.showinfo("一括送信", "送信できる未送信の仕入先がありません。")
+            return
+        message = f"未送信の{len(orders)}件の仕入先へメールを送信します。よろしいですか？"
+        if waiting_suppliers:
+            message += f"\n\n※PDFを準備中の{len(waiting_suppliers)}件は送信しません。"
+        if unknown_suppliers:
+            message += f"\n\n※送信結果を確認できていない{len(unknown_suppliers)}件は送信しません（個別に「メール送信」で確認してください）。"
+        if not messagebox.askyesno("一括送信確認", message): return
+        
+        # PDFを本保存先にコピー
+        for order in orders:
+            try:
+                self.copy_pdf_to_save_dir(order.pdf_path, order.selected_department)
+            except Exception as e:
+                messagebox.showerror("ファイルコピーエラー", f"「{order.supplier_name}」のPDFを保存フォルダにコピーできませんでした。\n{e}")
+                return
+        self.log(f"注文書{len(orders)}件を正式な保存先にコピーしました。")
+        
+        self.processing = True
+        self.toggle_buttons(False)
+        self.start_spinner()
+        threading.Thread(target=self.run_thread, args=(self.send_all_mails_task, orders)).start()
+        self.master.after(config.AppConstants.QUEUE_CHECK_INTERVAL, self.check_queue)
+    
     def open_settings_window(self) -> None:
         """設定ウィンドウを開く"""
         settings_win = settings_gui.SettingsWindow(self.master)
@@ -357,6 +459,17 @@ class Application(ttk.Frame):
             self.q.put(("log", f"\nスレッド処理中にエラーが発生しました: {e}", "error"))
             self.q.put(("task_complete", None))
     
+    def warm_supplier_store(self) -> None:
+        """仕入先キャッシュを読み込み、Notionの更新分で再検証する"""
+        try:
+            if config.AppConstants.NOTION_USE_ASYNC_CLIENT:
+                self.notion_loop.run(notion_async.refresh_supplier_store_async(self.notion_loop))
+            else:
+                notion_api.refresh_supplier_store()
+        except Exception as e:
+            # 起動時の再検証に失敗してもデータ取得時に再試行されるため、ログのみ残す
+            logger.warning(f"仕入先キャッシュの事前読み込みに失敗しました: {e}")
+    
     def get_data_task(self) -> None:
         """Notionからデータを取得するタスク"""
         self.log("----------------------------------------")
@@ -364,13 +477,70 @@ class Application(ttk.Frame):
         self.log("----------------------------------------")
         self.log(f"部署名「{', '.join(self.selected_departments)}」でフィルタリング中...\nNotionからデータ取得中..." if self.selected_departments else "部署名フィルターは未選択です。\nNotionからデータ取得中...")
         
+        # 注文が判明した仕入先から、取得と並行してPDFの生成を始める
+        self.streamed_orders_by_supplier = {}
+        if config.AppConstants.PDF_PIPELINE_DURING_FETCH:
+            self.start_pdf_scheduler()
+        
+        # 期限切れのキャッシュはすぐに表示し、バックグラウンドで再取得した差分を後から反映する
+        on_revalidated = on_revalidation_failed = None
+        if config.AppConstants.NOTION_STALE_WHILE_REVALIDATE:
+            generation = self.fetch_generation
+            on_revalidated = lambda result, delta: self.q.put(("orders_revalidated", (generation, result, delta)))
+            on_revalidation_failed = lambda error: self.q.put(("orders_revalidation_failed", (generation, error)))
+        
         # 専門関数を呼び出すだけに変更
-        processed_data = notion_api.fetch_and_process_orders(department_names=self.selected_departments)
+        try:
+            processed_data = notion_api.fetch_and_process_orders(
+                department_names=self.selected_departments,
+                batch_source=self.iter_order_data_async if config.AppConstants.NOTION_USE_ASYNC_CLIENT else None,
+                on_batch=self.on_order_batch,
+                on_revalidated=on_revalidated,
+                on_revalidation_failed=on_revalidation_failed,
+            )
+        except notion_api.NotionAPIError as e:
+            # 一部だけの結果を表示すると発注漏れにつながるため、取得自体を失敗として扱う
+            self.log(f"✗ {e}", "error")
+            self.log("Notionからのデータ取得に失敗しました。時間をおいて再度「Notionからデータを取得」を押してください。", "error")
+            if self.pdf_scheduler:
+                self.pdf_scheduler.close(wait=False)
+                self.pdf_scheduler = None
+            self.q.put(("discard_order_batches", None))
+            self.q.put(("task_complete", None))
+            return
         
         order_count = len(processed_data.get("all_orders", []))
         self.log(f"✅ 完了 ({order_count}件の要発注データが見つかりました)")
+        if processed_data.get("stale"):
+            self.log(
+                f"⚠ {int(processed_data.get('cache_age', 0) // 60)}分前に取得したデータを表示しています。"
+                "最新の状態をバックグラウンドで確認中です（変更があれば自動で反映します。確認が終わるまでメールは送信できません）。",
+                "emphasis",
+            )
         self.q.put(("update_data_ui", processed_data))
     
+    def iter_order_data_async(self, department_names: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
+        """asyncio版クライアントで注文データをバッチ単位で取得する（ワーカースレッドから呼ぶ）"""
+        return self.notion_loop.iterate(
+            notion_async.aiter_order_data_from_notion(self.notion_loop, department_names)
+        )
+    
+    def on_order_batch(self, batch: Dict[str, Any]) -> None:
+        """注文データのバッチを受け取るたびに進捗をログに出し、仕入先リストへの反映を依頼する"""
+        self.log(f"  ...{len(batch.get('orders', []))}件を受信しました")
+        if config.AppConstants.PROGRESSIVE_SUPPLIER_LIST:
+            self.q.put(("order_batch", batch))
+        if self.pdf_scheduler:
+            # 後続のバッチで注文が増えた仕入先は、スケジューラーが最新の注文で生成し直す
+            batch_suppliers = set()
+            for order in batch.get("orders", []):
+                supplier_name = order.get("supplier_name")
+                if supplier_name:
+                    self.streamed_orders_by_supplier.setdefault(supplier_name, []).append(order)
+                    batch_suppliers.add(supplier_name)
+            for supplier_name in batch_suppliers:
+                self.pdf_scheduler.submit(supplier_name, self.streamed_orders_by_supplier[supplier_name])
+    
     def send_mail_task(self) -> None:
         """メール送信タスク"""
         # --- 必要な情報をUIスレッドから取得 ---
@@ -387,57 +557,162 @@ class Application(ttk.Frame):
         
         selected_supplier = self.middle_pane.supplier_listbox.item(selected_iids[0], 'values')[0]
         items = self.orders_by_supplier.get(selected_supplier, [])
-        supplier_departments = []
-        for item in items:
-            for dept in (item.get("departments") or []):
-                dept = dept.strip()
-                if dept:
-                    # Notion名を表示名に変換
-                    display_name = config.convert_notion_name_to_display_name(dept)
-                    if display_name not in supplier_departments:
-                        supplier_departments.append(display_name)
-        department_for_mail = next((dept for dept in self.selected_departments if dept in supplier_departments), None)
-        if not department_for_mail and supplier_departments:
-            department_for_mail = supplier_departments[0]
+        department_for_mail = self.get_department_for_items(items)
         
         self.log(f"「{selected_supplier}」宛にメールを送信中 (From: {sender_creds['sender']})...")
         
-        success, error_message = email_service.prepare_and_send_order_email(
-            account_key,
-            sender_creds,
-            items,
-            self.current_pdf_path,
-            department_for_mail
+        # 送信前に送信待ちキューへ記録し、アプリが落ちても次回起動時に送信結果を確認・再送できるようにする
+        order = email_service.OrderMail(
+            selected_supplier, items, self.current_pdf_path, department_for_mail, self.prepared_mails.get(selected_supplier)
         )
+        try:
+            entry_id = outbox.enqueue_order(account_key, sender_creds, order)
+        except Exception as e:
+            status, error_message = outbox.STATUS_FAILED, email_service._describe_send_error(e)
+        else:
+            status, error_message = outbox.send_entries(outbox.get_entries([entry_id]))[entry_id]
         
-        if success:
-            self.q.put(("ask_and_update_notion", (selected_supplier, [item['page_id'] for item in items])))
+        if status == outbox.STATUS_SENT:
+            self.q.put(("ask_and_update_notion", (selected_supplier, [entry_id])))
         else:
             user_message = error_message or "メール送信に失敗しました。詳細はログを確認してください。"
             self.log(f"✗ {user_message}", "error")
+            if status == outbox.STATUS_PENDING:
+                self.log(f"-> 「{selected_supplier}」のメールを送信待ちにしました。接続が回復すると自動で送信します。", "emphasis")
+            elif status == outbox.STATUS_UNKNOWN:
+                self.log(f"-> 「{selected_supplier}」のメールは自動では再送しません。届いているか確認してから、もう一度「メール送信」を押してください。", "emphasis")
             self.q.put(("email_error", user_message))
             self.q.put(("task_complete", None))
     
-    def update_notion_task(self, page_ids: List[str]) -> None:
-        """Notionページ更新タスク"""
-        notion_api.update_notion_pages(page_ids)
-        supplier = next((item["supplier_name"] for item in self.order_data if item["page_id"] == page_ids[0]), None)
-        if supplier: self.q.put(("mark_as_sent_after_update", supplier))
-    
-    def pregenerate_pdfs_task(self) -> None:
-        """全ての仕入先のPDFをバックグラウンドで事前生成する"""
-        self.log("\n----------------------------------------")
-        self.log("STEP 3a: 注文書をバックグラウンドで準備中...")
-        self.log("----------------------------------------")
-        
+    def send_all_mails_task(self, orders: List[email_service.OrderMail]) -> None:
+        """一括送信タスク（結果は仕入先ごとにキューで通知する）"""
         account_key = self.display_name_to_key_map.get(self.selected_account_display_name.get())
         if not account_key:
-            self.log("エラー: 送信者アカウントが不明なため、PDFの事前生成を中止しました。", "error")
+            self.log("エラー: 送信者アカウントが選択されていません。", "error")
+            return self.q.put(("task_complete", None))
+        
+        sender_creds = self.accounts[account_key]
+        self.log(f"{len(orders)}件の仕入先へメールを一括送信中 (From: {sender_creds['sender']})...")
+        
+        results: Dict[str, Tuple[str, Optional[str]]] = {}
+        entries = []
+        for order in orders:
+            try:
+                entries.append(outbox.get_entries([outbox.enqueue_order(account_key, sender_creds, order)])[0])
+            except Exception as e:
+                results[order.supplier_name] = (outbox.STATUS_FAILED, email_service._describe_send_error(e))
+                self.q.put(("batch_mail_result", (order.supplier_name, outbox.STATUS_FAILED, results[order.supplier_name][1])))
+        
+        sent_entry_ids = []
+        
+        def on_result(entry: outbox.OutboxEntry, status: str, error_message: Optional[str]) -> None:
+            self.q.put(("batch_mail_result", (entry.supplier_name, status, error_message)))
+        
+        for entry_id, (status, error_message) in outbox.send_entries(entries, on_result=on_result).items():
+            entry = next(entry for entry in entries if entry.id == entry_id)
+            results[entry.supplier_name] = (status, error_message)
+            if status == outbox.STATUS_SENT:
+                sent_entry_ids.append(entry_id)
+        self.q.put(("batch_send_complete", (results, sent_entry_ids)))
+    
+    def update_notion_pages(self, page_ids: List[str]) -> notion_api.NotionUpdateResult:
+        """
+        Notionページの「発注日」を一括更新する（送信待ちキューのワーカーからも呼ばれる）
+        Tkスレッドで作った発注日の写しで、発注日が既に当日のページは更新しない
+        """
+        order_dates = self.order_dates
+        current_order_dates = {page_id: order_dates[page_id] for page_id in page_ids if page_id in order_dates}
+        if config.AppConstants.NOTION_USE_ASYNC_CLIENT:
+            result = self.notion_loop.run(notion_async.update_notion_pages_async(
+                self.notion_loop, page_ids, current_order_dates=current_order_dates
+            ))
+        else:
+            result = notion_api.update_notion_pages(page_ids, current_order_dates=current_order_dates)
+        # 再送した場合に同じページを更新し直さないよう、更新した発注日をTkスレッドで記録する
+        if result.updated:
+            self.q.put(("order_dates_updated", list(result.updated)))
+        return result
+    
+    def record_updated_order_dates(self, page_ids: List[str]) -> None:
+        """Notionで更新した発注日を記録し、発注日の写しに反映する"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.updated_order_dates.update((page_id, today) for page_id in page_ids)
+        self.publish_order_dates()
+    
+    def publish_order_dates(self) -> None:
+        """
+        注文データの発注日の写しを作り直す（注文データを変更するたびにTkスレッドから呼ぶ）
+        注文データの辞書はキャッシュと共有しているため、ワーカーには直接触らせない
+        """
+        order_dates = {item['page_id']: item.get('order_date', '') for item in self.order_data}
+        order_dates.update(self.updated_order_dates)
+        self.order_dates = order_dates
+    
+    def update_notion_task(self, entry_ids: List[int]) -> None:
+        """Notionページ更新タスク（更新できなかったページは送信待ちキューが再試行する）"""
+        try:
+            result = outbox.update_notion(entry_ids, self.update_notion_pages)
+        except sqlite3.Error as e:
+            logger.error(f"Notionの更新待ちを記録できませんでした (id={entry_ids}): {e}", exc_info=True)
+            self.log("✗ Notionの更新待ちを記録できなかったため、「発注日」を更新していません。Notionで直接更新してください。", "error")
+        else:
+            if result.failed:
+                self.log(f"✗ {len(result.failed)}件のNotionページを更新できませんでした。時間をおいて自動で再試行します。", "error")
+        suppliers = []
+        for entry in outbox.get_entries(entry_ids):
+            if entry.supplier_name not in suppliers:
+                suppliers.append(entry.supplier_name)
+        if suppliers:
+            self.q.put(("mark_as_sent_after_update", suppliers))
+        else:
             self.q.put(("task_complete", None))
-            return
+    
+    def on_outbox_event(self, kind: str, entry: outbox.OutboxEntry, error_message: Optional[str]) -> None:
+        """送信待ちキューのバックグラウンド処理の結果をUIに通知する（ワーカースレッドから呼ばれる）"""
+        self.q.put(("outbox_event", (kind, entry, error_message)))
+    
+    def get_department_for_items(self, items: List[Dict[str, Any]]) -> Optional[str]:
+        """注文アイテムの部署のうち、選択中の部署を優先してPDF・メールに記載する部署を決める"""
+        supplier_departments = []
+        for item in items:
+            for dept in (item.get("departments") or []):
+                dept = dept.strip()
+                if dept:
+                    # Notion名を表示名に変換
+                    display_name = config.convert_notion_name_to_display_name(dept)
+                    if display_name not in supplier_departments:
+                        supplier_departments.append(display_name)
+        department = next((dept for dept in self.selected_departments if dept in supplier_departments), None)
+        if not department and supplier_departments:
+            department = supplier_departments[0]
+        return department
+    
+    def copy_pdf_to_save_dir(self, pdf_path: str, department: Optional[str]) -> str:
+        """一時フォルダのPDFを本保存先（部署フォルダ）にコピーし、コピー先のパスを返す"""
+        final_dest_dir = config.PDF_SAVE_DIR
+        if department:
+            final_dest_dir = os.path.join(final_dest_dir, department)
+            os.makedirs(final_dest_dir, exist_ok=True) # フォルダがなければ作成
+        final_dest_path = os.path.join(final_dest_dir, os.path.basename(pdf_path))
+        shutil.copy2(pdf_path, final_dest_path)
+        return final_dest_path
+    
+    def build_pdf_renderer(self) -> Optional[pdf_scheduler.RenderFunc]:
+        """
+        選択中の送信者アカウントで注文書PDFを生成する関数を作る
+
+        Returns:
+            PDF生成関数（送信者アカウントが不明な場合はNone）
+        """
+        account_key = self.display_name_to_key_map.get(self.selected_account_display_name.get())
+        if not account_key:
+            return None
         
         sender_creds = self.accounts[account_key]
         department_guidance_numbers = config.load_department_guidance_numbers()
+        selected_departments = list(self.selected_departments)
+        save_dir = self.temp_dir.name
+        process_pool = self.get_pdf_process_pool()
         
         def resolve_departments(items: List[Dict[str, Any]]) -> List[str]:
             """アイテムから部署リストを解決する（Notion名を表示名に変換）"""
@@ -452,10 +727,28 @@ class Application(ttk.Frame):
                             departments.append(display_name)
             return departments
         
-        def render_pdf(supplier: str, items: List[Dict[str, Any]]) -> Tuple[str, Optional[str], Optional[str]]:
+        def prepare_mail(supplier: str, items: List[Dict[str, Any]], pdf_path: str, department: Optional[str]) -> None:
+            """PDFを添付したメールを組み立てておき、送信時はSMTPの送信処理だけにする"""
+            try:
+                prepared = email_service.prepare_order_mail(
+                    items[0], pdf_path, sender_creds["sender"], sender_creds.get("display_name", account_key),
+                    department, department_guidance_numbers
+                )
+            except Exception as e:
+                # 組み立てられない場合（宛先未設定など）は送信時に組み立て直し、そこでエラーを表示する
+                self.prepared_mails.pop(supplier, None)
+                logger.debug(f"メールの事前組み立てをスキップしました ({supplier}): {e}")
+                return
+            if prepared:
+                self.prepared_mails[supplier] = prepared
+            else:
+                # 添付ファイルが大きい場合は送信時にストリームで送る
+                self.prepared_mails.pop(supplier, None)
+        
+        def render_pdf(supplier: str, items: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[str]]:
             """PDFをレンダリングする"""
             departments = resolve_departments(items)
-            department_for_pdf = next((dept for dept in self.selected_departments if dept in departments), None)
+            department_for_pdf = next((dept for dept in selected_departments if dept in departments), None)
             if not department_for_pdf and departments:
                 department_for_pdf = departments[0]
             raw_guidance = department_guidance_numbers.get(department_for_pdf, "")
@@ -465,33 +758,70 @@ class Application(ttk.Frame):
                 "email": sender_creds["sender"],
                 "guidance_number": guidance_number
             }
-            pdf_path, _, error_message = pdf_generator.generate_order_pdf_flow(
-                supplier,
-                items,
-                sender_info,
-                selected_department=department_for_pdf,
-                save_dir=self.temp_dir.name
-            )
-            return supplier, pdf_path, error_message
-        
-        futures = []
-        total_suppliers = len(self.orders_by_supplier)
-        max_workers = max(1, min(4, total_suppliers))
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            for supplier, items in self.orders_by_supplier.items():
-                if not items:
-                    continue
-                futures.append(executor.submit(render_pdf, supplier, items))
-            for future in as_completed(futures):
-                try:
-                    supplier, pdf_path, error_message = future.result()
-                except Exception as exc:
-                    self.log(f"    -> PDF準備中に例外が発生しました: {exc}", "error")
-                    continue
-                if pdf_path:
-                    self.pregenerated_pdfs[supplier] = pdf_path
+            # 注文・差出人・部署が前回と同じなら、生成済みのPDFを再利用する
+            cache_key = None
+            pdf_path, error_message = None, None
+            if config.AppConstants.PDF_CACHE_ENABLED:
+                cache_key = pdf_cache.make_key(supplier, items, sender_info, department_for_pdf)
+                pdf_path = pdf_cache.restore(cache_key, supplier, department_for_pdf, save_dir)
+            
+            if not pdf_path:
+                if process_pool:
+                    pdf_path, error_message = process_pool.render(supplier, items, sender_info, department_for_pdf, save_dir)
                 else:
-                    self.log(f"    -> 準備中にエラーが発生: {error_message}", "error")
+                    pdf_path, error_message = pdf_generator.render_order_pdf_job(supplier, items, sender_info, department_for_pdf, save_dir)
+                if pdf_path and cache_key:
+                    pdf_cache.store(cache_key, pdf_path)
+            # 再利用したPDFでも組み立て直す（同じパスに復元した場合に、前の注文内容のメールを使わせない）
+            if pdf_path:
+                prepare_mail(supplier, items, pdf_path, department_for_pdf)
+            else:
+                self.prepared_mails.pop(supplier, None)
+            return pdf_path, error_message
+        
+        return render_pdf
+    
+    def get_pdf_process_pool(self) -> Optional[pdf_scheduler.PdfProcessPool]:
+        """PDF生成用のプロセスプールを返す（スレッドで生成する設定の場合はNone）"""
+        if config.AppConstants.PDF_RENDER_BACKEND != "process":
+            return None
+        if self.pdf_process_pool is None:
+            self.pdf_process_pool = pdf_scheduler.PdfProcessPool(config.AppConstants.PDF_RENDER_PROCESSES)
+        return self.pdf_process_pool
+    
+    def start_pdf_scheduler(self) -> Optional[pdf_scheduler.PdfRenderScheduler]:
+        """PDF事前生成スケジューラーを作成する（送信者アカウントが不明な場合はNone）"""
+        renderer = self.build_pdf_renderer()
+        if renderer is None:
+            return None
+        # プロセスプール使用時、スケジューラーのスレッドは生成の完了を待つだけなのでプロセス数に合わせる
+        process_pool = self.get_pdf_process_pool()
+        self.pdf_scheduler = pdf_scheduler.PdfRenderScheduler(
+            renderer,
+            results=self.pregenerated_pdfs,
+            max_workers=process_pool.processes if process_pool else config.AppConstants.PDF_PREGENERATE_WORKERS,
+        )
+        return self.pdf_scheduler
+    
+    def pregenerate_pdfs_task(self) -> None:
+        """全ての仕入先のPDFをバックグラウンドで事前生成する"""
+        self.log("\n----------------------------------------")
+        self.log("STEP 3a: 注文書をバックグラウンドで準備中...")
+        self.log("----------------------------------------")
+        
+        # 取得中に生成を始めている場合は、その続きとして未生成・注文が変わった仕入先だけを生成する
+        scheduler = self.pdf_scheduler or self.start_pdf_scheduler()
+        if scheduler is None:
+            self.log("エラー: 送信者アカウントが不明なため、PDFの事前生成を中止しました。", "error")
+            self.q.put(("task_complete", None))
+            return
+        
+        for supplier, items in self.orders_by_supplier.items():
+            if items:
+                scheduler.submit(supplier, items)
+        scheduler.wait()
+        for error_message in scheduler.errors.values():
+            self.log(f"    -> 準備中にエラーが発生: {error_message}", "error")
         self.log("✅ 全ての注文書の準備が完了しました。", "emphasis")
         self.q.put(("task_complete", None))
     
@@ -504,8 +834,16 @@ class Application(ttk.Frame):
                 command, message = item[0], item[1]
                 if command == "log": self.log(message.strip(), item[2] if len(item) > 2 else None)
                 elif command == "update_data_ui": self.update_data_ui(message)
+                elif command == "order_batch": self.apply_order_batch(message)
+                elif command == "orders_revalidated": self.apply_revalidated_orders(*message)
+                elif command == "orders_revalidation_failed": self.show_revalidation_failure(*message)
+                elif command == "order_dates_updated": self.record_updated_order_dates(message)
+                elif command == "discard_order_batches": self.discard_order_batches()
                 elif command == "ask_and_update_notion": self.ask_and_update_notion(message[0], message[1])
-                elif command == "mark_as_sent_after_update": self.mark_as_sent(message)
+                elif command == "mark_as_sent_after_update": self.mark_suppliers_as_sent(message)
+                elif command == "batch_mail_result": self.show_batch_mail_result(*message)
+                elif command == "batch_send_complete": self.finish_batch_send(*message)
+                elif command == "outbox_event": self.show_outbox_event(*message)
                 elif command == "update_preview_ui": self.update_preview_ui(message)
                 elif command == "email_error": self.show_email_send_error(message)
                 elif command == "task_complete":
@@ -542,6 +880,103 @@ class Application(ttk.Frame):
             suggestion = "ネットワーク環境やSMTPサーバー設定を確認してください。"
         messagebox.showerror("メール送信エラー", f"{message}\n\n対処ヒント: {suggestion}")
     
+    def apply_order_batch(self, batch: Dict[str, Any]) -> None:
+        """受信した注文データのバッチを、取得の完了を待たずに仕入先リストへ反映する"""
+        orders = batch.get("orders", [])
+        if not orders:
+            return
+        if not self.receiving_orders:
+            self.receiving_orders = True
+            self.order_data = []
+            self.orders_by_supplier = {}
+        
+        self.order_data.extend(orders)
+        self.publish_order_dates()
+        batch_suppliers = set()
+        for order in orders:
+            supplier_name = order.get("supplier_name")
+            if supplier_name:
+                self.orders_by_supplier.setdefault(supplier_name, []).append(order)
+                batch_suppliers.add(supplier_name)
+        self.middle_pane.add_suppliers(batch_suppliers)
+        
+        # 表示中の仕入先に注文が追加された場合はテーブルも更新する
+        selected_supplier = self.middle_pane.get_selected_supplier()
+        if selected_supplier in batch_suppliers:
+            self.middle_pane.update_table_for_supplier(selected_supplier)
+    
+    def apply_revalidated_orders(
+        self, generation: int, processed_data: Dict[str, Any], delta: Dict[str, List[Dict[str, Any]]]
+    ) -> None:
+        """バックグラウンドで再取得した注文データの差分を表示中のデータに反映する"""
+        if generation != self.fetch_generation:
+            # 部署を変えて取得し直した後などは、古い取得の結果を反映しない
+            return
+        changed_orders = delta["added"] + delta["changed"] + delta["removed"]
+        if not changed_orders:
+            self.data_is_stale = False
+            if not self.processing:
+                self.toggle_buttons(True)
+                if self.current_pdf_path:
+                    self.send_mail_button.config(state="normal")
+            self.log("✓ 最新の状態を確認しました（変更はありません）。")
+            return
+        if self.processing:
+            # 送信・PDF準備などの処理中は、完了を待ってから反映する
+            self.master.after(
+                config.AppConstants.QUEUE_CHECK_INTERVAL * 10,
+                lambda: self.q.put(("orders_revalidated", (generation, processed_data, delta))),
+            )
+            return
+        
+        self.data_is_stale = False
+        self.order_data = processed_data.get("all_orders", [])
+        self.orders_by_supplier = processed_data.get("orders_by_supplier", {})
+        self.publish_order_dates()
+        # 表示済みの行（送信済みの表示を含む）と選択は残し、増減した仕入先だけを反映する
+        self.middle_pane.update_supplier_list(self.order_data)
+        
+        affected_suppliers = {order["supplier_name"] for order in changed_orders if order.get("supplier_name")}
+        for supplier in affected_suppliers:
+            items = self.orders_by_supplier.get(supplier)
+            if items and self.pdf_scheduler:
+                # 注文が変わった仕入先だけPDFを生成し直す（古いPDF・組み立て済みのメールは使わせない）
+                self.prepared_mails.pop(supplier, None)
+                self.pdf_scheduler.submit(supplier, items)
+            else:
+                self.pregenerated_pdfs.pop(supplier, None)
+                self.prepared_mails.pop(supplier, None)
+        
+        selected_supplier = self.middle_pane.get_selected_supplier()
+        if selected_supplier:
+            self.middle_pane.update_table_for_supplier(selected_supplier)
+            if selected_supplier in affected_suppliers:
+                self.clear_preview()
+                self.log(f"「{selected_supplier}」の注文が更新されたため、もう一度選択してプレビューを確認してください。", "emphasis")
+        self.toggle_buttons(True)
+        if self.current_pdf_path:
+            self.send_mail_button.config(state="normal")
+        self.log(
+            f"✓ 最新の状態を反映しました（追加 {len(delta['added'])}件 / 変更 {len(delta['changed'])}件 / "
+            f"削除 {len(delta['removed'])}件）",
+            "emphasis",
+        )
+    
+    def show_revalidation_failure(self, generation: int, error: str) -> None:
+        """バックグラウンドでの再取得に失敗したことを表示する（古いデータのまま送信させない）"""
+        if generation != self.fetch_generation:
+            return
+        self.log(f"✗ 最新の状態を確認できませんでした: {error}", "error")
+        self.log("表示中のデータは古い可能性があるため、送信する前にもう一度「Notionからデータを取得」を押してください。", "error")
+    
+    def discard_order_batches(self) -> None:
+        """取得に失敗した場合に、途中まで表示した注文データを破棄する"""
+        self.receiving_orders = False
+        self.order_data = []
+        self.orders_by_supplier = {}
+        self.publish_order_dates()
+        self.middle_pane.clear_displays()
+    
     def update_data_ui(self, processed_data: Dict[str, Any]) -> None:
         """データUIを更新する"""
         # 事前処理済みのデータを展開
@@ -549,11 +984,18 @@ class Application(ttk.Frame):
         all_orders = processed_data.get("all_orders", [])
         unlinked_count = processed_data.get("unlinked_count", 0)
         self.order_data = all_orders
+        self.publish_order_dates()
+        self.receiving_orders = False
+        self.data_is_stale = bool(processed_data.get("stale"))
         
-        # UIの更新
+        # UIの更新（受信中に表示した行と選択はそのまま残す）
         self.sent_suppliers.clear()
-        self.middle_pane.tree.delete(*self.middle_pane.tree.get_children())
         self.middle_pane.update_supplier_list(all_orders)
+        selected_supplier = self.middle_pane.get_selected_supplier()
+        if selected_supplier:
+            self.middle_pane.update_table_for_supplier(selected_supplier)
+        else:
+            self.middle_pane.tree.delete(*self.middle_pane.tree.get_children())
         
         if unlinked_count > 0:
             self.log("", None)
@@ -589,26 +1031,84 @@ class Application(ttk.Frame):
         self.log("  - 担当者", "emphasis")
         self.log("  - 注文内容", "emphasis")
         self.log("\n-> 問題がなければ「メール送信」ボタンをクリックしてください。", "emphasis")
-        if pdf_path: self.send_mail_button.config(state="normal")
+        if pdf_path and not self.data_is_stale: self.send_mail_button.config(state="normal")
         self.q.put(("task_complete", None))
     
-    def ask_and_update_notion(self, supplier: str, page_ids: List[str]) -> None:
+    def ask_and_update_notion(self, supplier: str, entry_ids: List[int]) -> None:
         """Notion更新を確認して実行する"""
         if messagebox.askyesno("Notion更新確認", f"メール送信が完了しました。\n\n「{supplier}」のNotionページの「発注日」を更新しますか？"):
             self.processing = True
             self.toggle_buttons(False)
             self.log(f"「{supplier}」のNotionページを更新中...")
             self.start_spinner()
-            threading.Thread(target=self.run_thread, args=(self.update_notion_task, page_ids)).start()
+            threading.Thread(target=self.run_thread, args=(self.update_notion_task, entry_ids)).start()
         else:
+            outbox.request_notion_update(entry_ids, update=False)
             self.mark_as_sent(supplier, updated=False)
     
+    def show_batch_mail_result(self, supplier: str, status: str, error_message: Optional[str]) -> None:
+        """一括送信の仕入先ごとの結果を表示する"""
+        if status == outbox.STATUS_SENT:
+            self.log(f"  ✓ 「{supplier}」へ送信しました")
+        elif status == outbox.STATUS_PENDING:
+            self.log(f"  ✗ 「{supplier}」への送信に失敗しました（送信待ちにし、自動で再送します）: {error_message}", "error")
+        elif status == outbox.STATUS_UNKNOWN:
+            self.log(f"  ⚠ 「{supplier}」への送信結果を確認できませんでした（自動では再送しません）: {error_message}", "error")
+        else:
+            self.log(f"  ✗ 「{supplier}」への送信に失敗しました: {error_message}", "error")
+    
+    def finish_batch_send(self, results: Dict[str, Tuple[str, Optional[str]]], sent_entry_ids: List[int]) -> None:
+        """一括送信の完了後、失敗をまとめて表示し、送信できた仕入先のNotion更新を確認する"""
+        sent = [supplier for supplier, (status, _) in results.items() if status == outbox.STATUS_SENT]
+        failed = {supplier: error for supplier, (status, error) in results.items() if status != outbox.STATUS_SENT}
+        queued = sum(1 for status, _ in results.values() if status == outbox.STATUS_PENDING)
+        unknown = sum(1 for status, _ in results.values() if status == outbox.STATUS_UNKNOWN)
+        self.log(f"一括送信が完了しました（成功 {len(sent)}件 / 失敗 {len(failed)}件）", "emphasis")
+        if queued:
+            self.log(f"-> 失敗したうち{queued}件は送信待ちにしました。接続が回復すると自動で送信します。", "emphasis")
+        if unknown:
+            self.log(f"-> {unknown}件は送信結果を確認できませんでした。届いているか確認してから、個別に「メール送信」を押してください。", "emphasis")
+        if failed:
+            first_error = next(iter(failed.values())) or "メール送信に失敗しました。詳細はログを確認してください。"
+            self.show_email_send_error(f"{len(failed)}件の仕入先に送信できませんでした。\n{first_error}")
+        if not sent:
+            self.q.put(("task_complete", None))
+            return
+        
+        if messagebox.askyesno("Notion更新確認", f"{len(sent)}件の仕入先へメール送信が完了しました。\n\nNotionページの「発注日」を更新しますか？"):
+            self.log(f"{len(sent)}件の仕入先のNotionページを更新中...")
+            threading.Thread(target=self.run_thread, args=(self.update_notion_task, sent_entry_ids)).start()
+        else:
+            outbox.request_notion_update(sent_entry_ids, update=False)
+            self.mark_suppliers_as_sent(sent, updated=False)
+    
+    def show_outbox_event(self, kind: str, entry: outbox.OutboxEntry, error_message: Optional[str]) -> None:
+        """送信待ちキューのバックグラウンド処理の結果を表示する"""
+        if kind == "sent":
+            self.log(f"✓ 送信待ちだった「{entry.supplier_name}」へのメールを送信しました。")
+            if entry.supplier_name in self.orders_by_supplier:
+                self.sent_suppliers.add(entry.supplier_name)
+                self.middle_pane.mark_supplier_as_sent(entry.supplier_name)
+        elif kind == "failed":
+            self.log(f"✗ 送信待ちだった「{entry.supplier_name}」へのメールを送信できませんでした: {error_message}", "error")
+        elif kind == "unknown":
+            self.log(f"⚠ 送信待ちだった「{entry.supplier_name}」へのメールは送信結果を確認できませんでした。届いているか確認してから「メール送信」を押してください。", "error")
+        elif kind == "notion_updated":
+            self.log(f"✓ 「{entry.supplier_name}」のNotionページの「発注日」を更新しました。")
+        elif kind == "retry":
+            logger.info(f"送信待ちの「{entry.supplier_name}」へのメールを後で再送します: {error_message}")
+    
     def mark_as_sent(self, supplier: str, updated: bool = True) -> None:
         """仕入先を送信済みとしてマークする"""
-        self.sent_suppliers.add(supplier)
-        self.middle_pane.mark_supplier_as_sent(supplier)
+        self.mark_suppliers_as_sent([supplier], updated)
+    
+    def mark_suppliers_as_sent(self, suppliers: List[str], updated: bool = True) -> None:
+        """複数の仕入先を送信済みとしてマークする"""
+        for supplier in suppliers:
+            self.sent_suppliers.add(supplier)
+            self.middle_pane.mark_supplier_as_sent(supplier)
+            self.log(f"-> 「{supplier}」は送信済みとしてマークされました。({'更新済み' if updated else '更新スキップ'})")
         self.clear_preview()
-        self.log(f"-> 「{supplier}」は送信済みとしてマークされました。({'更新済み' if updated else '更新スキップ'})")
         self.q.put(("task_complete", None))
     
     def clear_displays(self) -> None:
@@ -625,6 +1125,9 @@ class Application(ttk.Frame):
     
     def reset_temp_storage(self) -> None:
         """一時PDFストレージディレクトリをリセットする"""
+        if self.pdf_scheduler:
+            self.pdf_scheduler.close(wait=False)
+            self.pdf_scheduler = None
         try:
             if self.temp_dir:
                 self.temp_dir.cleanup()
@@ -632,17 +1135,26 @@ class Application(ttk.Frame):
             pass
         self.temp_dir = tempfile.TemporaryDirectory()
         self.pregenerated_pdfs = {}
+        self.prepared_mails = {}
     
     def cleanup(self) -> None:
         """アプリケーション終了時にリソースをクリーンアップする"""
+        self.outbox_worker.stop()
+        if self.pdf_scheduler:
+            self.pdf_scheduler.close(wait=False)
+        if self.pdf_process_pool:
+            self.pdf_process_pool.close()
         try:
             self.temp_dir.cleanup()
         except Exception:
             pass
+        self.notion_loop.close()
     
     def toggle_buttons(self, enabled: bool) -> None:
         """ボタンの有効/無効を切り替える"""
         self.top_pane.toggle_buttons(enabled)
+        can_send = enabled and self.orders_by_supplier and not self.data_is_stale
+        self.send_all_button.config(state="normal" if can_send else "disabled")
     
     def reload_ui_after_settings_change(self, message: Optional[str] = None) -> None:
         """設定変更後にUIをリロードする"""
@@ -1,21 +1,31 @@
-﻿import smtplib
+﻿import base64
+import smtplib
 import os
+import re
+import threading
+import uuid
+from concurrent.futures import Future
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from email.utils import parseaddr
-from typing import Dict, Any, Optional, List, Tuple
+from email.utils import make_msgid, parseaddr
+from typing import BinaryIO, Callable, Dict, Any, Iterator, NamedTuple, Optional, List, Tuple, Union
 
 import config
 import keyring
 from keyring.errors import KeyringError
 import logger_config
+import smtp_pool
 
 SERVICE_NAME = "NotionOrderApp"
 
 # ロガーの取得
 logger = logger_config.get_logger(__name__)
 
+# 送信者アドレスごとのパスワード（アプリ起動中のみメモリに保持し、OSの資格情報ストアへの問い合わせを省く）
+_password_cache: Dict[str, str] = {}
+_password_cache_lock = threading.Lock()
+
 
 def _sanitize_header(value: str) -> str:
     return value.splitlines()[0].strip()
@@ -34,14 +44,474 @@ def _extract_addresses(value: str) -> List[str]:
     return addresses
 
 
+class MailBuildError(Exception):
+    """メールを組み立てられない場合の例外（メッセージはユーザー向け）"""
+
+
+class DeliveryUnknownError(smtplib.SMTPException):
+    """メッセージの終端を送った後に応答を受け取れず、サーバーが受け付けたか分からない場合の例外"""
+
+
+def _build_message_without_attachment(
+    info: Dict[str, Any],
+    sender_email: str,
+    account_name: str,
+    selected_department: Optional[str] = None,
+    guidance_numbers: Optional[Dict[str, str]] = None
+) -> Tuple[MIMEMultipart, List[str]]:
+    """注文メールのヘッダーと本文を組み立てる（PDFは添付しない）"""
+    msg = MIMEMultipart()
+    msg["From"] = sender_email
+    # 保存したメッセージを再送した場合も同じIDになるため、受信側で重複を見分けられる
+    msg["Message-ID"] = make_msgid(domain=sender_email.rpartition("@")[2] or None)
+
+    raw_to = (info.get("email") or "").strip()
+    raw_cc = (info.get("email_cc") or "").strip()
+
+    to_header = _sanitize_header(raw_to) if raw_to else ""
+    cc_header = _sanitize_header(raw_cc) if raw_cc else ""
+
+    to_addresses = _extract_addresses(to_header) if to_header else []
+    cc_addresses = _extract_addresses(cc_header) if cc_header else []
+
+    if not to_addresses:
+        raise MailBuildError("宛先メールアドレスが設定されていません。")
+
+    msg["To"] = ", ".join(to_addresses)
+    if cc_addresses:
+        msg["Cc"] = ", ".join(cc_addresses)
+
+    template = config.AppConstants.EMAIL_TEMPLATE
+    company = config.AppConstants.COMPANY_INFO
+    msg["Subject"] = template['subject']
+
+    # 発注担当情報の作成（デジタルイノベーション推進部の場合は改行）
+    if selected_department:
+        if selected_department == "デジタルイノベーション推進部":
+            # 部署名と担当者名を2行に分ける（「発注担当： 」の位置に合わせるため、全角10文字分のスペース）
+            order_contact = f"発注担当： {selected_department}\n{' ' * 20}{account_name}"
+        else:
+            order_contact = f"{selected_department} {account_name}"
+    else:
+        order_contact = account_name
+
+    if guidance_numbers is None:
+        guidance_numbers = config.load_department_guidance_numbers()
+    raw_guidance = guidance_numbers.get(selected_department, "")
+    guidance_number = "".join(filter(str.isdigit, raw_guidance))
+    tel_line = f"TEL: {company['tel_base']}" + (f"（ガイダンス{guidance_number}番）" if guidance_number else "")
+
+    body = (
+        f"{info['supplier_name']}\n"
+        f"{info.get('sales_contact', 'ご担当者')} 様\n\n"
+        f"{template['greeting']}\n"
+        f"{template['body']}\n\n"
+        "∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝\n"
+        f"{company['name']}\n"
+        f"{order_contact if selected_department == 'デジタルイノベーション推進部' else f'発注担当： {order_contact}'}\n"
+        f"{company['postal_code']} {company['address']}\n"
+        f"Email: {sender_email}\n"
+        f"{tel_line}\n"
+        f"URL: {company['url']}\n"
+        "∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝"
+    )
+    msg.attach(MIMEText(body, 'plain'))
+
+    return msg, to_addresses + cc_addresses
+
+
+def _attachment_part(pdf_path: str, data: bytes) -> MIMEApplication:
+    """PDFの添付パートを作成する"""
+    part = MIMEApplication(data, Name=os.path.basename(pdf_path))
+    part['Content-Disposition'] = f'attachment; filename="{os.path.basename(pdf_path)}"'
+    return part
+
+
+def build_order_message(
+    info: Dict[str, Any],
+    pdf_path: str,
+    sender_email: str,
+    account_name: str,
+    selected_department: Optional[str] = None,
+    guidance_numbers: Optional[Dict[str, str]] = None
+) -> Tuple[MIMEMultipart, List[str]]:
+    """
+    PDFを添付した注文メールを組み立てる
+
+    Args:
+        guidance_numbers: 部署ごとのガイダンス番号（省略時は設定から読み込む）
+
+    Returns:
+        (メッセージ, 宛先アドレスのリスト（To + Cc）)
+
+    Raises:
+        MailBuildError: 宛先が設定されていない場合
+    """
+    msg, recipients = _build_message_without_attachment(
+        info, sender_email, account_name, selected_department, guidance_numbers
+    )
+    with open(pdf_path, 'rb') as f:
+        msg.attach(_attachment_part(pdf_path, f.read()))
+    return msg, recipients
+
+
+# 一度に読み込んでbase64に変換する添付ファイルのサイズ（57バイト = base64の1行76文字分の倍数）
+_ATTACHMENT_CHUNK_BYTES = 57 * 1024
+
+# SMTPのDATAで行頭の "." をエスケープするためのパターン
+_LEADING_DOT_PATTERN = re.compile(rb"(?m)^\.")
+
+# SMTPのDATAとして順に書き込むメッセージの断片を、送信のたびに作り直す関数（再送時は最初から作り直す）
+MessageStream = Callable[[], Iterator[bytes]]
+
+
+def stream_order_message(
+    info: Dict[str, Any],
+    pdf_path: str,
+    sender_email: str,
+    account_name: str,
+    selected_department: Optional[str] = None,
+    guidance_numbers: Optional[Dict[str, str]] = None
+) -> Tuple[MessageStream, List[str]]:
+    """
+    PDFを添付した注文メールを、添付ファイルを少しずつbase64に変換しながら出力するストリームとして組み立てる
+
+    PDF全体・base64変換後のデータ・メッセージ全体の文字列を同時にメモリに置かないため、大きな添付ファイルに使う。
+    出力する断片は全て行単位（CRLFで終わる）のため、SMTPのドット・スタッフィングを断片ごとに行える。
+
+    Returns:
+        (メッセージのストリーム, 宛先アドレスのリスト（To + Cc）)
+
+    Raises:
+        MailBuildError: 宛先が設定されていない場合
+    """
+    msg, recipients = _build_message_without_attachment(
+        info, sender_email, account_name, selected_department, guidance_numbers
+    )
+    policy = msg.policy.clone(linesep="\r\n")
+    boundary = f"==============={uuid.uuid4().hex}=="
+    msg.set_boundary(boundary)
+    closing = f"--{boundary}--".encode("ascii")
+    # 本文パートまでを出力し、終端の境界の代わりに添付パートを続ける
+    head = msg.as_bytes(policy=policy).rpartition(closing)[0]
+    part_headers = _attachment_part(pdf_path, b"").as_bytes(policy=policy).split(b"\r\n\r\n", 1)[0]
+
+    def chunks() -> Iterator[bytes]:
+        with open(pdf_path, 'rb') as f:
+            yield head
+            yield f"--{boundary}\r\n".encode("ascii") + part_headers + b"\r\n\r\n"
+            while True:
+                data = f.read(_ATTACHMENT_CHUNK_BYTES)
+                if not data:
+                    break
+                yield base64.encodebytes(data).replace(b"\n", b"\r\n")
+            yield closing + b"\r\n"
+
+    return chunks, recipients
+
+
+def _send_message_stream(server: smtplib.SMTP, sender_email: str, recipients: List[str], stream: MessageStream) -> None:
+    """
+    smtplib.SMTP.sendmail と同じ手順で、メッセージを断片ごとにDATAへ書き込んで送信する
+
+    Raises:
+        smtplib.SMTPException: サーバーが送信者・全ての宛先・メッセージを拒否した場合
+        DeliveryUnknownError: メッセージの終端を送った後に応答を受け取れなかった場合
+    """
+    server.ehlo_or_helo_if_needed()
+    code, response = server.mail(sender_email)
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, response, sender_email)
+    refused = {}
+    for recipient in recipients:
+        code, response = server.rcpt(recipient)
+        if code not in (250, 251):
+            refused[recipient] = (code, response)
+    if len(refused) == len(recipients):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+    if refused:
+        logger.warning(f"一部の宛先がサーバーに拒否されました: {refused}")
+
+    code, response = server.docmd("data")
+    if code != 354:
+        server.rset()
+        raise smtplib.SMTPDataError(code, response)
+    for chunk in stream():
+        # 行頭の "." を ".." にする（smtplib.SMTP.data と同じ処理）
+        server.send(_LEADING_DOT_PATTERN.sub(b"..", chunk))
+    try:
+        server.send(b".\r\n")
+        code, response = server.getreply()
+    except OSError as e:
+        # 終端を送った後の切断は、サーバーが受け付けてから切れた可能性がある
+        raise DeliveryUnknownError(f"送信結果を確認できませんでした（サーバーが受け付けた可能性があります）: {e}") from e
+    if code != 250:
+        raise smtplib.SMTPDataError(code, response)
+
+# 送信するメッセージ（CRLF改行でシリアライズ済みのバイト列・ストリームのいずれか）
+MessagePayload = Union[bytes, MessageStream]
+
+
+def _deliver(server: smtplib.SMTP, sender_email: str, recipients: List[str], message: MessagePayload) -> None:
+    """
+    メッセージの形式に応じて送信する
+
+    どちらの形式も _send_message_stream で送り、終端を送った後の失敗を DeliveryUnknownError として区別する。
+    """
+    if not callable(message):
+        data = message if message.endswith(b"\r\n") else message + b"\r\n"
+        message = lambda: iter([data])
+    _send_message_stream(server, sender_email, recipients, message)
+
+
+class PreparedMail(NamedTuple):
+    """送信直前の形まで組み立てたメール（SMTPのDATAとしてそのまま送れるバイト列）"""
+    sender_email: str
+    pdf_path: str
+    selected_department: Optional[str]
+    recipients: List[str]
+    message: bytes
+
+    def matches(self, pdf_path: str, sender_email: Optional[str], selected_department: Optional[str]) -> bool:
+        """同じPDF・送信者・部署で組み立てたメールかどうか"""
+        return (
+            self.pdf_path == pdf_path
+            and self.sender_email == sender_email
+            and self.selected_department == selected_department
+        )
+
+
+def prepare_order_mail(
+    info: Dict[str, Any],
+    pdf_path: str,
+    sender_email: str,
+    account_name: str,
+    selected_department: Optional[str] = None,
+    guidance_numbers: Optional[Dict[str, str]] = None
+) -> Optional[PreparedMail]:
+    """
+    注文メールを組み立ててシリアライズしておく（PDFの事前生成の直後に呼ぶ）
+    送信時はSMTPの送信処理だけを行えばよい
+    添付ファイルが大きくストリームで送信する場合は、メモリに保持しないためNoneを返す
+
+    Raises:
+        MailBuildError: 宛先が設定されていない場合
+    """
+    if _should_stream(pdf_path):
+        return None
+    msg, recipients = build_order_message(
+        info, pdf_path, sender_email, account_name, selected_department, guidance_numbers
+    )
+    message = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+    return PreparedMail(sender_email, pdf_path, selected_department, recipients, message)
+
+
+def _should_stream(pdf_path: str) -> bool:
+    """添付ファイルが大きく、メモリに展開せずストリームで送信すべきかどうか"""
+    try:
+        return os.path.getsize(pdf_path) >= config.AppConstants.MAIL_STREAM_ATTACHMENT_BYTES
+    except OSError:
+        # サイズが分からない場合は従来どおり組み立てる（ファイルが無ければそこでエラーになる）
+        return False
+
+
+def _resolve_message(
+    prepared: Optional[PreparedMail],
+    info: Dict[str, Any],
+    pdf_path: str,
+    sender_email: str,
+    account_name: str,
+    selected_department: Optional[str]
+) -> Tuple[List[str], MessagePayload]:
+    """
+    組み立て済みのメールが使えればそれを、使えなければその場で組み立てた (宛先, メッセージ) を返す
+    添付ファイルが大きい場合はストリームを返す
+    """
+    if prepared is None or not prepared.matches(pdf_path, sender_email, selected_department):
+        prepared = prepare_order_mail(info, pdf_path, sender_email, account_name, selected_department)
+    if prepared is not None:
+        return prepared.recipients, prepared.message
+    stream, recipients = stream_order_message(info, pdf_path, sender_email, account_name, selected_department)
+    return recipients, stream
+
+
+def write_order_message(
+    f: BinaryIO,
+    info: Dict[str, Any],
+    pdf_path: str,
+    sender_email: str,
+    account_name: str,
+    selected_department: Optional[str] = None,
+    prepared: Optional[PreparedMail] = None
+) -> List[str]:
+    """
+    注文メールをCRLF区切りのバイト列としてファイルに書き込む（送信待ちキューへの保存に使う）
+    添付ファイルが大きい場合は、メモリに展開せず少しずつ書き込む
+
+    Returns:
+        宛先アドレスのリスト（To + Cc）
+
+    Raises:
+        MailBuildError: 宛先が設定されていない場合
+    """
+    if prepared is not None and prepared.matches(pdf_path, sender_email, selected_department):
+        f.write(prepared.message)
+        return prepared.recipients
+    if _should_stream(pdf_path):
+        stream, recipients = stream_order_message(info, pdf_path, sender_email, account_name, selected_department)
+        for chunk in stream():
+            f.write(chunk)
+        return recipients
+    msg, recipients = build_order_message(info, pdf_path, sender_email, account_name, selected_department)
+    f.write(msg.as_bytes(policy=msg.policy.clone(linesep="\r\n")))
+    return recipients
+
+
+def file_message_stream(path: str) -> MessageStream:
+    """
+    write_order_message で保存したメッセージを、行単位の断片として読み出すストリームを返す
+    """
+    def chunks() -> Iterator[bytes]:
+        with open(path, 'rb') as f:
+            lines: List[bytes] = []
+            size = 0
+            last = b""
+            for line in f:
+                lines.append(line)
+                size += len(line)
+                last = line
+                if size >= _ATTACHMENT_CHUNK_BYTES:
+                    yield b"".join(lines)
+                    lines, size = [], 0
+            if lines:
+                yield b"".join(lines)
+            if not last.endswith(b"\r\n"):
+                # DATAの終端（"." の行）の前は必ず改行で終える
+                yield b"\r\n"
+    return chunks
+
+
+def _describe_send_error(error: Exception) -> str:
+    """送信時の例外をログに残し、ユーザー向けのメッセージを返す"""
+    if isinstance(error, MailBuildError):
+        logger.error(str(error))
+        return str(error)
+    if isinstance(error, DeliveryUnknownError):
+        logger.warning(str(error))
+        return str(error)
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        message = "SMTP認証に失敗しました。ログイン情報を確認してください。"
+        logger.error(f"{message} - {error}", exc_info=error)
+        return message
+    if isinstance(error, (smtplib.SMTPConnectError, ConnectionRefusedError, OSError)):
+        message = f"SMTPサーバー({config.SMTP_SERVER}:{config.SMTP_PORT})に接続できません。"
+        logger.error(f"{message} - {error}", exc_info=error)
+        return f"{message} 詳細: {error}"
+    message = "予期せぬエラーが発生しました"
+    logger.error(f"{message}: {error}", exc_info=error)
+    return f"{message}: {error}"
+
+
+class SmtpSession:
+    """
+    ログイン済みのSMTP接続を複数のメール送信で使い回すセッション
+
+    接続とTLSハンドシェイク・ログインは最初の送信時に1回だけ行う。
+    メッセージの終端を送る前に接続が切れた場合は、接続し直して同じメールを再送する
+    （終端を送った後に切れた場合は、二重送信を防ぐため再送しない）。
+    """
+
+    def __init__(self, sender_email: str, password: str, reconnect_attempts: Optional[int] = None) -> None:
+        self.sender_email = sender_email
+        self.password = password
+        self.reconnect_attempts = (
+            config.AppConstants.SMTP_RECONNECT_ATTEMPTS if reconnect_attempts is None else reconnect_attempts
+        )
+        self._server: Optional[smtplib.SMTP] = None
+
+    def __enter__(self) -> "SmtpSession":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT)
+        try:
+            server.starttls()
+            server.login(self.sender_email, self.password)
+        except Exception:
+            server.close()
+            raise
+        logger.debug(f"SMTPサーバーに接続しました: {config.SMTP_SERVER}:{config.SMTP_PORT}")
+        return server
+
+    def sendmail(self, recipients: List[str], message: MessagePayload) -> None:
+        """
+        メールを送信する（接続が切れていた場合は接続し直す）
+
+        認証エラーやサーバーが宛先を拒否した場合は再試行せずに例外を送出する。
+
+        Raises:
+            DeliveryUnknownError: メッセージの終端を送った後に接続が切れ、送信されたか分からない場合
+        """
+        attempt = 0
+        while True:
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                _deliver(self._server, self.sender_email, recipients, message)
+                return
+            except DeliveryUnknownError:
+                # サーバーが受け付けた可能性があるため、再送せずに呼び出し元に判断を任せる
+                self._discard()
+                raise
+            except OSError as e:
+                # SMTPExceptionもOSErrorのサブクラスのため、切断以外のSMTPエラー（宛先拒否など）は再送しない
+                if isinstance(e, smtplib.SMTPException) and not isinstance(e, smtplib.SMTPServerDisconnected):
+                    raise
+                self._discard()
+                if attempt >= self.reconnect_attempts:
+                    raise
+                attempt += 1
+                logger.warning(f"SMTP接続が切断されたため再接続します ({attempt}/{self.reconnect_attempts}): {e}")
+
+    def _discard(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        """接続を終了する"""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
 def send_smtp_mail(
     info: Dict[str, Any],
     pdf_path: str,
     sender_creds: Dict[str, Any],
     account_name: str,
-    selected_department: Optional[str] = None
+    selected_department: Optional[str] = None,
+    prepared: Optional[PreparedMail] = None
 ) -> Tuple[bool, Optional[str]]:
-    """SMTPサーバー経由でPDF添付メールを送信する"""
+    """
+    SMTPサーバー経由でPDF添付メールを送信する（送信待ちキューを通さずに1通だけ送る場合に使う）
+    prepared に同じPDF・送信者・部署で組み立て済みのメールを渡した場合は、組み立てを省略する
+    """
     try:
         sender_email = sender_creds.get("sender")
         password = sender_creds.get("password")
@@ -51,130 +521,104 @@ def send_smtp_mail(
             logger.error(message)
             return False, message
 
-        msg = MIMEMultipart()
-        msg["From"] = sender_email
-
-        raw_to = (info.get("email") or "").strip()
-        raw_cc = (info.get("email_cc") or "").strip()
+        recipients, message = _resolve_message(prepared, info, pdf_path, sender_email, account_name, selected_department)
+        with SmtpSession(sender_email, password) as session:
+            session.sendmail(recipients, message)
 
-        to_header = _sanitize_header(raw_to) if raw_to else ""
-        cc_header = _sanitize_header(raw_cc) if raw_cc else ""
+        logger.info(f"メール送信成功: {info.get('supplier_name', 'Unknown')} 宛")
+        return True, None
+    except Exception as e:
+        if isinstance(e, smtplib.SMTPAuthenticationError):
+            # パスワードが外部で変更された可能性があるため、次回はOSの資格情報ストアから読み直す
+            invalidate_password_cache(sender_creds.get("sender"))
+        return False, _describe_send_error(e)
 
-        to_addresses = _extract_addresses(to_header) if to_header else []
-        cc_addresses = _extract_addresses(cc_header) if cc_header else []
 
-        if not to_addresses:
-            message = "宛先メールアドレスが設定されていません。"
-            logger.error(message)
-            return False, message
+def invalidate_password_cache(sender_email: Optional[str] = None) -> None:
+    """
+    メモリに保持したパスワードを破棄する（設定画面での保存・変更時に呼ぶ）
 
-        msg["To"] = ", ".join(to_addresses)
-        if cc_addresses:
-            msg["Cc"] = ", ".join(cc_addresses)
-
-        template = config.AppConstants.EMAIL_TEMPLATE
-        company = config.AppConstants.COMPANY_INFO
-        msg["Subject"] = template['subject']
-
-        # 発注担当情報の作成（デジタルイノベーション推進部の場合は改行）
-        if selected_department:
-            if selected_department == "デジタルイノベーション推進部":
-                # 部署名と担当者名を2行に分ける（「発注担当： 」の位置に合わせるため、全角10文字分のスペース）
-                order_contact = f"発注担当： {selected_department}\n{' ' * 20}{account_name}"
-            else:
-                order_contact = f"{selected_department} {account_name}"
+    Args:
+        sender_email: 破棄する送信者アドレス（省略時は全て破棄する）
+    """
+    with _password_cache_lock:
+        if sender_email is None:
+            _password_cache.clear()
         else:
-            order_contact = account_name
+            _password_cache.pop(sender_email, None)
 
-        guidance_numbers = config.load_department_guidance_numbers()
-        raw_guidance = guidance_numbers.get(selected_department, "")
-        guidance_number = "".join(filter(str.isdigit, raw_guidance))
-        tel_line = f"TEL: {company['tel_base']}" + (f"（ガイダンス{guidance_number}番）" if guidance_number else "")
-
-        body = (
-            f"{info['supplier_name']}\n"
-            f"{info.get('sales_contact', 'ご担当者')} 様\n\n"
-            f"{template['greeting']}\n"
-            f"{template['body']}\n\n"
-            "∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝\n"
-            f"{company['name']}\n"
-            f"{order_contact if selected_department == 'デジタルイノベーション推進部' else f'発注担当： {order_contact}'}\n"
-            f"{company['postal_code']} {company['address']}\n"
-            f"Email: {sender_creds['sender']}\n"
-            f"{tel_line}\n"
-            f"URL: {company['url']}\n"
-            "∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝∝"
-        )
-        msg.attach(MIMEText(body, 'plain'))
 
-        with open(pdf_path, 'rb') as f:
-            part = MIMEApplication(f.read(), Name=os.path.basename(pdf_path))
-        part['Content-Disposition'] = f'attachment; filename="{os.path.basename(pdf_path)}"'
-        msg.attach(part)
+def _get_password(sender_email: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    送信者のパスワードを取得する
+    初回のみOSの資格情報ストアから読み込み、以降はメモリに保持した値を返す
 
-        with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-            server.starttls()
-            server.login(sender_email, password)
-            recipients = to_addresses + cc_addresses
-            server.sendmail(sender_email, recipients, msg.as_string())
-        
-        logger.info(f"メール送信成功: {info.get('supplier_name', 'Unknown')} 宛")
-        return True, None
-    except smtplib.SMTPAuthenticationError as e:
-        message = "SMTP認証に失敗しました。ログイン情報を確認してください。"
-        logger.error(f"{message} - {e}", exc_info=True)
-        return False, message
-    except (smtplib.SMTPConnectError, ConnectionRefusedError, OSError) as e:
-        message = f"SMTPサーバー({config.SMTP_SERVER}:{config.SMTP_PORT})に接続できません。"
-        logger.error(f"{message} - {e}", exc_info=True)
-        return False, f"{message} 詳細: {e}"
-    except Exception as e:
-        message = "予期せぬエラーが発生しました"
-        logger.error(f"{message}: {e}", exc_info=True)
-        return False, f"{message}: {e}"
-
-
-def prepare_and_send_order_email(
-    account_key: str,
-    sender_creds: Dict[str, Any],
-    items: List[Dict[str, Any]],
-    pdf_path: str,
-    selected_department: Optional[str] = None
-) -> Tuple[bool, Optional[str]]:
-    """UIからの情報をもとにメール送信の準備と実行を行う"""
-    sender_email = sender_creds.get("sender")
-    display_name = sender_creds.get("display_name", account_key)
+    Returns:
+        (パスワード, エラーメッセージ)
+    """
+    with _password_cache_lock:
+        password = _password_cache.get(sender_email or "")
+    if password:
+        return password, None
 
     try:
         password = keyring.get_password(SERVICE_NAME, sender_email or "")
     except KeyringError as err:
         message = f"OSの資格情報ストアにアクセスできませんでした ({err})."
         logger.error(message, exc_info=True)
-        return False, message
+        return None, message
     if not password:
         message = f"{sender_email} のパスワードがOSに保存されていません。"
         logger.error(message)
-        return False, message
+        return None, message
+    with _password_cache_lock:
+        _password_cache[sender_email or ""] = password
+    return password, None
 
-    creds_with_pass = sender_creds.copy()
-    creds_with_pass["password"] = password
 
+def _check_order(items: List[Dict[str, Any]], pdf_path: Optional[str]) -> Optional[str]:
+    """送信前に注文アイテムと添付PDFを確認し、問題があればエラーメッセージを返す"""
     if not items:
         message = "対象アイテムがありません。"
         logger.error(message)
-        return False, message
+        return message
     if not pdf_path or not os.path.exists(pdf_path):
         message = f"添付するPDFファイルが見つかりません: {pdf_path}"
         logger.error(message)
-        return False, message
+        return message
+    return None
+
+
+def prepare_and_send_order_email(
+    account_key: str,
+    sender_creds: Dict[str, Any],
+    items: List[Dict[str, Any]],
+    pdf_path: str,
+    selected_department: Optional[str] = None,
+    prepared: Optional[PreparedMail] = None
+) -> Tuple[bool, Optional[str]]:
+    """UIからの情報をもとにメール送信の準備と実行を行う（prepared は組み立て済みのメール）"""
+    sender_email = sender_creds.get("sender")
+    display_name = sender_creds.get("display_name", account_key)
+
+    password, error_message = _get_password(sender_email)
+    if not password:
+        return False, error_message
+
+    creds_with_pass = sender_creds.copy()
+    creds_with_pass["password"] = password
+
+    error_message = _check_order(items, pdf_path)
+    if error_message:
+        return False, error_message
 
-    supplier_name = items[0].get("supplier_name", "")
     success, error_message = send_smtp_mail(
         info=items[0],
         pdf_path=pdf_path,
         sender_creds=creds_with_pass,
         account_name=display_name,
-        selected_department=selected_department
+        selected_department=selected_department,
+        prepared=prepared
     )
 
     if success:
@@ -182,3 +626,95 @@ def prepare_and_send_order_email(
 
     detail = error_message or "送信に失敗しました"
     return False, detail
+
+
+class OrderMail(NamedTuple):
+    """一括送信・送信待ちキューへの記録に使う1仕入先分の注文メール"""
+    supplier_name: str
+    items: List[Dict[str, Any]]
+    pdf_path: str
+    selected_department: Optional[str] = None
+    prepared: Optional[PreparedMail] = None
+
+
+MailResultCallback = Callable[[str, bool, Optional[str]], None]
+
+
+def prepare_and_send_order_emails(
+    account_key: str,
+    sender_creds: Dict[str, Any],
+    orders: List[OrderMail],
+    on_result: Optional[MailResultCallback] = None
+) -> Dict[str, Tuple[bool, Optional[str]]]:
+    """
+    複数の仕入先宛の注文メールを、送信プールの常時接続のSMTPセッションでまとめて送信する
+
+    各セッションの接続・TLS・ログインは1回だけ行い、サーバーごとの送信数上限（smtp_limits）を守って送信する。
+    接続が切れた場合は接続し直して続ける。SMTP認証に失敗した場合は、残りのメールも送信できないため中止する。
+    on_result はワーカースレッドから呼ばれ、結果の順序は送信の完了順になる。
+
+    Args:
+        account_key: 送信者アカウントのキー
+        sender_creds: 送信者アカウントの設定
+        orders: 送信する注文メールのリスト
+        on_result: 1仕入先の送信が終わるたびに (仕入先名, 成功したか, エラーメッセージ) で呼ばれる関数
+
+    Returns:
+        仕入先名 -> (成功したか, エラーメッセージ)
+    """
+    results: Dict[str, Tuple[bool, Optional[str]]] = {}
+    results_lock = threading.Lock()
+
+    def report(supplier_name: str, success: bool, error_message: Optional[str]) -> None:
+        with results_lock:
+            results[supplier_name] = (success, error_message)
+        if on_result:
+            on_result(supplier_name, success, error_message)
+
+    sender_email = sender_creds.get("sender")
+    display_name = sender_creds.get("display_name", account_key)
+
+    password, error_message = _get_password(sender_email)
+    if not password:
+        for order in orders:
+            report(order.supplier_name, False, error_message)
+        return results
+
+    # 認証エラーは全てのセッションで同じ結果になるため、最初に発生した時点で残りの送信を取り消す
+    auth_errors: List[str] = []
+    futures: List[Tuple[OrderMail, Future]] = []
+
+    def make_job(order: OrderMail) -> Callable[[SmtpSession], None]:
+        def job(session: SmtpSession) -> None:
+            try:
+                recipients, message = _resolve_message(
+                    order.prepared, order.items[0], order.pdf_path, sender_email, display_name, order.selected_department
+                )
+                session.sendmail(recipients, message)
+            except smtplib.SMTPAuthenticationError as e:
+                invalidate_password_cache(sender_email)
+                error_message = _describe_send_error(e)
+                auth_errors.append(error_message)
+                pool.cancel_pending()
+                report(order.supplier_name, False, error_message)
+                return
+            except Exception as e:
+                report(order.supplier_name, False, _describe_send_error(e))
+                return
+            logger.info(f"メール送信成功: {order.supplier_name} 宛")
+            report(order.supplier_name, True, None)
+        return job
+
+    with smtp_pool.create_pool(lambda: SmtpSession(sender_email, password)) as pool:
+        for order in orders:
+            error_message = _check_order(order.items, order.pdf_path)
+            if error_message:
+                report(order.supplier_name, False, error_message)
+                continue
+            futures.append((order, pool.submit(make_job(order))))
+
+    for order, future in futures:
+        if future.cancelled():
+            report(order.supplier_name, False, auth_errors[0] if auth_errors else "送信を中止しました。")
+
+    return results
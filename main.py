@@ -1,8 +1,10 @@
 import tkinter as tk
 from tkinter import messagebox
+import multiprocessing
 import os
 import sys
 import config
+import pdf_generator
 from controllers.app_controller import Application
 from version import APP_NAME, APP_VERSION
 
@@ -45,6 +47,9 @@ def main():
         root.destroy()
         return # アプリケーションを終了
 
+    # ウィンドウ表示と並行して日本語フォントを読み込んでおく
+    pdf_generator.preload_font_in_background()
+
     # 検証が成功した場合のみGUIを起動
     root = tk.Tk()
     root.title(f"{APP_NAME}  {APP_VERSION}")
@@ -63,4 +68,6 @@ def main():
     app.mainloop()
 
 if __name__ == '__main__':
+    # PyInstallerでビルドした実行ファイルからPDF生成プロセスを起動するために必要
+    multiprocessing.freeze_support()
     main()
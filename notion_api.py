@@ -1,9 +1,10 @@
 import concurrent.futures
+import json
 import threading
 import time
 from collections import defaultdict
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
 import notion_client
 from notion_client import Client
@@ -11,14 +12,49 @@ from notion_client import Client
 import config
 import logger_config
 import cache_manager
+import rate_limiter
+import retry_policy
+import supplier_store
 
 # ロガーの取得
 logger = logger_config.get_logger(__name__)
 
-_NOTION_LOCK = threading.Lock()
+# 全スレッド共通のレートリミッター（リクエスト同士の通信待ちは重ね合わせ、平均速度だけを制限する）
+NOTION_RATE_LIMITER = rate_limiter.TokenBucket(
+    rate=config.AppConstants.NOTION_RATE_LIMIT_PER_SEC,
+    capacity=config.AppConstants.NOTION_RATE_LIMIT_BURST,
+)
+# 429はRetry-Afterに従い、5xx・通信エラーは指数バックオフで再試行する
+NOTION_RETRY_POLICY = retry_policy.RetryPolicy(
+    max_attempts=config.AppConstants.NOTION_MAX_ATTEMPTS,
+    base_delay=config.AppConstants.NOTION_API_DELAY,
+    max_delay=config.AppConstants.NOTION_RETRY_MAX_DELAY,
+)
 _NOTION_CLIENT: Optional[Client] = None
 _NOTION_TOKEN: Optional[str] = None
 
+# 増分同期用のローカルスナップショット（データベース＋取得条件ごと）
+# {"pages": {page_id: 注文レコード}, "watermark": ISO8601, "full_synced_at": epoch秒}
+_SYNC_SNAPSHOTS: Dict[str, Dict[str, Any]] = {}
+_SYNC_LOCK = threading.Lock()
+# 仕入先キャッシュの再検証を同時に1つだけ実行するためのロック
+_SUPPLIER_REFRESH_LOCK = threading.Lock()
+
+# 注文・仕入先ページから読み取るプロパティ（filter_properties でこれだけを取得する）
+ORDER_PROPERTIES = ("注文ステータス", "部署名", "メーカー名", "品番", "数量", "備考", "DB_仕入先リスト", "発注日")
+SUPPLIER_PROPERTIES = ("仕入先名", "営業担当者名", "メール", "メールCC")
+# 増分同期で対象ページIDを確認する際に取得するプロパティ（レスポンスを小さくするため最小限にする）
+MEMBERSHIP_PROPERTIES = ("注文ステータス",)
+# データベースごとのプロパティ名 -> プロパティID（filter_properties はIDで指定する）
+_PROPERTY_IDS: Dict[str, Dict[str, str]] = {}
+_PROPERTY_IDS_LOCK = threading.Lock()
+# スナップショットから注文レコードを返す際のバッチサイズ（Notionの1ページ分と揃える）
+ORDER_BATCH_SIZE = 100
+
+
+class NotionAPIError(Exception):
+    """Notion からデータを完全に取得できなかった場合の例外（途中までの結果は返さない）"""
+
 
 def _get_notion_client() -> Client:
     """
@@ -32,6 +68,22 @@ def _get_notion_client() -> Client:
     return _NOTION_CLIENT
 
 
+def _call_notion(func: Callable[..., Any], **kwargs: Any) -> Any:
+    """
+    レートリミッターのトークンを取得してから Notion API を呼び出す。
+    一時的なエラーはリトライポリシーに従って再試行する（試行ごとにトークンを取得）。
+
+    Raises:
+        retry_policy.RetryExhaustedError: 一時的なエラーが最大試行回数まで続いた場合
+        Exception: 再試行対象外のエラー（4xxなど）はそのまま送出する
+    """
+    def attempt() -> Any:
+        NOTION_RATE_LIMITER.acquire()
+        return func(**kwargs)
+
+    return NOTION_RETRY_POLICY.call(attempt, description=f"Notion API ({getattr(func, '__name__', 'request')})")
+
+
 def _get_safe_text(prop_list: List[Dict[str, Any]]) -> str:
     """rich_text/title プロパティからテキストを安全に抽出する。"""
     if not prop_list or not isinstance(prop_list, list):
@@ -44,175 +96,766 @@ def _get_safe_email(prop: Optional[Dict[str, Any]]) -> str:
     return (prop or {}).get("email", "")
 
 
+def _get_safe_date(prop: Optional[Dict[str, Any]]) -> str:
+    """date プロパティから開始日（YYYY-MM-DD）を安全に抽出する。"""
+    start = ((prop or {}).get("date") or {}).get("start") or ""
+    return start[:10]
+
+
 def _get_safe_number(prop: Optional[Dict[str, Any]]) -> Union[int, float]:
     """number プロパティから値を安全に抽出する。"""
     return (prop or {}).get("number", 0)
 
 
-def _get_all_pages_from_db(
+def get_cached_property_ids(database_id: str) -> Optional[Dict[str, str]]:
+    """キャッシュ済みのプロパティ名 -> プロパティIDの対応を返す（未取得ならNone）。"""
+    with _PROPERTY_IDS_LOCK:
+        return _PROPERTY_IDS.get(database_id)
+
+
+def cache_property_ids(database_id: str, database: Dict[str, Any]) -> Dict[str, str]:
+    """databases.retrieve の結果からプロパティIDの対応を作り、キャッシュする。"""
+    property_ids = {
+        name: prop["id"] for name, prop in (database.get("properties") or {}).items() if prop.get("id")
+    }
+    with _PROPERTY_IDS_LOCK:
+        _PROPERTY_IDS[database_id] = property_ids
+    return property_ids
+
+
+def select_property_ids(
+    database_id: str,
+    property_ids: Dict[str, str],
+    names: Tuple[str, ...],
+) -> Optional[List[str]]:
+    """
+    filter_properties に指定するプロパティIDのリストを返す。
+
+    Returns:
+        プロパティIDのリスト（1件も見つからない場合はNone = 絞り込まない）
+    """
+    missing = [name for name in names if name not in property_ids]
+    if missing:
+        logger.warning(f"データベースにプロパティが見つかりません (database_id: {database_id}): {', '.join(missing)}")
+    selected = [property_ids[name] for name in names if name in property_ids]
+    return selected or None
+
+
+def _get_property_ids(client: Client, database_id: str, names: Tuple[str, ...]) -> Optional[List[str]]:
+    """
+    指定したプロパティ名に対応するプロパティIDを返す（スキーマはデータベースごとに1回だけ取得する）。
+
+    スキーマを取得できなかった場合はNoneを返し、呼び出し側は全プロパティを取得する。
+    """
+    property_ids = get_cached_property_ids(database_id)
+    if property_ids is None:
+        try:
+            database = _call_notion(client.databases.retrieve, database_id=database_id)
+        except Exception as e:
+            logger.warning(f"データベースのスキーマを取得できませんでした。全プロパティを取得します (database_id: {database_id}): {e}")
+            return None
+        property_ids = cache_property_ids(database_id, database)
+    return select_property_ids(database_id, property_ids, names)
+
+
+def _iter_database_pages(
     client: Client,
     database_id: str,
     filter_params: Optional[Dict[str, Any]] = None,
-) -> List[Dict[str, Any]]:
+    parse: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    properties: Optional[Tuple[str, ...]] = None,
+) -> Iterator[List[Dict[str, Any]]]:
     """
-    指定したデータベースから全ページを取得する。簡易リトライ付き。
+    指定したデータベースのページを、1リクエスト分（最大100件）受け取るたびに返す。
+
+    一時的なエラーは _call_notion 内で再試行する。取得が途中で失敗した場合は
+    NotionAPIError を送出するため、呼び出し側はそれまでに受け取ったバッチを破棄すること
+    （件数の欠落を防ぐため）。
+
+    Args:
+        client: Notionクライアント
+        database_id: 対象データベースID
+        filter_params: クエリのフィルター
+        parse: ページを受け取るたびに必要な項目だけのレコードへ変換する関数（元のページは保持しない）
+        properties: 取得するプロパティ名（filter_properties でレスポンスを絞り込む）
+
+    Raises:
+        NotionAPIError: 全ページを取得できなかった場合
     """
-    all_results: List[Dict[str, Any]] = []
+    fetched_count = 0
     next_cursor: Optional[str] = None
+    property_ids = _get_property_ids(client, database_id, properties) if properties else None
 
     while True:
         query_args: Dict[str, Any] = {"database_id": database_id, "start_cursor": next_cursor}
         if filter_params:
             query_args["filter"] = filter_params
+        if property_ids:
+            query_args["filter_properties"] = property_ids
+
+        try:
+            query_res = _call_notion(client.databases.query, **query_args)
+        except Exception as e:
+            logger.error(
+                f"Notion APIクエリに失敗しました。database_id: {database_id} (取得済み {fetched_count}件): {e}"
+            )
+            raise NotionAPIError(f"Notionからのデータ取得に失敗しました: {e}") from e
 
-        query_res: Optional[Dict[str, Any]] = None
-        for attempt in range(3):
-            try:
-                with _NOTION_LOCK:
-                    query_res = client.databases.query(**query_args)
-                break
-            except Exception as e:
-                logger.warning(f"Notion APIクエリエラー (試行 {attempt + 1}/3): {e}")
-                if attempt == 2:
-                    logger.error(f"Notion APIクエリが3回失敗しました。database_id: {database_id}")
-                    return all_results
-                time.sleep(config.AppConstants.NOTION_API_DELAY * (attempt + 1))
-
-        if not query_res:
-            return all_results
-
-        all_results.extend(query_res.get("results", []))
+        results = query_res.get("results", [])
+        fetched_count += len(results)
+        yield [parse(page) for page in results] if parse else results
         if not query_res.get("has_more"):
             break
         next_cursor = query_res.get("next_cursor")
 
+
+def _get_all_pages_from_db(
+    client: Client,
+    database_id: str,
+    filter_params: Optional[Dict[str, Any]] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    properties: Optional[Tuple[str, ...]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    指定したデータベースから全ページを取得する（_iter_database_pages の結果をまとめたもの）。
+
+    取得が途中で失敗した場合は一部だけの結果を返さずに NotionAPIError を送出する。
+
+    Raises:
+        NotionAPIError: 全ページを取得できなかった場合
+    """
+    all_results: List[Dict[str, Any]] = []
+    for batch in _iter_database_pages(client, database_id, filter_params, parse, properties):
+        all_results.extend(batch)
     return all_results
 
 
-def get_order_data_from_notion(department_names: Optional[List[str]] = None) -> Dict[str, Any]:
+def parse_order_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    """注文ページから判定・結合に必要な項目だけを取り出した注文レコードを作る。"""
+    props = page.get("properties", {})
+
+    supplier_relation = (props.get("DB_仕入先リスト") or {}).get("relation", [])
+    department_entries = (props.get("部署名") or {}).get("multi_select", [])
+
+    return {
+        "page_id": page["id"],
+        "status": ((props.get("注文ステータス") or {}).get("formula") or {}).get("string") or "",
+        "departments": [
+            entry.get("name", "").strip()
+            for entry in department_entries
+            if isinstance(entry, dict) and entry.get("name")
+        ],
+        "maker_name": _get_safe_text((props.get("メーカー名") or {}).get("rich_text", [])).strip(),
+        "db_part_number": _get_safe_text((props.get("品番") or {}).get("rich_text", [])).strip(),
+        "quantity": int(_get_safe_number(props.get("数量")) or 0),
+        "remarks": _get_safe_text((props.get("備考") or {}).get("rich_text", [])).strip(),
+        "order_date": _get_safe_date(props.get("発注日")),
+        "supplier_id": supplier_relation[0].get("id") if supplier_relation else None,
+    }
+
+
+def is_order_pending(order: Dict[str, Any], notion_department_names: Optional[List[str]] = None) -> bool:
+    """
+    注文レコードが取得条件（要発注かつ指定部署）を満たすかをローカルで判定する。
+    増分同期でフィルターを使わずに取得したページの振り分けに使う。
+    """
+    if "要発注" not in order["status"]:
+        return False
+    if not notion_department_names:
+        return True
+    return any(name in order["departments"] for name in notion_department_names)
+
+
+def _build_timestamp_filter(watermark: str) -> Dict[str, Any]:
+    """last_edited_time がウォーターマーク以降のページを絞り込むフィルターを返す。"""
+    return {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": watermark}}
+
+
+def plan_snapshot_sync(database_id: str, full_filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    増分同期で次に発行するクエリを決める（同期版・非同期版で共通）。
+
+    差分取得時は NOTION_MEMBERSHIP_CHECK_INTERVAL ごとに、対象のページをサーバー側の条件で確認し直す
+    （check_membership）。
+
+    Returns:
+        {"key", "snapshot", "full", "check_membership", "filter", "next_watermark"} を持つ同期計画
+    """
+    snapshot_key = json.dumps([database_id, full_filter], ensure_ascii=False, sort_keys=True)
+    constants = config.AppConstants
+    # 同一分内の編集を取りこぼさないよう、クエリ開始時刻から重なり分を差し引いて次回の基準にする
+    sync_started = datetime.now(timezone.utc)
+    next_watermark = (sync_started - timedelta(seconds=constants.NOTION_SYNC_OVERLAP)).isoformat()
+
+    with _SYNC_LOCK:
+        snapshot = _SYNC_SNAPSHOTS.get(snapshot_key)
+
+    needs_full_sync = (
+        snapshot is None
+        or time.time() - snapshot["full_synced_at"] > constants.NOTION_FULL_SYNC_INTERVAL
+    )
+    check_membership = (
+        not needs_full_sync
+        and time.time() - snapshot["membership_checked_at"] > constants.NOTION_MEMBERSHIP_CHECK_INTERVAL
+    )
+    return {
+        "key": snapshot_key,
+        "snapshot": snapshot,
+        "full": needs_full_sync,
+        "check_membership": check_membership,
+        "filter": full_filter if needs_full_sync else _build_timestamp_filter(snapshot["watermark"]),
+        "next_watermark": next_watermark,
+    }
+
+
+def merge_snapshot_changes(plan: Dict[str, Any], pages: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    スナップショットに差分取得したレコードを重ねた、page_id ごとのレコードを返す。
+
+    対象の確認（check_membership）の際に、確認できたページをこのレコードから返すために使う。
+    """
+    known = dict(plan["snapshot"]["pages"])
+    known.update((page["page_id"], page) for page in pages)
+    return known
+
+
+def apply_snapshot_sync(
+    plan: Dict[str, Any],
+    pages: List[Dict[str, Any]],
+    is_member: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    members_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    同期計画に従って取得したレコードをスナップショットに反映し、最新のレコード一覧を返す。
+
+    members_only を指定した場合、差分取得時は pages をサーバー側の条件で対象と確認したページの全体として扱い、
+    スナップショットを置き換える（ページを編集せずに数式の値が変わり、対象から外れたページを取り除くため）。
+    """
+    now = time.time()
+    if plan["full"]:
+        snapshot = {
+            "pages": {page["page_id"]: page for page in pages},
+            "watermark": plan["next_watermark"],
+            "full_synced_at": now,
+            "membership_checked_at": now,
+        }
+        logger.info(f"Notion全件同期: {len(pages)}件")
+    elif members_only:
+        snapshot = {
+            "pages": {page["page_id"]: page for page in pages},
+            "watermark": plan["next_watermark"],
+            "full_synced_at": plan["snapshot"]["full_synced_at"],
+            "membership_checked_at": now,
+        }
+        logger.info(f"Notion増分同期: 対象を確認 合計 {len(pages)}件")
+    else:
+        merged_pages = dict(plan["snapshot"]["pages"])
+        for page in pages:
+            if is_member is None or is_member(page):
+                merged_pages[page["page_id"]] = page
+            else:
+                merged_pages.pop(page["page_id"], None)
+        snapshot = {
+            "pages": merged_pages,
+            "watermark": plan["next_watermark"],
+            "full_synced_at": plan["snapshot"]["full_synced_at"],
+            "membership_checked_at": plan["snapshot"]["membership_checked_at"],
+        }
+        logger.info(f"Notion増分同期: 変更 {len(pages)}件 / 合計 {len(merged_pages)}件")
+
+    with _SYNC_LOCK:
+        _SYNC_SNAPSHOTS[plan["key"]] = snapshot
+
+    return list(snapshot["pages"].values())
+
+
+def parse_supplier_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    """仕入先ページから注文との結合に必要な項目だけを取り出す。"""
+    supplier_props = page.get("properties", {})
+
+    # 「仕入先名」フィールドの取得（titleまたはrich_textに対応）
+    supplier_name_prop = supplier_props.get("仕入先名", {})
+    supplier_name = ""
+
+    if supplier_name_prop.get("title"):
+        supplier_name = _get_safe_text(supplier_name_prop.get("title", [])).strip()
+    elif supplier_name_prop.get("rich_text"):
+        supplier_name = _get_safe_text(supplier_name_prop.get("rich_text", [])).strip()
+    elif supplier_name_prop.get("select"):
+        supplier_name = supplier_name_prop.get("select", {}).get("name", "").strip()
+
+    return {
+        "page_id": page["id"],
+        "supplier_name": supplier_name,
+        "sales_contact": _get_safe_text(supplier_props.get("営業担当者名", {}).get("rich_text", [])).strip(),
+        "email": (_get_safe_email(supplier_props.get("メール")) or "").strip(),
+        "email_cc": (_get_safe_email(supplier_props.get("メールCC")) or "").strip(),
+        "last_edited_time": page.get("last_edited_time", ""),
+    }
+
+
+def refresh_supplier_store(
+    client: Optional[Client] = None,
+    force_full: bool = False,
+    lazy: Optional[bool] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    永続化された仕入先キャッシュを Notion の last_edited_time で再検証する。
+
+    前回のウォーターマーク以降に編集された仕入先だけを取得して保存する。
+    キャッシュが空の場合、SUPPLIER_FULL_SYNC_INTERVAL を超えた場合、または
+    force_full 指定時は全件を取得し直す（削除・アーカイブされた仕入先の除去）。
+    lazy 指定時は全件取得を行わず、差分の反映のみを行う（未登録の仕入先は
+    _resolve_suppliers で必要になった時点で個別に取得する）。
+
+    Args:
+        client: Notionクライアント（省略時は共有クライアント）
+        force_full: 全件取得を強制するか
+        lazy: 全件取得を行わず差分の反映のみにするか（省略時は SUPPLIER_JOIN_MODE に従う）
+
+    Returns:
+        page_id をキーとした仕入先レコード
+    """
+    if not (config.NOTION_API_TOKEN and config.NOTION_SUPPLIER_DATABASE_ID):
+        return supplier_store.get_all_suppliers()
+    if lazy is None:
+        lazy = config.AppConstants.SUPPLIER_JOIN_MODE == "lazy"
+
+    client = client or _get_notion_client()
+    with _SUPPLIER_REFRESH_LOCK:
+        plan = plan_supplier_refresh(force_full, lazy)
+        records: List[Dict[str, Any]] = []
+        if plan["action"] != "watermark_only":
+            records = _get_all_pages_from_db(
+                client,
+                config.NOTION_SUPPLIER_DATABASE_ID,
+                filter_params=plan["filter"],
+                parse=parse_supplier_page,
+                properties=SUPPLIER_PROPERTIES,
+            )
+        apply_supplier_refresh(plan, records)
+
+    return supplier_store.get_all_suppliers()
+
+
+def plan_supplier_refresh(force_full: bool, lazy: bool) -> Dict[str, Any]:
+    """
+    仕入先キャッシュの再検証方法を決める（同期版・非同期版で共通）。
+
+    Returns:
+        {"action": "full" / "delta" / "watermark_only", "filter", "next_watermark"}
+    """
+    supplier_store.load()
+    watermark, full_synced_at = supplier_store.get_sync_state()
+    sync_started = datetime.now(timezone.utc)
+    next_watermark = (
+        sync_started - timedelta(seconds=config.AppConstants.NOTION_SYNC_OVERLAP)
+    ).isoformat()
+
+    needs_full_sync = (
+        watermark is None
+        or time.time() - full_synced_at > config.AppConstants.SUPPLIER_FULL_SYNC_INTERVAL
+    )
+
+    if lazy and not force_full and watermark is None:
+        # 差分の基準がまだ無い場合は、以降の編集を追跡するためのウォーターマークだけを記録する
+        return {"action": "watermark_only", "filter": None, "next_watermark": next_watermark}
+    if force_full or (needs_full_sync and not lazy):
+        return {"action": "full", "filter": None, "next_watermark": next_watermark}
+    return {"action": "delta", "filter": _build_timestamp_filter(watermark), "next_watermark": next_watermark}
+
+
+def apply_supplier_refresh(plan: Dict[str, Any], records: List[Dict[str, Any]]) -> None:
+    """再検証で取得した仕入先レコードを仕入先キャッシュに保存する。"""
+    if plan["action"] == "full":
+        supplier_store.save_suppliers(records, plan["next_watermark"], replace_all=True)
+        logger.info(f"仕入先キャッシュを全件更新しました: {len(records)}件")
+    elif plan["action"] == "delta":
+        supplier_store.save_suppliers(records, plan["next_watermark"])
+        logger.info(f"仕入先キャッシュを差分更新しました: 変更 {len(records)}件")
+    else:
+        supplier_store.save_suppliers([], plan["next_watermark"])
+
+
+def _resolve_suppliers(
+    client: Client,
+    supplier_ids: List[str],
+    use_cache: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    注文が参照する仕入先だけを解決する。
+
+    キャッシュに無い仕入先ページを pages.retrieve で並列取得（最大 SUPPLIER_RESOLVE_WORKERS）し、
+    取得結果は仕入先キャッシュに保存する。
+
+    Args:
+        client: Notionクライアント
+        supplier_ids: 解決する仕入先ページIDのリスト
+        use_cache: Falseの場合はキャッシュを使わず全て取得し直す
+
+    Returns:
+        page_id をキーとした仕入先レコード（取得できなかったIDは含まない）
+    """
+    resolved, missing_ids = split_cached_suppliers(supplier_ids, use_cache)
+    if not missing_ids:
+        return resolved
+
+    retrieve_args: Dict[str, Any] = {}
+    property_ids = _get_property_ids(client, config.NOTION_SUPPLIER_DATABASE_ID, SUPPLIER_PROPERTIES)
+    if property_ids:
+        retrieve_args["filter_properties"] = property_ids
+
+    def retrieve_supplier(supplier_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            page = _call_notion(client.pages.retrieve, page_id=supplier_id, **retrieve_args)
+            return parse_supplier_page(page)
+        except retry_policy.RetryExhaustedError as e:
+            # 一時的なエラーで解決できなかった仕入先を「未設定」扱いにすると注文が欠落するため中断する
+            raise NotionAPIError(f"仕入先ページを取得できませんでした (page_id: {supplier_id}): {e}") from e
+        except Exception as e:
+            # 削除済み・権限なし(4xx)の仕入先は未設定として扱う
+            logger.warning(f"仕入先ページの取得に失敗しました (page_id: {supplier_id}): {e}")
+            return None
+
+    max_workers = max(1, min(config.AppConstants.SUPPLIER_RESOLVE_WORKERS, len(missing_ids)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = [record for record in executor.map(retrieve_supplier, missing_ids) if record]
+
+    supplier_store.save_suppliers(fetched)
+    for record in fetched:
+        resolved[record["page_id"]] = record
+    logger.info(f"仕入先を個別取得しました: {len(fetched)}/{len(missing_ids)}件 (キャッシュ利用 {len(resolved) - len(fetched)}件)")
+    return resolved
+
+
+def split_cached_suppliers(
+    supplier_ids: List[str],
+    use_cache: bool = True,
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    仕入先IDをキャッシュ済みのものと未取得のものに分ける（重複は除く）。
+
+    Returns:
+        (キャッシュ済みの仕入先レコード, 取得が必要な仕入先IDのリスト)
+    """
+    resolved: Dict[str, Dict[str, Any]] = {}
+    missing_ids: List[str] = []
+    for supplier_id in dict.fromkeys(supplier_ids):
+        cached = supplier_store.get_supplier(supplier_id) if use_cache else None
+        if cached:
+            resolved[supplier_id] = cached
+        else:
+            missing_ids.append(supplier_id)
+    return resolved, missing_ids
+
+
+def build_order_filter(department_names: Optional[List[str]] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    要発注データ取得用のフィルターを組み立てる。
+
+    Returns:
+        (Notionクエリ用フィルター, Notion上の部署名リスト)
+    """
+    base_filter: Dict[str, Any] = {
+        "property": "注文ステータス",
+        "formula": {"string": {"contains": "要発注"}},
+    }
+
+    notion_department_names: List[str] = []
+    if department_names:
+        # 表示名をNotion名に変換
+        notion_department_names = config.convert_display_names_to_notion_names(department_names)
+        department_filters = [
+            {"property": "部署名", "multi_select": {"contains": name}} for name in notion_department_names
+        ]
+        department_condition = (
+            department_filters[0] if len(department_filters) == 1 else {"or": department_filters}
+        )
+        return {"and": [base_filter, department_condition]}, notion_department_names
+    return base_filter, notion_department_names
+
+
+def join_orders(
+    order_records: List[Dict[str, Any]],
+    suppliers_map: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
     """
-    発注対象データを Notion から取得する。
+    注文レコードと仕入先レコードを結合し、注文データのリストを作る。
+
+    Returns:
+        {"orders": 注文データのリスト, "unlinked_count": 仕入先を特定できなかった件数,
+         "unlinked_orders": 仕入先を特定できなかった注文の {"page_id", "departments"} のリスト}
+    """
+    order_list: List[Dict[str, Any]] = []
+    unlinked_orders: List[Dict[str, Any]] = []
+
+    for order in order_records:
+        supplier_page_id = order["supplier_id"]
+        supplier = suppliers_map.get(supplier_page_id) if supplier_page_id else None
+        if not supplier:
+            unlinked_orders.append({"page_id": order["page_id"], "departments": list(order["departments"])})
+            continue
+
+        order_list.append(
+            {
+                "page_id": order["page_id"],
+                "maker_name": order["maker_name"],
+                "db_part_number": order["db_part_number"],
+                "quantity": order["quantity"],
+                "supplier_name": supplier["supplier_name"],
+                "sales_contact": supplier["sales_contact"],
+                "email": supplier["email"],
+                "email_cc": supplier["email_cc"],
+                "remarks": order["remarks"],
+                "departments": list(order["departments"]),
+                "order_date": order["order_date"],
+            }
+        )
+
+    return {"orders": order_list, "unlinked_count": len(unlinked_orders), "unlinked_orders": unlinked_orders}
+
+
+def _iter_order_records(
+    client: Client,
+    final_filter: Dict[str, Any],
+    notion_department_names: List[str],
+    incremental: bool,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    要発注の注文レコードをバッチ単位で返す。
+
+    増分同期しない場合・増分同期の全件取得時は Notion から届いたバッチをそのまま返す。
+    差分取得時は変更分をスナップショットにマージしてから、スナップショット全体を返す。
+    要発注の判定（数式）はページを編集せずに変わることがあるため、NOTION_MEMBERSHIP_CHECK_INTERVAL ごとに
+    対象のページIDをサーバー側の条件で問い合わせ、確認できたページから順に返す
+    （スナップショットに無いページは並列に個別取得する）。
+    """
+    if not incremental:
+        yield from _iter_database_pages(
+            client,
+            config.PAGE_ID_CONTAINING_DB,
+            filter_params=final_filter,
+            parse=parse_order_page,
+            properties=ORDER_PROPERTIES,
+        )
+        return
+
+    plan = plan_snapshot_sync(config.PAGE_ID_CONTAINING_DB, final_filter)
+    fetched: List[Dict[str, Any]] = []
+    for batch in _iter_database_pages(
+        client,
+        config.PAGE_ID_CONTAINING_DB,
+        filter_params=plan["filter"],
+        parse=parse_order_page,
+        properties=ORDER_PROPERTIES,
+    ):
+        fetched.extend(batch)
+        if plan["full"]:
+            # 全件取得はサーバー側で絞り込み済みのため、届いた順に返す
+            yield batch
+
+    # 増分取得では要発注・部署から外れたページも受け取り、ローカルで除外する
+    is_member = lambda order: is_order_pending(order, notion_department_names)
+    if plan["full"]:
+        apply_snapshot_sync(plan, fetched, is_member)
+        return
+    if not plan["check_membership"]:
+        records = apply_snapshot_sync(plan, fetched, is_member)
+        for start in range(0, len(records), ORDER_BATCH_SIZE):
+            yield records[start:start + ORDER_BATCH_SIZE]
+        return
+
+    # 要発注は数式でページを編集せずに変わることがあるため、一定間隔で対象のページをサーバー側の条件で確認し直す。
+    # 確認できたページから順に返し、スナップショットに無いページは並列に個別取得する
+    known = merge_snapshot_changes(plan, fetched)
+    members: List[Dict[str, Any]] = []
+    for page_ids in _iter_database_pages(
+        client,
+        config.PAGE_ID_CONTAINING_DB,
+        filter_params=final_filter,
+        parse=lambda page: page["id"],
+        properties=MEMBERSHIP_PROPERTIES,
+    ):
+        batch = [known[page_id] for page_id in page_ids if page_id in known]
+        batch.extend(_retrieve_order_pages(client, [page_id for page_id in page_ids if page_id not in known]))
+        members.extend(batch)
+        yield batch
+    apply_snapshot_sync(plan, members, members_only=True)
+
+
+def _retrieve_order_page(client: Client, page_id: str) -> Dict[str, Any]:
+    """
+    注文ページを1件取得して注文レコードにする。
+
+    Raises:
+        NotionAPIError: 取得できなかった場合（対象の注文が欠落しないよう、取得自体を失敗させる）
+    """
+    retrieve_args: Dict[str, Any] = {}
+    property_ids = _get_property_ids(client, config.PAGE_ID_CONTAINING_DB, ORDER_PROPERTIES)
+    if property_ids:
+        retrieve_args["filter_properties"] = property_ids
+    try:
+        return parse_order_page(_call_notion(client.pages.retrieve, page_id=page_id, **retrieve_args))
+    except Exception as e:
+        raise NotionAPIError(f"注文ページを取得できませんでした (page_id: {page_id}): {e}") from e
+
+
+def _retrieve_order_pages(client: Client, page_ids: List[str]) -> List[Dict[str, Any]]:
+    """注文ページを並列（最大 ORDER_RETRIEVE_WORKERS）に個別取得して注文レコードにする。"""
+    if not page_ids:
+        return []
+    max_workers = max(1, min(config.AppConstants.ORDER_RETRIEVE_WORKERS, len(page_ids)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda page_id: _retrieve_order_page(client, page_id), page_ids))
+
+
+def iter_order_data_from_notion(
+    department_names: Optional[List[str]] = None,
+    incremental: Optional[bool] = None,
+    join_mode: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    発注対象データを Notion から取得し、ページのバッチが届くたびに仕入先と結合して返す。
+
+    全件を受け取る前に処理を始められるため、呼び出し側は最初の仕入先から順に表示できる。
+
+    Args:
+        department_names: 部署名のリスト（フィルタリング用）
+        incremental: 増分同期を行うか（省略時は AppConstants.NOTION_INCREMENTAL_SYNC）
+        join_mode: 仕入先の結合方式 "lazy" / "full"（省略時は AppConstants.SUPPLIER_JOIN_MODE）
+
+    Yields:
+        {"orders": 注文データのリスト, "unlinked_count": 仕入先を特定できなかった件数,
+         "unlinked_orders": 仕入先を特定できなかった注文の {"page_id", "departments"} のリスト}
+
+    Raises:
+        NotionAPIError: 取得・結合が途中で失敗した場合（それまでに返したバッチは破棄すること）
     """
     if not all(
         [config.NOTION_API_TOKEN, config.PAGE_ID_CONTAINING_DB, config.NOTION_SUPPLIER_DATABASE_ID]
     ):
-        return {"orders": [], "unlinked_count": 0}
+        return
+
+    if incremental is None:
+        incremental = config.AppConstants.NOTION_INCREMENTAL_SYNC
+    if join_mode is None:
+        join_mode = config.AppConstants.SUPPLIER_JOIN_MODE
+    lazy_join = join_mode == "lazy"
 
     client = _get_notion_client()
-    order_list: List[Dict[str, Any]] = []
-    unlinked_count = 0
 
     try:
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-            future_suppliers = executor.submit(
-                _get_all_pages_from_db, client, config.NOTION_SUPPLIER_DATABASE_ID
-            )
-
-            base_filter: Dict[str, Any] = {
-                "property": "注文ステータス",
-                "formula": {"string": {"contains": "要発注"}},
-            }
-
-            if department_names:
-                # 表示名をNotion名に変換
-                notion_department_names = config.convert_display_names_to_notion_names(department_names)
-                department_filters = [
-                    {"property": "部署名", "multi_select": {"contains": name}} for name in notion_department_names
-                ]
-                department_condition = (
-                    department_filters[0] if len(department_filters) == 1 else {"or": department_filters}
-                )
-                final_filter: Dict[str, Any] = {"and": [base_filter, department_condition]}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            # 仕入先は永続キャッシュを差分で再検証する（増分同期しない場合は全件取得し直す）
+            # lazyモードでは全件取得せず、注文が参照する仕入先だけをバッチごとに個別に解決する
+            if lazy_join and not incremental:
+                future_suppliers = None
             else:
-                final_filter = base_filter
+                future_suppliers = executor.submit(refresh_supplier_store, client, not incremental, lazy_join)
 
-            future_orders = executor.submit(
-                _get_all_pages_from_db, client, config.PAGE_ID_CONTAINING_DB, filter_params=final_filter
-            )
+            final_filter, notion_department_names = build_order_filter(department_names)
+            suppliers_map: Dict[str, Dict[str, Any]] = {}
 
-            all_suppliers = future_suppliers.result()
-            order_pages = future_orders.result()
-
-        suppliers_map = {page["id"]: page.get("properties", {}) for page in all_suppliers}
-        if not order_pages:
-            return {"orders": [], "unlinked_count": 0}
-
-        for page in order_pages:
-            props = page.get("properties", {})
-
-            supplier_relation = props.get("DB_仕入先リスト", {}).get("relation", [])
-            if not supplier_relation:
-                unlinked_count += 1
-                continue
-
-            supplier_page_id = supplier_relation[0].get("id")
-            supplier_props = suppliers_map.get(supplier_page_id)
-            if not supplier_props:
-                unlinked_count += 1
-                continue
-
-            department_entries = props.get("部署名", {}).get("multi_select", [])
-            department_names_for_order = [
-                entry.get("name", "").strip()
-                for entry in department_entries
-                if isinstance(entry, dict) and entry.get("name")
-            ]
-
-            maker = _get_safe_text(props.get("メーカー名", {}).get("rich_text", [])).strip()
-            part_number = _get_safe_text(props.get("品番", {}).get("rich_text", [])).strip()
-            quantity = int(_get_safe_number(props.get("数量")) or 0)
-            remarks = _get_safe_text(props.get("備考", {}).get("rich_text", [])).strip()
-            
-            # 「仕入先名」フィールドの取得（titleまたはrich_textに対応）
-            supplier_name_prop = supplier_props.get("仕入先名", {})
-            supplier_name = ""
-            
-            if supplier_name_prop.get("title"):
-                supplier_name = _get_safe_text(supplier_name_prop.get("title", [])).strip()
-            elif supplier_name_prop.get("rich_text"):
-                supplier_name = _get_safe_text(supplier_name_prop.get("rich_text", [])).strip()
-            elif supplier_name_prop.get("select"):
-                supplier_name = supplier_name_prop.get("select", {}).get("name", "").strip()
-            
-            sales_contact = _get_safe_text(supplier_props.get("営業担当者名", {}).get("rich_text", [])).strip()
-            email_to = (_get_safe_email(supplier_props.get("メール")) or "").strip()
-            email_cc = (_get_safe_email(supplier_props.get("メールCC")) or "").strip()
-
-            order_list.append(
-                {
-                    "page_id": page["id"],
-                    "maker_name": maker,
-                    "db_part_number": part_number,
-                    "quantity": quantity,
-                    "supplier_name": supplier_name,
-                    "sales_contact": sales_contact,
-                    "email": email_to,
-                    "email_cc": email_cc,
-                    "remarks": remarks,
-                    "departments": department_names_for_order,
-                }
-            )
+            for order_records in _iter_order_records(client, final_filter, notion_department_names, incremental):
+                if future_suppliers is not None:
+                    suppliers_map = dict(future_suppliers.result())
+                    future_suppliers = None
+                if lazy_join:
+                    # 前のバッチで解決済みの仕入先は再取得しない
+                    unresolved_ids = [
+                        order["supplier_id"]
+                        for order in order_records
+                        if order["supplier_id"] and order["supplier_id"] not in suppliers_map
+                    ]
+                    if unresolved_ids:
+                        suppliers_map.update(_resolve_suppliers(client, unresolved_ids, use_cache=incremental))
+                yield join_orders(order_records, suppliers_map)
 
+            if future_suppliers is not None:
+                future_suppliers.result()
+
+    except NotionAPIError:
+        raise
     except Exception as e:
+        # 途中までの結果が発注対象の全件として扱われないよう、取得失敗として通知する
         logger.error(f"Notionから注文データ取得中にエラーが発生しました: {e}", exc_info=True)
-        return {"orders": [], "unlinked_count": 0}
+        raise NotionAPIError(f"注文データの処理中にエラーが発生しました: {e}") from e
+
+
+def get_order_data_from_notion(
+    department_names: Optional[List[str]] = None,
+    incremental: Optional[bool] = None,
+    join_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    発注対象データを Notion から取得する（iter_order_data_from_notion の結果をまとめたもの）。
+
+    Args:
+        department_names: 部署名のリスト（フィルタリング用）
+        incremental: 増分同期を行うか（省略時は AppConstants.NOTION_INCREMENTAL_SYNC）
+        join_mode: 仕入先の結合方式 "lazy" / "full"（省略時は AppConstants.SUPPLIER_JOIN_MODE）
+
+    Raises:
+        NotionAPIError: Notion からの取得がリトライ後も失敗した場合
+    """
+    orders: List[Dict[str, Any]] = []
+    unlinked_count = 0
+    for batch in iter_order_data_from_notion(department_names, incremental, join_mode):
+        orders.extend(batch["orders"])
+        unlinked_count += batch["unlinked_count"]
+    return {"orders": orders, "unlinked_count": unlinked_count}
+
 
-    return {"orders": order_list, "unlinked_count": unlinked_count}
+class NotionUpdateResult(NamedTuple):
+    """「発注日」の一括更新の結果"""
+    updated: List[str]       # 更新できたページID
+    failed: Dict[str, str]   # 更新できなかったページID -> エラーメッセージ
+    skipped: List[str]       # 既に当日の発注日が入っていたため更新しなかったページID
 
 
-def update_notion_pages(page_ids: List[str]) -> None:
+def split_up_to_date(
+    page_ids: List[str],
+    current_order_dates: Optional[Dict[str, str]],
+    today: str,
+) -> Tuple[List[str], List[str]]:
+    """
+    更新が必要なページと、既に当日の発注日が入っているページに分ける（同期版・非同期版で共通）。
+
+    Returns:
+        (更新するページIDのリスト, 更新しないページIDのリスト)
+    """
+    page_ids = list(dict.fromkeys(page_ids))
+    current_order_dates = current_order_dates or {}
+    skipped = [page_id for page_id in page_ids if current_order_dates.get(page_id) == today]
+    if skipped:
+        logger.info(f"発注日が既に当日のページ{len(skipped)}件は更新をスキップします")
+    return [page_id for page_id in page_ids if current_order_dates.get(page_id) != today], skipped
+
+
+def update_notion_pages(
+    page_ids: List[str],
+    current_order_dates: Optional[Dict[str, str]] = None,
+) -> NotionUpdateResult:
     """
     対象ページの「発注日」を当日日付で更新する（並列処理で高速化）。
+    失敗したページは結果の failed に残し、呼び出し元が再試行できるようにする。
     
     Args:
-        page_ids: 更新するページIDのリスト
+        page_ids: 更新するページIDのリスト（重複は1回だけ更新する）
+        current_order_dates: 取得済みの注文レコードの発注日（page_id -> YYYY-MM-DD）。
+            既に当日になっているページは更新しない
+    
+    Returns:
+        更新結果
     """
+    today = datetime.now().strftime("%Y-%m-%d")
+    page_ids, skipped = split_up_to_date(page_ids, current_order_dates, today)
     if not page_ids:
-        logger.warning("更新するページIDが空です")
-        return
+        if not skipped:
+            logger.warning("更新するページIDが空です")
+        return NotionUpdateResult([], {}, skipped)
     
     client = _get_notion_client()
-    today = datetime.now().strftime("%Y-%m-%d")
     
     def update_page(page_id: str) -> tuple[str, bool, Optional[str]]:
         """
@@ -222,12 +865,11 @@ def update_notion_pages(page_ids: List[str]) -> None:
             (page_id, 成功フラグ, エラーメッセージ)
         """
         try:
-            with _NOTION_LOCK:
-                client.pages.update(
-                    page_id=page_id,
-                    properties={"発注日": {"date": {"start": today}}}
-                )
-            time.sleep(config.AppConstants.NOTION_API_DELAY)
+            _call_notion(
+                client.pages.update,
+                page_id=page_id,
+                properties={"発注日": {"date": {"start": today}}}
+            )
             logger.debug(f"Notionページ更新成功: {page_id}")
             return (page_id, True, None)
         except Exception as e:
@@ -235,64 +877,308 @@ def update_notion_pages(page_ids: List[str]) -> None:
             logger.error(f"Notionページ更新エラー (page_id: {page_id}): {error_msg}")
             return (page_id, False, error_msg)
     
-    # 並列処理で更新（最大3並列、Notion API制限を考慮）
-    max_workers = min(3, len(page_ids))
+    # 並列処理で更新（Notion APIの速度制限は共有レートリミッターで守る）
+    max_workers = max(1, min(config.AppConstants.NOTION_UPDATE_WORKERS, len(page_ids)))
     logger.info(f"Notionページ更新開始: {len(page_ids)}件を{max_workers}並列で処理")
     
-    success_count = 0
-    failure_count = 0
-    
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         results = list(executor.map(update_page, page_ids))
     
-    for page_id, success, error_msg in results:
-        if success:
-            success_count += 1
-        else:
-            failure_count += 1
+    return log_update_results(results, skipped)
+
+
+def log_update_results(
+    results: List[Tuple[str, bool, Optional[str]]],
+    skipped: Optional[List[str]] = None,
+) -> NotionUpdateResult:
+    """発注日更新の結果を集計してログに出力し、更新結果を返す（同期版・非同期版で共通）。"""
+    update_result = NotionUpdateResult(
+        updated=[page_id for page_id, success, _ in results if success],
+        failed={page_id: error or "不明なエラー" for page_id, success, error in results if not success},
+        skipped=list(skipped or []),
+    )
     
-    logger.info(f"Notionページ更新完了: 成功 {success_count}件, 失敗 {failure_count}件")
+    logger.info(f"Notionページ更新完了: 成功 {len(update_result.updated)}件, 失敗 {len(update_result.failed)}件")
     
-    if failure_count > 0:
-        logger.warning(f"{failure_count}件のページ更新に失敗しました。詳細はログを確認してください。")
+    if update_result.failed:
+        logger.warning(f"{len(update_result.failed)}件のページ更新に失敗しました。詳細はログを確認してください。")
+    return update_result
 
 
-def fetch_and_process_orders(department_names: Optional[List[str]] = None) -> Dict[str, Any]:
+# バックグラウンドでの再取得の結果を受け取る関数 (最新の結果, 前回の結果との差分)
+RevalidatedCallback = Callable[[Dict[str, Any], Dict[str, List[Dict[str, Any]]]], None]
+# バックグラウンドでの再取得が失敗した場合に呼ばれる関数 (失敗の内容)
+RevalidationFailedCallback = Callable[[str], None]
+
+
+def fetch_and_process_orders(
+    department_names: Optional[List[str]] = None,
+    batch_source: Optional[Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]] = None,
+    on_batch: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_revalidated: Optional[RevalidatedCallback] = None,
+    on_revalidation_failed: Optional[RevalidationFailedCallback] = None,
+) -> Dict[str, Any]:
     """
     Notionから取得したデータを仕入先単位でグルーピングして返す。
     キャッシュ機能付き。
+
+    キャッシュは部署ごとに持ち、複数の部署を選んだ場合はキャッシュ済みの部署の結果を
+    page_id で重複を除いて組み合わせ、キャッシュにない部署だけを Notion から1回の問い合わせで取得する。
+    注文データはバッチが届くたびにグルーピングし、on_batch に通知する。
     
     Args:
         department_names: 部署名のリスト（フィルタリング用）
+        batch_source: 注文データのバッチを返す関数（省略時は iter_order_data_from_notion。asyncio版の差し替え用）
+        on_batch: バッチを処理するたびに呼ばれる関数（引数は {"orders", "unlinked_count"}）
+        on_revalidated: 指定した場合、期限切れのキャッシュをすぐに返し（結果の "stale" がTrue）、
+            バックグラウンドで再取得した結果と差分をこの関数に通知する（ワーカースレッドから呼ばれる）
+        on_revalidation_failed: バックグラウンドでの再取得が失敗した場合に呼ばれる関数（ワーカースレッドから呼ばれる）
     
     Returns:
         仕入先ごとにグループ化された注文データ
+
+    Raises:
+        NotionAPIError: Notion からの取得がリトライ後も失敗した場合（失敗した部署の結果はキャッシュしない）
     """
-    # キャッシュから取得を試みる
-    cached_result = cache_manager.get_cached_data(department_names)
-    if cached_result is not None:
+    units = _cache_units(department_names)
+    # 部署ごとの (キャッシュの経過秒数, 取得結果)。キャッシュにない部署は None
+    parts: List[Optional[Tuple[float, Dict[str, Any]]]] = []
+    missing: List[int] = []
+    stale: List[int] = []
+    for index, unit in enumerate(units):
+        cached = cache_manager.lookup_cached_data(unit)
+        if cached is None or (cached.stale and on_revalidated is None):
+            parts.append(None)
+            missing.append(index)
+        else:
+            parts.append((cached.age, cached.data))
+            if cached.stale:
+                stale.append(index)
+
+    if not missing:
         logger.info("キャッシュからデータを取得しました")
-        return cached_result
-    
-    # キャッシュにない場合はNotionから取得
-    logger.info("Notionからデータを取得します")
-    raw_data = get_order_data_from_notion(department_names)
-    orders = raw_data.get("orders", [])
-    unlinked_count = raw_data.get("unlinked_count", 0)
+    else:
+        emit = _dedup_batches(on_batch)
+        if len(missing) < len(units):
+            logger.info(
+                "キャッシュにない部署のみNotionから取得します: "
+                + ", ".join(units[index][0] for index in missing)
+            )
+            # キャッシュ済みの部署の注文も、取得中の表示・PDF生成に先に渡す
+            if emit:
+                for part in parts:
+                    if part is not None:
+                        emit({"orders": part[1].get("all_orders", []), "unlinked_count": 0})
+        else:
+            logger.info("Notionからデータを取得します")
+        results = _fetch_departments([units[index] for index in missing], batch_source, emit)
+        for index, result in zip(missing, results):
+            cache_manager.set_cached_data(units[index], result)
+            parts[index] = (0.0, result)
+
+    merged = _merge_results(parts)
+    if stale:
+        cache_age = max(parts[index][0] for index in stale)
+        logger.info(f"期限切れのキャッシュを返し、バックグラウンドで再取得します（{int(cache_age)}秒前のデータ）")
+        _start_revalidation(units, parts, stale, batch_source, merged, on_revalidated, on_revalidation_failed)
+        return dict(merged, stale=True, cache_age=cache_age)
+    return merged
+
+
+def _cache_units(department_names: Optional[List[str]]) -> List[Optional[List[str]]]:
+    """キャッシュの単位を返す（部署1つずつ。部署を指定しない場合は全件で1つ）。"""
+    if not department_names:
+        return [None]
+    return [[name] for name in dict.fromkeys(department_names)]
+
+
+def _dedup_batches(
+    on_batch: Optional[Callable[[Dict[str, Any]], None]],
+) -> Optional[Callable[[Dict[str, Any]], None]]:
+    """複数の部署に含まれる注文を on_batch に一度だけ渡すようにする。"""
+    if on_batch is None:
+        return None
+    emitted: set = set()
+
+    def emit(batch: Dict[str, Any]) -> None:
+        orders = [order for order in batch.get("orders", []) if order["page_id"] not in emitted]
+        emitted.update(order["page_id"] for order in orders)
+        on_batch(dict(batch, orders=orders))
+
+    return emit
+
+
+def _merge_results(parts: List[Tuple[float, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    部署ごとの取得結果を page_id で重複を除いて1つにまとめる。
+
+    同じ注文が複数の部署に含まれる場合は、より新しく取得した方を使う。
+    仕入先を特定できなかった注文も page_id で重複を除いて数える。
+    """
+    if len(parts) == 1:
+        return parts[0][1]
+
+    newest: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    for age, part in parts:
+        for order in part.get("all_orders", []):
+            current = newest.get(order["page_id"])
+            if current is None or age < current[0]:
+                newest[order["page_id"]] = (age, order)
+
+    orders = [order for _, order in newest.values()]
+    unlinked_page_ids = list(dict.fromkeys(
+        page_id for _, part in parts for page_id in part.get("unlinked_page_ids", [])
+    ))
+    return _group_orders(orders, unlinked_page_ids)
+
+
+def _fetch_orders(
+    department_names: Optional[List[str]],
+    batch_source: Optional[Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]] = None,
+    on_batch: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Notionから注文データを取得し、仕入先単位でグルーピングする。"""
+    orders: List[Dict[str, Any]] = []
+    unlinked_page_ids: List[str] = []
+
+    for batch in (batch_source or iter_order_data_from_notion)(department_names):
+        orders.extend(batch.get("orders", []))
+        unlinked_page_ids.extend(order["page_id"] for order in batch.get("unlinked_orders", []))
+        if on_batch:
+            on_batch(batch)
+
+    return _group_orders(orders, unlinked_page_ids)
 
+
+def _fetch_departments(
+    units: List[Optional[List[str]]],
+    batch_source: Optional[Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]] = None,
+    on_batch: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    複数の部署の注文データを部署名のOR条件で1回だけ問い合わせ、部署ごとの取得結果に分ける。
+
+    複数の部署に含まれる注文は、それぞれの部署の結果に入れる。
+    """
+    if len(units) == 1:
+        return [_fetch_orders(units[0], batch_source, on_batch)]
+
+    department_names = [unit[0] for unit in units]
+    notion_department_names = config.convert_display_names_to_notion_names(department_names)
+    orders_by_unit: List[List[Dict[str, Any]]] = [[] for _ in units]
+    unlinked_by_unit: List[List[str]] = [[] for _ in units]
+
+    for batch in (batch_source or iter_order_data_from_notion)(department_names):
+        for order in batch.get("orders", []):
+            for index, name in enumerate(notion_department_names):
+                if name in order["departments"]:
+                    orders_by_unit[index].append(order)
+        for order in batch.get("unlinked_orders", []):
+            for index, name in enumerate(notion_department_names):
+                if name in order["departments"]:
+                    unlinked_by_unit[index].append(order["page_id"])
+        if on_batch:
+            on_batch(batch)
+
+    return [_group_orders(orders, unlinked) for orders, unlinked in zip(orders_by_unit, unlinked_by_unit)]
+
+
+def _group_orders(orders: List[Dict[str, Any]], unlinked_page_ids: List[str]) -> Dict[str, Any]:
+    """取得した注文データを仕入先単位でグルーピングし、取得結果の形にする。"""
     grouped_orders: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
     for order in orders:
         supplier_name = order.get("supplier_name")
         if supplier_name:
             grouped_orders[supplier_name].append(order)
 
-    result = {
+    return {
         "orders_by_supplier": dict(grouped_orders),
         "all_orders": orders,
-        "unlinked_count": unlinked_count
+        "unlinked_count": len(unlinked_page_ids),
+        "unlinked_page_ids": unlinked_page_ids,
     }
-    
-    # 結果をキャッシュに保存
-    cache_manager.set_cached_data(department_names, result)
-    
-    return result
+
+
+def _diff_orders(
+    old_orders: List[Dict[str, Any]],
+    new_orders: List[Dict[str, Any]],
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    注文データの差分を page_id 単位で求める。
+
+    Returns:
+        {"added": 追加された注文, "changed": 内容が変わった注文, "removed": なくなった注文}
+    """
+    old_by_id = {order["page_id"]: order for order in old_orders}
+    new_by_id = {order["page_id"]: order for order in new_orders}
+    return {
+        "added": [order for page_id, order in new_by_id.items() if page_id not in old_by_id],
+        "changed": [
+            order for page_id, order in new_by_id.items()
+            if page_id in old_by_id and old_by_id[page_id] != order
+        ],
+        "removed": [order for page_id, order in old_by_id.items() if page_id not in new_by_id],
+    }
+
+
+def _revalidate_unit(
+    unit: Optional[List[str]],
+    batch_source: Optional[Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]],
+) -> Tuple[float, Dict[str, Any]]:
+    """
+    期限切れの部署を再取得してキャッシュに保存し、(キャッシュの経過秒数, 取得結果) を返す。
+
+    別の取得が同じ部署を再取得中・再取得済みの場合は、重複して問い合わせずにその結果を使う
+    （その再取得が失敗した場合は自分で取得し直す）。
+    """
+    while True:
+        cached = cache_manager.lookup_cached_data(unit)
+        if cached is not None and not cached.stale:
+            return cached.age, cached.data
+        if cache_manager.begin_revalidation(unit):
+            break
+        cache_manager.wait_for_revalidation(unit)
+    try:
+        result = _fetch_orders(unit, batch_source)
+        cache_manager.set_cached_data(unit, result)
+    finally:
+        cache_manager.end_revalidation(unit)
+    return 0.0, result
+
+
+def _start_revalidation(
+    units: List[Optional[List[str]]],
+    parts: List[Tuple[float, Dict[str, Any]]],
+    stale: List[int],
+    batch_source: Optional[Callable[[Optional[List[str]]], Iterable[Dict[str, Any]]]],
+    stale_result: Dict[str, Any],
+    on_revalidated: RevalidatedCallback,
+    on_failed: Optional[RevalidationFailedCallback],
+) -> None:
+    """
+    期限切れの部署をバックグラウンドで再取得する。
+
+    再取得は部署ごとに行い、別の取得が再取得中の部署はその結果を待って使う。
+    再取得に失敗した場合は on_failed に通知する（呼び出し側は古いデータのまま操作させないようにする）。
+    """
+
+    def revalidate() -> None:
+        fresh_parts = list(parts)
+        try:
+            for index in stale:
+                fresh_parts[index] = _revalidate_unit(units[index], batch_source)
+        except Exception as e:
+            # 古いデータの表示は続け、次回のデータ取得で再試行する
+            logger.warning(f"キャッシュの再取得に失敗しました: {e}")
+            if on_failed:
+                on_failed(str(e))
+            return
+        fresh = _merge_results(fresh_parts)
+        delta = _diff_orders(stale_result.get("all_orders", []), fresh["all_orders"])
+        logger.info(
+            f"キャッシュを再取得しました: 追加 {len(delta['added'])}件, "
+            f"変更 {len(delta['changed'])}件, 削除 {len(delta['removed'])}件"
+        )
+        on_revalidated(fresh, delta)
+
+    threading.Thread(target=revalidate, name="NotionRevalidate", daemon=True).start()
@@ -0,0 +1,521 @@
+"""
+Notion API の asyncio 版クライアント処理
+notion_client.AsyncClient を1本のイベントループスレッド上で動かし、
+データ取得・仕入先の解決・発注日更新を同じループで並行して処理する
+"""
+import asyncio
+import concurrent.futures
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from notion_client import AsyncClient
+
+import config
+import logger_config
+import notion_api
+import retry_policy
+import supplier_store
+
+# ロガーの取得
+logger = logger_config.get_logger(__name__)
+
+
+class NotionEventLoop:
+    """
+    Notion API 呼び出し専用のバックグラウンドイベントループ
+
+    Application が1つ所有し、UIスレッド以外のワーカースレッドから
+    run() / submit() でコルーチンを投入する。
+    """
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._client: Optional[AsyncClient] = None
+        self._client_token: Optional[str] = None
+        self.supplier_refresh_lock = asyncio.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """イベントループのスレッドを必要に応じて起動する"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self.supplier_refresh_lock = asyncio.Lock()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="NotionEventLoop", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """
+        コルーチンをループに投入する
+
+        Returns:
+            結果を受け取るための Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        コルーチンをループで実行し、完了まで待って結果を返す（ループ外のスレッドから呼ぶこと）
+        """
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """
+        非同期イテレーターをループ上で進め、要素を同期イテレーターとして返す（ループ外のスレッドから呼ぶこと）
+        """
+        async def next_item() -> Any:
+            return await agen.__anext__()
+
+        try:
+            while True:
+                try:
+                    item = self.run(next_item())
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            aclose = getattr(agen, "aclose", None)
+            if aclose is not None:
+                self.run(aclose())
+
+    async def get_client(self) -> AsyncClient:
+        """
+        ループ上で共有する AsyncClient を返す（トークン変更時のみ再生成する）
+        """
+        token = config.NOTION_API_TOKEN
+        if self._client is None or token != self._client_token:
+            if self._client is not None:
+                await self._client.aclose()
+            self._client = AsyncClient(auth=token)
+            self._client_token = token
+        return self._client
+
+    def close(self) -> None:
+        """クライアントを閉じてイベントループを停止する"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+        if self._client is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(5)
+            except Exception as e:
+                logger.warning(f"Notion非同期クライアントの終了に失敗しました: {e}")
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
+
+
+async def _acall_notion(func: Callable[..., Awaitable[Any]], **kwargs: Any) -> Any:
+    """
+    notion_api._call_notion の asyncio 版。
+    同期版と同じレートリミッター・リトライポリシーを共有する。
+    """
+    async def attempt() -> Any:
+        await notion_api.NOTION_RATE_LIMITER.acquire_async()
+        return await func(**kwargs)
+
+    return await notion_api.NOTION_RETRY_POLICY.call_async(
+        attempt, description=f"Notion API ({getattr(func, '__name__', 'request')})"
+    )
+
+
+async def _get_property_ids_async(
+    client: AsyncClient,
+    database_id: str,
+    names: Tuple[str, ...],
+) -> Optional[List[str]]:
+    """notion_api._get_property_ids の asyncio 版（キャッシュは同期版と共有する）。"""
+    property_ids = notion_api.get_cached_property_ids(database_id)
+    if property_ids is None:
+        try:
+            database = await _acall_notion(client.databases.retrieve, database_id=database_id)
+        except Exception as e:
+            logger.warning(f"データベースのスキーマを取得できませんでした。全プロパティを取得します (database_id: {database_id}): {e}")
+            return None
+        property_ids = notion_api.cache_property_ids(database_id, database)
+    return notion_api.select_property_ids(database_id, property_ids, names)
+
+
+async def _aiter_database_pages(
+    client: AsyncClient,
+    database_id: str,
+    filter_params: Optional[Dict[str, Any]] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    properties: Optional[Tuple[str, ...]] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    データベースのページを1リクエスト分（最大100件）ずつ返す。
+
+    前のバッチを呼び出し側が処理している間に次のページの取得を先行して開始する
+    （パイプライン化したページ送り）。parse を指定した場合は変換後のレコードを返す。
+
+    Raises:
+        notion_api.NotionAPIError: 全ページを取得できなかった場合
+    """
+    property_ids = await _get_property_ids_async(client, database_id, properties) if properties else None
+
+    async def fetch(cursor: Optional[str]) -> Dict[str, Any]:
+        query_args: Dict[str, Any] = {"database_id": database_id, "start_cursor": cursor}
+        if filter_params:
+            query_args["filter"] = filter_params
+        if property_ids:
+            query_args["filter_properties"] = property_ids
+        try:
+            return await _acall_notion(client.databases.query, **query_args)
+        except Exception as e:
+            logger.error(f"Notion APIクエリに失敗しました。database_id: {database_id}: {e}")
+            raise notion_api.NotionAPIError(f"Notionからのデータ取得に失敗しました: {e}") from e
+
+    next_task: Optional[asyncio.Task] = asyncio.ensure_future(fetch(None))
+    try:
+        while next_task is not None:
+            query_res = await next_task
+            next_task = None
+            if query_res.get("has_more"):
+                next_task = asyncio.ensure_future(fetch(query_res.get("next_cursor")))
+            results = query_res.get("results", [])
+            yield [parse(page) for page in results] if parse else results
+    finally:
+        if next_task is not None:
+            next_task.cancel()
+
+
+async def _get_all_pages_async(
+    client: AsyncClient,
+    database_id: str,
+    filter_params: Optional[Dict[str, Any]] = None,
+    parse: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    properties: Optional[Tuple[str, ...]] = None,
+) -> List[Dict[str, Any]]:
+    """_aiter_database_pages の結果を1つのリストにまとめる。"""
+    records: List[Dict[str, Any]] = []
+    async for batch in _aiter_database_pages(client, database_id, filter_params, parse, properties):
+        records.extend(batch)
+    return records
+
+
+async def refresh_supplier_store_async(
+    loop_owner: NotionEventLoop,
+    force_full: bool = False,
+    lazy: Optional[bool] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    notion_api.refresh_supplier_store の asyncio 版。
+
+    Args:
+        loop_owner: クライアントを共有するイベントループ
+        force_full: 全件取得を強制するか
+        lazy: 全件取得を行わず差分の反映のみにするか（省略時は SUPPLIER_JOIN_MODE に従う）
+
+    Returns:
+        page_id をキーとした仕入先レコード
+    """
+    if not (config.NOTION_API_TOKEN and config.NOTION_SUPPLIER_DATABASE_ID):
+        return await asyncio.to_thread(supplier_store.get_all_suppliers)
+    if lazy is None:
+        lazy = config.AppConstants.SUPPLIER_JOIN_MODE == "lazy"
+
+    client = await loop_owner.get_client()
+    async with loop_owner.supplier_refresh_lock:
+        # 仕入先キャッシュ(SQLite)の読み書きは、ループを止めないようスレッドで行う
+        plan = await asyncio.to_thread(notion_api.plan_supplier_refresh, force_full, lazy)
+        records: List[Dict[str, Any]] = []
+        if plan["action"] != "watermark_only":
+            records = await _get_all_pages_async(
+                client,
+                config.NOTION_SUPPLIER_DATABASE_ID,
+                plan["filter"],
+                parse=notion_api.parse_supplier_page,
+                properties=notion_api.SUPPLIER_PROPERTIES,
+            )
+        await asyncio.to_thread(notion_api.apply_supplier_refresh, plan, records)
+    return await asyncio.to_thread(supplier_store.get_all_suppliers)
+
+
+async def _resolve_suppliers_async(
+    client: AsyncClient,
+    supplier_ids: List[str],
+    semaphore: asyncio.Semaphore,
+    use_cache: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    notion_api._resolve_suppliers の asyncio 版。
+    キャッシュに無い仕入先だけを、semaphore の上限まで並行して取得する。
+    """
+    resolved, missing_ids = await asyncio.to_thread(notion_api.split_cached_suppliers, supplier_ids, use_cache)
+    if not missing_ids:
+        return resolved
+
+    retrieve_args: Dict[str, Any] = {}
+    property_ids = await _get_property_ids_async(
+        client, config.NOTION_SUPPLIER_DATABASE_ID, notion_api.SUPPLIER_PROPERTIES
+    )
+    if property_ids:
+        retrieve_args["filter_properties"] = property_ids
+
+    async def retrieve_supplier(supplier_id: str) -> Optional[Dict[str, Any]]:
+        async with semaphore:
+            try:
+                page = await _acall_notion(client.pages.retrieve, page_id=supplier_id, **retrieve_args)
+                return notion_api.parse_supplier_page(page)
+            except retry_policy.RetryExhaustedError as e:
+                # 一時的なエラーで解決できなかった仕入先を「未設定」扱いにすると注文が欠落するため中断する
+                raise notion_api.NotionAPIError(
+                    f"仕入先ページを取得できませんでした (page_id: {supplier_id}): {e}"
+                ) from e
+            except Exception as e:
+                # 削除済み・権限なし(4xx)の仕入先は未設定として扱う
+                logger.warning(f"仕入先ページの取得に失敗しました (page_id: {supplier_id}): {e}")
+                return None
+
+    fetched = [
+        record
+        for record in await asyncio.gather(*(retrieve_supplier(supplier_id) for supplier_id in missing_ids))
+        if record
+    ]
+    await asyncio.to_thread(supplier_store.save_suppliers, fetched)
+    for record in fetched:
+        resolved[record["page_id"]] = record
+    logger.info(f"仕入先を個別取得しました: {len(fetched)}/{len(missing_ids)}件")
+    return resolved
+
+
+async def _retrieve_order_page_async(client: AsyncClient, page_id: str) -> Dict[str, Any]:
+    """notion_api._retrieve_order_page の asyncio 版。"""
+    retrieve_args: Dict[str, Any] = {}
+    property_ids = await _get_property_ids_async(client, config.PAGE_ID_CONTAINING_DB, notion_api.ORDER_PROPERTIES)
+    if property_ids:
+        retrieve_args["filter_properties"] = property_ids
+    try:
+        page = await _acall_notion(client.pages.retrieve, page_id=page_id, **retrieve_args)
+    except Exception as e:
+        raise notion_api.NotionAPIError(f"注文ページを取得できませんでした (page_id: {page_id}): {e}") from e
+    return notion_api.parse_order_page(page)
+
+
+async def _aiter_order_records(
+    client: AsyncClient,
+    final_filter: Dict[str, Any],
+    notion_department_names: List[str],
+    incremental: bool,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """notion_api._iter_order_records の asyncio 版。"""
+    if not incremental:
+        async for batch in _aiter_database_pages(
+            client,
+            config.PAGE_ID_CONTAINING_DB,
+            final_filter,
+            parse=notion_api.parse_order_page,
+            properties=notion_api.ORDER_PROPERTIES,
+        ):
+            yield batch
+        return
+
+    # スナップショットの計画・反映は全ページを走査するため、ループを止めないようスレッドで行う
+    plan = await asyncio.to_thread(notion_api.plan_snapshot_sync, config.PAGE_ID_CONTAINING_DB, final_filter)
+    fetched: List[Dict[str, Any]] = []
+    async for batch in _aiter_database_pages(
+        client,
+        config.PAGE_ID_CONTAINING_DB,
+        plan["filter"],
+        parse=notion_api.parse_order_page,
+        properties=notion_api.ORDER_PROPERTIES,
+    ):
+        fetched.extend(batch)
+        if plan["full"]:
+            yield batch
+
+    is_member = lambda order: notion_api.is_order_pending(order, notion_department_names)
+    if plan["full"]:
+        await asyncio.to_thread(notion_api.apply_snapshot_sync, plan, fetched, is_member)
+        return
+    if not plan["check_membership"]:
+        records = await asyncio.to_thread(notion_api.apply_snapshot_sync, plan, fetched, is_member)
+        for start in range(0, len(records), notion_api.ORDER_BATCH_SIZE):
+            yield records[start:start + notion_api.ORDER_BATCH_SIZE]
+        return
+
+    # 一定間隔で対象のページをサーバー側の条件で確認し直し、確認できたページから順に返す
+    known = await asyncio.to_thread(notion_api.merge_snapshot_changes, plan, fetched)
+    members: List[Dict[str, Any]] = []
+    semaphore = asyncio.Semaphore(config.AppConstants.NOTION_ASYNC_CONCURRENCY)
+
+    async def retrieve(page_id: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await _retrieve_order_page_async(client, page_id)
+
+    async for page_ids in _aiter_database_pages(
+        client,
+        config.PAGE_ID_CONTAINING_DB,
+        final_filter,
+        parse=lambda page: page["id"],
+        properties=notion_api.MEMBERSHIP_PROPERTIES,
+    ):
+        batch = [known[page_id] for page_id in page_ids if page_id in known]
+        batch.extend(await asyncio.gather(*(retrieve(page_id) for page_id in page_ids if page_id not in known)))
+        members.extend(batch)
+        yield batch
+    await asyncio.to_thread(notion_api.apply_snapshot_sync, plan, members, members_only=True)
+
+
+async def aiter_order_data_from_notion(
+    loop_owner: NotionEventLoop,
+    department_names: Optional[List[str]] = None,
+    incremental: Optional[bool] = None,
+    join_mode: Optional[str] = None,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    notion_api.iter_order_data_from_notion の asyncio 版。
+
+    注文ページはパイプライン化したページ送りで取得するため、バッチの仕入先を解決している間に
+    次のページの取得が進む。
+
+    Args:
+        loop_owner: クライアントを共有するイベントループ
+        department_names: 部署名のリスト（フィルタリング用）
+        incremental: 増分同期を行うか（省略時は AppConstants.NOTION_INCREMENTAL_SYNC）
+        join_mode: 仕入先の結合方式 "lazy" / "full"（省略時は AppConstants.SUPPLIER_JOIN_MODE）
+        concurrency: 仕入先取得の最大同時実行数（省略時は AppConstants.NOTION_ASYNC_CONCURRENCY）
+
+    Yields:
+        {"orders": 注文データのリスト, "unlinked_count": 仕入先を特定できなかった件数,
+         "unlinked_orders": 仕入先を特定できなかった注文の {"page_id", "departments"} のリスト}
+
+    Raises:
+        notion_api.NotionAPIError: 取得・結合が途中で失敗した場合（それまでに返したバッチは破棄すること）
+    """
+    if not all(
+        [config.NOTION_API_TOKEN, config.PAGE_ID_CONTAINING_DB, config.NOTION_SUPPLIER_DATABASE_ID]
+    ):
+        return
+
+    if incremental is None:
+        incremental = config.AppConstants.NOTION_INCREMENTAL_SYNC
+    if join_mode is None:
+        join_mode = config.AppConstants.SUPPLIER_JOIN_MODE
+    lazy_join = join_mode == "lazy"
+    semaphore = asyncio.Semaphore(concurrency or config.AppConstants.NOTION_ASYNC_CONCURRENCY)
+
+    client = await loop_owner.get_client()
+    supplier_task: Optional[asyncio.Task] = None
+
+    try:
+        # 仕入先キャッシュの再検証は注文の取得と並行して行う
+        if not (lazy_join and not incremental):
+            supplier_task = asyncio.ensure_future(
+                refresh_supplier_store_async(loop_owner, force_full=not incremental, lazy=lazy_join)
+            )
+
+        final_filter, notion_department_names = notion_api.build_order_filter(department_names)
+        suppliers_map: Dict[str, Dict[str, Any]] = {}
+
+        async for order_records in _aiter_order_records(client, final_filter, notion_department_names, incremental):
+            if supplier_task is not None:
+                suppliers_map = dict(await supplier_task)
+                supplier_task = None
+            if lazy_join:
+                # 前のバッチで解決済みの仕入先は再取得しない
+                unresolved_ids = [
+                    order["supplier_id"]
+                    for order in order_records
+                    if order["supplier_id"] and order["supplier_id"] not in suppliers_map
+                ]
+                if unresolved_ids:
+                    suppliers_map.update(
+                        await _resolve_suppliers_async(client, unresolved_ids, semaphore, use_cache=incremental)
+                    )
+            yield notion_api.join_orders(order_records, suppliers_map)
+
+        if supplier_task is not None:
+            await supplier_task
+            supplier_task = None
+
+    except notion_api.NotionAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Notionから注文データ取得中にエラーが発生しました: {e}", exc_info=True)
+        raise notion_api.NotionAPIError(f"注文データの処理中にエラーが発生しました: {e}") from e
+    finally:
+        # 途中で失敗・中断した場合に、仕入先の再検証をループ上に放置しない
+        if supplier_task is not None and not supplier_task.done():
+            supplier_task.cancel()
+
+
+async def get_order_data_from_notion_async(
+    loop_owner: NotionEventLoop,
+    department_names: Optional[List[str]] = None,
+    incremental: Optional[bool] = None,
+    join_mode: Optional[str] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    notion_api.get_order_data_from_notion の asyncio 版（aiter_order_data_from_notion の結果をまとめたもの）。
+
+    Raises:
+        notion_api.NotionAPIError: Notion からの取得がリトライ後も失敗した場合
+    """
+    orders: List[Dict[str, Any]] = []
+    unlinked_count = 0
+    async for batch in aiter_order_data_from_notion(loop_owner, department_names, incremental, join_mode, concurrency):
+        orders.extend(batch["orders"])
+        unlinked_count += batch["unlinked_count"]
+    return {"orders": orders, "unlinked_count": unlinked_count}
+
+
+async def update_notion_pages_async(
+    loop_owner: NotionEventLoop,
+    page_ids: List[str],
+    concurrency: Optional[int] = None,
+    current_order_dates: Optional[Dict[str, str]] = None,
+) -> notion_api.NotionUpdateResult:
+    """
+    notion_api.update_notion_pages の asyncio 版。
+
+    Args:
+        loop_owner: クライアントを共有するイベントループ
+        page_ids: 更新するページIDのリスト（重複は1回だけ更新する）
+        concurrency: 最大同時実行数（省略時は AppConstants.NOTION_ASYNC_CONCURRENCY）
+        current_order_dates: 取得済みの注文レコードの発注日（既に当日になっているページは更新しない）
+
+    Returns:
+        更新結果
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    page_ids, skipped = notion_api.split_up_to_date(page_ids, current_order_dates, today)
+    if not page_ids:
+        if not skipped:
+            logger.warning("更新するページIDが空です")
+        return notion_api.NotionUpdateResult([], {}, skipped)
+
+    client = await loop_owner.get_client()
+    semaphore = asyncio.Semaphore(concurrency or config.AppConstants.NOTION_ASYNC_CONCURRENCY)
+
+    async def update_page(page_id: str) -> Tuple[str, bool, Optional[str]]:
+        async with semaphore:
+            try:
+                await _acall_notion(
+                    client.pages.update,
+                    page_id=page_id,
+                    properties={"発注日": {"date": {"start": today}}}
+                )
+                logger.debug(f"Notionページ更新成功: {page_id}")
+                return (page_id, True, None)
+            except Exception as e:
+                error_msg = str(e)
+                logger.error(f"Notionページ更新エラー (page_id: {page_id}): {error_msg}")
+                return (page_id, False, error_msg)
+
+    logger.info(f"Notionページ更新開始: {len(page_ids)}件を非同期で処理")
+    results = await asyncio.gather(*(update_page(page_id) for page_id in page_ids))
+    return notion_api.log_update_results(list(results), skipped)
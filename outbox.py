@@ -0,0 +1,666 @@
+"""
+送信待ちキュー（outbox）モジュール
+送信するメールと送信状況・Notionの「発注日」更新の状況をAppData配下のSQLiteに記録し、
+送信できなかったメールや更新できなかったNotionページをバックグラウンドで再試行する
+（アプリが落ちた場合も次回起動時に続きから処理する）
+
+「発注日」の更新はページ単位で記録し、一括更新で失敗したページだけを待機時間をおいて更新できるまで再試行する。
+
+送信中に接続が切れたりアプリが落ちたりして、サーバーが受け付けたか分からないメールは自動では再送せず、
+送信結果が不明として記録してユーザーに確認を求める（注文メールが二重に届かないようにするため）。
+"""
+import json
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import closing
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import config
+import email_service
+import logger_config
+import notion_api
+import smtp_pool
+
+logger = logger_config.get_logger(__name__)
+
+# AppData/OrderMailer 配下に作成するファイル名・フォルダ名
+OUTBOX_DB_FILENAME = "outbox.db"
+OUTBOX_DIRNAME = "outbox"
+
+# メールの送信状況
+STATUS_PENDING = "pending"  # 送信待ち（未送信・再試行待ち）
+STATUS_SENDING = "sending"  # 送信中（この状態のまま終了した場合は送信結果が不明として扱う）
+STATUS_UNKNOWN = "unknown"  # 送信結果が不明（自動では再送せず、ユーザーの確認を待つ）
+STATUS_SENT = "sent"        # 送信済み
+STATUS_FAILED = "failed"    # 再試行しても送信できないエラー
+
+# 送信前の確認で「送信待ち」として扱う状況（重ねて送信しない）
+_UNSETTLED_STATUSES = (STATUS_PENDING, STATUS_SENDING, STATUS_UNKNOWN)
+
+# Notionの「発注日」更新の状況
+NOTION_UNDECIDED = "undecided"  # 更新するかどうか未確認
+NOTION_PENDING = "pending"      # 更新待ち（再試行待ちを含む）
+NOTION_DONE = "done"            # 更新済み
+NOTION_SKIPPED = "skipped"      # 更新しない
+
+_FIELDS = (
+    "id", "supplier_name", "sender_email", "recipients", "message_path", "page_ids",
+    "status", "attempts", "last_error", "notion_status",
+)
+
+_lock = threading.RLock()
+
+
+class OutboxEntry(NamedTuple):
+    """送信待ちキューの1仕入先分の記録"""
+    id: int
+    supplier_name: str
+    sender_email: str
+    recipients: List[str]
+    message_path: str
+    page_ids: List[str]
+    status: str
+    attempts: int
+    last_error: str
+    notion_status: str
+
+
+# 送信1通ごとに (記録, 送信状況, エラーメッセージ) で呼ばれる関数
+SendResultCallback = Callable[[OutboxEntry, str, Optional[str]], None]
+
+# NotionページIDのリストを受け取り「発注日」を一括更新して結果を返す関数（notion_api.update_notion_pages）
+NotionUpdater = Callable[[List[str]], notion_api.NotionUpdateResult]
+
+
+def _get_db_path() -> str:
+    """SQLiteファイルのパスを返す"""
+    return config._get_user_config_path(OUTBOX_DB_FILENAME)
+
+
+def _get_message_dir() -> str:
+    """送信するメッセージを保存するフォルダのパスを返す（存在しない場合は作成する）"""
+    message_dir = config._get_user_config_path(OUTBOX_DIRNAME)
+    os.makedirs(message_dir, exist_ok=True)
+    return message_dir
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    SQLiteに接続し、必要なテーブルを作成する
+
+    Returns:
+        SQLite接続
+    """
+    conn = sqlite3.connect(_get_db_path())
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_name TEXT NOT NULL,
+            sender_email TEXT NOT NULL,
+            recipients TEXT NOT NULL,
+            message_path TEXT NOT NULL,
+            page_ids TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT NOT NULL DEFAULT '',
+            notion_status TEXT NOT NULL DEFAULT 'undecided',
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            claimed INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """
+    )
+    # 「発注日」の更新待ちのページ（更新できたら削除する）
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notion_updates (
+            entry_id INTEGER NOT NULL,
+            page_id TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT NOT NULL DEFAULT '',
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            claimed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (entry_id, page_id)
+        )
+        """
+    )
+    return conn
+
+
+def _to_entry(row: Tuple[Any, ...]) -> OutboxEntry:
+    record = dict(zip(_FIELDS, row))
+    record["recipients"] = json.loads(record["recipients"])
+    record["page_ids"] = json.loads(record["page_ids"])
+    return OutboxEntry(**record)
+
+
+def _select(where: str, params: Tuple[Any, ...] = ()) -> List[OutboxEntry]:
+    with closing(_connect()) as conn:
+        rows = conn.execute(f"SELECT {', '.join(_FIELDS)} FROM outbox WHERE {where} ORDER BY id", params).fetchall()
+    return [_to_entry(row) for row in rows]
+
+
+def _retry_delay(attempts: int) -> float:
+    """attempts 回失敗した後の再試行までの待機秒数（指数バックオフ）"""
+    delay = config.AppConstants.OUTBOX_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    return min(config.AppConstants.OUTBOX_RETRY_MAX_SECONDS, delay)
+
+
+def enqueue_order(account_key: str, sender_creds: Dict[str, Any], order: email_service.OrderMail) -> int:
+    """
+    注文メールを組み立てて送信待ちキューに記録する
+
+    記録した時点で呼び出し元が送信を担当する（バックグラウンドの再試行の対象にはならない）。
+    send_entries で送信すると、送信できなかった場合に再試行の対象になる。
+
+    Returns:
+        記録のID
+
+    Raises:
+        email_service.MailBuildError: 注文アイテム・添付PDF・宛先に問題がある場合
+        OSError, sqlite3.Error: メッセージや記録を保存できない場合
+    """
+    error_message = email_service._check_order(order.items, order.pdf_path)
+    if error_message:
+        raise email_service.MailBuildError(error_message)
+    sender_email = sender_creds.get("sender") or ""
+    display_name = sender_creds.get("display_name", account_key)
+
+    message_path = os.path.join(_get_message_dir(), f"{uuid.uuid4().hex}.eml")
+    try:
+        with open(message_path, "wb") as f:
+            recipients = email_service.write_order_message(
+                f, order.items[0], order.pdf_path, sender_email, display_name, order.selected_department, order.prepared
+            )
+        now = time.time()
+        with _lock, closing(_connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (supplier_name, sender_email, recipients, message_path, page_ids, "
+                "claimed, created_at, updated_at) VALUES (?, ?, ?, ?, ?, 1, ?, ?)",
+                (
+                    order.supplier_name, sender_email, json.dumps(recipients), message_path,
+                    json.dumps([item["page_id"] for item in order.items]), now, now,
+                ),
+            )
+            entry_id = cursor.lastrowid
+    except Exception:
+        _remove_message(message_path)
+        raise
+    logger.debug(f"送信待ちキューに記録しました: {order.supplier_name} (id={entry_id})")
+    return entry_id
+
+
+def get_entries(entry_ids: List[int]) -> List[OutboxEntry]:
+    """指定したIDの記録を返す"""
+    if not entry_ids:
+        return []
+    return _select(f"id IN ({', '.join('?' for _ in entry_ids)})", tuple(entry_ids))
+
+
+def find_pending(page_ids: List[str]) -> List[OutboxEntry]:
+    """
+    指定した注文ページを含む送信待ち・送信中・送信結果が不明の記録を返す（同じ注文を重ねて送信しないために使う）
+    """
+    targets = set(page_ids)
+    try:
+        entries = _select(
+            f"status IN ({', '.join('?' for _ in _UNSETTLED_STATUSES)})", _UNSETTLED_STATUSES
+        )
+    except sqlite3.Error as e:
+        logger.warning(f"送信待ちキューを読み込めませんでした: {e}")
+        return []
+    return [entry for entry in entries if targets.intersection(entry.page_ids)]
+
+
+def _update(entry_ids: List[int], assignments: str, params: Tuple[Any, ...] = ()) -> None:
+    """記録を更新する（失敗した場合はログのみ残し、次回起動時に再送される）"""
+    if not entry_ids:
+        return
+    try:
+        with _lock, closing(_connect()) as conn, conn:
+            conn.execute(
+                f"UPDATE outbox SET {assignments}, updated_at = ? WHERE id IN ({', '.join('?' for _ in entry_ids)})",
+                params + (time.time(),) + tuple(entry_ids),
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"送信待ちキューを更新できませんでした (id={entry_ids}): {e}")
+
+
+def _remove_message(message_path: str) -> None:
+    try:
+        os.remove(message_path)
+    except OSError:
+        pass
+
+
+def mark_sending(entry: OutboxEntry) -> None:
+    """送信を始めたことを記録する（送信中に終了した場合、次回起動時に再送しないため）"""
+    _update([entry.id], "status = ?", (STATUS_SENDING,))
+
+
+def mark_unknown(entry: OutboxEntry, error_message: str) -> None:
+    """
+    送信結果が不明として記録する（自動では再送しない）
+    ユーザーが確認した後に再送できるよう、保存したメッセージは残す
+    """
+    _update(
+        [entry.id], "status = ?, attempts = attempts + 1, last_error = ?, claimed = 0", (STATUS_UNKNOWN, error_message)
+    )
+
+
+def resolve_unknown(entries: List[OutboxEntry], delivered: bool) -> None:
+    """
+    送信結果が不明のメールについて、ユーザーが確認した結果を記録する
+
+    Args:
+        entries: 送信結果が不明の記録
+        delivered: 届いていた場合はTrue（送信済みにする）、届いていなかった場合はFalse（もう一度送信できるようにする）
+    """
+    status = STATUS_SENT if delivered else STATUS_FAILED
+    _update([entry.id for entry in entries], "status = ?, claimed = 0", (status,))
+    for entry in entries:
+        _remove_message(entry.message_path)
+
+
+def mark_sent(entry: OutboxEntry) -> None:
+    """送信済みにする（保存したメッセージは不要になるため削除する）"""
+    _update([entry.id], "status = ?, attempts = attempts + 1, last_error = '', claimed = 0", (STATUS_SENT,))
+    _remove_message(entry.message_path)
+
+
+def mark_failed(entry: OutboxEntry, error_message: str) -> None:
+    """再試行しても送信できない失敗として記録する"""
+    _update(
+        [entry.id], "status = ?, attempts = attempts + 1, last_error = ?, claimed = 0", (STATUS_FAILED, error_message)
+    )
+    _remove_message(entry.message_path)
+
+
+def schedule_retry(entry: OutboxEntry, error_message: str) -> None:
+    """送信に失敗したメールを、待機してから再送するよう記録する"""
+    attempts = entry.attempts + 1
+    _update(
+        [entry.id],
+        "status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, claimed = 0",
+        (STATUS_PENDING, attempts, error_message, time.time() + _retry_delay(attempts)),
+    )
+
+
+def request_notion_update(entry_ids: List[int], update: bool = True) -> None:
+    """
+    送信済みのメールについて、Notionの「発注日」を更新するかどうかを記録する
+
+    Args:
+        entry_ids: 記録のIDのリスト
+        update: Trueなら注文ページを更新待ちにし、Falseなら更新しない
+    """
+    if not update:
+        _update(entry_ids, "notion_status = ?", (NOTION_SKIPPED,))
+        return
+    try:
+        with _lock, closing(_connect()) as conn, conn:
+            _queue_notion_pages(conn, get_entries(entry_ids))
+    except sqlite3.Error as e:
+        logger.warning(f"Notionの更新待ちを記録できませんでした (id={entry_ids}): {e}")
+
+
+def _queue_notion_pages(conn: sqlite3.Connection, entries: List[OutboxEntry]) -> None:
+    """
+    記録の注文ページを「発注日」の更新待ちにする
+
+    既に更新待ちのページは、ワーカーが処理中の場合や失敗回数を失わないよう、そのまま残す。
+    """
+    conn.executemany(
+        "INSERT INTO notion_updates (entry_id, page_id) VALUES (?, ?) ON CONFLICT(entry_id, page_id) DO NOTHING",
+        [(entry.id, page_id) for entry in entries for page_id in entry.page_ids],
+    )
+    conn.executemany(
+        "UPDATE outbox SET notion_status = ?, updated_at = ? WHERE id = ?",
+        [(NOTION_PENDING, time.time(), entry.id) for entry in entries],
+    )
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """
+    時間をおけば送信できる可能性があるエラーかどうか
+
+    接続の失敗・切断と一時的なエラー（4xx）は再試行し、認証エラーや宛先の拒否などの恒久的なエラーは再試行しない。
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+def send_entries(entries: List[OutboxEntry], on_result: Optional[SendResultCallback] = None) -> Dict[int, Tuple[str, Optional[str]]]:
+    """
+    記録したメールを送信プールで送信し、結果を記録する
+
+    一時的なエラーで送信できなかったメールは、上限回数まで待機時間をおいて再試行の対象にする。
+    メッセージの終端を送った後に接続が切れたメールは、送信結果が不明として再送しない。
+    on_result はワーカースレッドから呼ばれる。
+
+    Returns:
+        記録のID -> (送信状況, エラーメッセージ)
+    """
+    results: Dict[int, Tuple[str, Optional[str]]] = {}
+    results_lock = threading.Lock()
+
+    def report(entry: OutboxEntry, status: str, error_message: Optional[str]) -> None:
+        with results_lock:
+            results[entry.id] = (status, error_message)
+        if on_result:
+            on_result(entry, status, error_message)
+
+    def fail(entry: OutboxEntry, error: Optional[BaseException], error_message: str) -> None:
+        if error is not None and _is_retryable(error) and entry.attempts + 1 < config.AppConstants.OUTBOX_MAX_SEND_ATTEMPTS:
+            schedule_retry(entry, error_message)
+            report(entry, STATUS_PENDING, error_message)
+        else:
+            mark_failed(entry, error_message)
+            report(entry, STATUS_FAILED, error_message)
+
+    by_sender: Dict[str, List[OutboxEntry]] = {}
+    for entry in entries:
+        by_sender.setdefault(entry.sender_email, []).append(entry)
+
+    for sender_email, sender_entries in by_sender.items():
+        password, error_message = email_service._get_password(sender_email)
+        if not password:
+            for entry in sender_entries:
+                fail(entry, None, error_message or "パスワードを取得できませんでした。")
+            continue
+
+        auth_errors: List[str] = []
+        futures: List[Tuple[OutboxEntry, Future]] = []
+
+        def make_job(entry: OutboxEntry) -> Callable[[email_service.SmtpSession], None]:
+            def job(session: email_service.SmtpSession) -> None:
+                mark_sending(entry)
+                try:
+                    session.sendmail(entry.recipients, email_service.file_message_stream(entry.message_path))
+                except email_service.DeliveryUnknownError as e:
+                    error_message = str(e)
+                    logger.warning(f"「{entry.supplier_name}」宛のメールの送信結果を確認できませんでした: {e}")
+                    mark_unknown(entry, error_message)
+                    report(entry, STATUS_UNKNOWN, error_message)
+                    return
+                except smtplib.SMTPAuthenticationError as e:
+                    email_service.invalidate_password_cache(entry.sender_email)
+                    error_message = email_service._describe_send_error(e)
+                    auth_errors.append(error_message)
+                    pool.cancel_pending()
+                    fail(entry, e, error_message)
+                    return
+                except Exception as e:
+                    fail(entry, e, email_service._describe_send_error(e))
+                    return
+                mark_sent(entry)
+                logger.info(f"メール送信成功: {entry.supplier_name} 宛")
+                report(entry, STATUS_SENT, None)
+            return job
+
+        with smtp_pool.create_pool(
+            lambda sender_email=sender_email, password=password: email_service.SmtpSession(sender_email, password)
+        ) as pool:
+            for entry in sender_entries:
+                futures.append((entry, pool.submit(make_job(entry))))
+
+        for entry, future in futures:
+            if future.cancelled():
+                fail(entry, None, auth_errors[0] if auth_errors else "送信を中止しました。")
+
+    return results
+
+
+def update_notion(entry_ids: List[int], updater: NotionUpdater) -> notion_api.NotionUpdateResult:
+    """
+    送信済みのメールの注文ページの「発注日」を一括更新し、結果を記録する
+    更新できなかったページはバックグラウンドで再試行する
+
+    ワーカーが処理中のページは更新せず、ワーカーに任せる。
+
+    Returns:
+        更新結果（ワーカーが処理中のページは含まない）
+
+    Raises:
+        sqlite3.Error: 更新待ちを記録できない場合（更新しないまま成功として扱わないため）
+    """
+    placeholders = ", ".join("?" for _ in entry_ids)
+    with _lock, closing(_connect()) as conn, conn:
+        _queue_notion_pages(conn, get_entries(entry_ids))
+        rows = conn.execute(
+            f"SELECT entry_id, page_id, attempts FROM notion_updates WHERE entry_id IN ({placeholders}) AND claimed = 0",
+            tuple(entry_ids),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE notion_updates SET claimed = 1 WHERE entry_id = ? AND page_id = ? AND claimed = 0",
+            [(entry_id, page_id) for entry_id, page_id, _ in rows],
+        )
+    if not rows:
+        return notion_api.NotionUpdateResult([], {}, [])
+    return _run_notion_update(rows, updater)[0]
+
+
+def _run_notion_update(
+    rows: List[Tuple[int, str, int]], updater: NotionUpdater
+) -> Tuple[notion_api.NotionUpdateResult, List[int]]:
+    """
+    更新待ちのページをまとめて更新し、更新できたページを削除・失敗したページを再試行待ちにする
+
+    Args:
+        rows: (記録のID, ページID, 失敗回数) のリスト
+
+    Returns:
+        (更新結果, 全てのページを更新できた記録のIDのリスト)
+    """
+    page_ids = list(dict.fromkeys(page_id for _, page_id, _ in rows))
+    try:
+        result = updater(page_ids)
+    except Exception as e:
+        # クライアントの初期化エラーなど、一括更新自体が失敗した場合は全てのページを再試行する
+        logger.warning(f"Notionページの一括更新に失敗しました ({len(page_ids)}件): {e}")
+        result = notion_api.NotionUpdateResult([], {page_id: str(e) for page_id in page_ids}, [])
+
+    now = time.time()
+    entry_ids = list(dict.fromkeys(entry_id for entry_id, _, _ in rows))
+    try:
+        with _lock, closing(_connect()) as conn, conn:
+            conn.executemany(
+                "DELETE FROM notion_updates WHERE entry_id = ? AND page_id = ?",
+                [(entry_id, page_id) for entry_id, page_id, _ in rows if page_id not in result.failed],
+            )
+            conn.executemany(
+                "UPDATE notion_updates SET attempts = ?, last_error = ?, next_attempt_at = ?, claimed = 0 "
+                "WHERE entry_id = ? AND page_id = ?",
+                [
+                    (attempts + 1, result.failed[page_id], now + _retry_delay(attempts + 1), entry_id, page_id)
+                    for entry_id, page_id, attempts in rows if page_id in result.failed
+                ],
+            )
+            remaining = {
+                row[0] for row in conn.execute(
+                    f"SELECT DISTINCT entry_id FROM notion_updates WHERE entry_id IN ({', '.join('?' for _ in entry_ids)})",
+                    tuple(entry_ids),
+                )
+            }
+            done = [entry_id for entry_id in entry_ids if entry_id not in remaining]
+            conn.executemany(
+                "UPDATE outbox SET notion_status = ?, updated_at = ? WHERE id = ?",
+                [(NOTION_DONE, now, entry_id) for entry_id in done],
+            )
+    except sqlite3.Error as e:
+        logger.warning(f"Notionの更新結果を記録できませんでした: {e}")
+        return result, []
+    if result.failed:
+        logger.warning(f"更新できなかったNotionページ{len(result.failed)}件は、時間をおいて再試行します")
+    return result, done
+
+
+def _claim(where: str, params: Tuple[Any, ...], now: float) -> List[OutboxEntry]:
+    """期限が来た未処理の記録を取得し、処理中にする（UIの送信処理と重ねて処理しないため）"""
+    with _lock:
+        entries = _select(f"{where} AND claimed = 0 AND next_attempt_at <= ?", params + (now,))
+        _update([entry.id for entry in entries], "claimed = 1")
+    return entries
+
+
+def _claim_notion_pages(now: float) -> List[Tuple[int, str, int]]:
+    """期限が来た更新待ちのページを取得し、処理中にする"""
+    with _lock, closing(_connect()) as conn, conn:
+        rows = conn.execute(
+            "SELECT entry_id, page_id, attempts FROM notion_updates WHERE claimed = 0 AND next_attempt_at <= ? "
+            "ORDER BY entry_id",
+            (now,),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE notion_updates SET claimed = 1 WHERE entry_id = ? AND page_id = ?",
+            [(entry_id, page_id) for entry_id, page_id, _ in rows],
+        )
+    return rows
+
+
+def resume() -> Tuple[int, int, int]:
+    """
+    前回起動時に処理が終わらなかった記録を、再試行の対象に戻す（起動時に1回呼ぶ）
+
+    送信を始める前に終了したメールは再送する。送信中に終了したメールはサーバーが受け付けた可能性があるため、
+    再送せずに送信結果が不明として記録する。
+
+    Returns:
+        (送信待ちのメールの件数, 更新待ちのNotionの件数, 送信結果が不明のメールの件数)
+    """
+    try:
+        with _lock, closing(_connect()) as conn, conn:
+            conn.execute("UPDATE outbox SET claimed = 0")
+            conn.execute(
+                "UPDATE outbox SET status = ?, last_error = ? WHERE status = ?",
+                (STATUS_UNKNOWN, "送信中にアプリが終了しました。", STATUS_SENDING),
+            )
+            conn.execute("UPDATE notion_updates SET claimed = 0")
+            if config.AppConstants.OUTBOX_UPDATE_NOTION_AFTER_RESEND:
+                # 送信後に更新するかどうかを確認する前に終了した注文は、更新待ちにする
+                rows = conn.execute(
+                    f"SELECT {', '.join(_FIELDS)} FROM outbox WHERE status = ? AND notion_status = ?",
+                    (STATUS_SENT, NOTION_UNDECIDED),
+                ).fetchall()
+                _queue_notion_pages(conn, [_to_entry(row) for row in rows])
+            cutoff = time.time() - config.AppConstants.OUTBOX_RETENTION_DAYS * 86400
+            conn.execute(
+                f"DELETE FROM outbox WHERE updated_at < ? AND status NOT IN ({', '.join('?' for _ in _UNSETTLED_STATUSES)}) "
+                "AND notion_status != ?",
+                (cutoff,) + _UNSETTLED_STATUSES + (NOTION_PENDING,),
+            )
+            pending = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_PENDING,)).fetchone()[0]
+            notion_pending = conn.execute("SELECT COUNT(DISTINCT entry_id) FROM notion_updates").fetchone()[0]
+            unknown = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_UNKNOWN,)).fetchone()[0]
+    except sqlite3.Error as e:
+        logger.warning(f"送信待ちキューを読み込めませんでした: {e}")
+        return 0, 0, 0
+    return pending, notion_pending, unknown
+
+
+# バックグラウンドで処理した結果の通知 (種類, 記録, エラーメッセージ)
+# 種類は "sent" / "retry" / "failed" / "unknown" / "notion_updated" / "notion_retry"
+OutboxEventCallback = Callable[[str, OutboxEntry, Optional[str]], None]
+
+
+def process_due(
+    updater: NotionUpdater,
+    on_event: Optional[OutboxEventCallback] = None,
+    now: Optional[float] = None,
+) -> int:
+    """
+    再試行の期限が来たメールの送信と、Notionの「発注日」の更新を1回分処理する
+
+    Returns:
+        処理した記録の件数
+    """
+    now = time.time() if now is None else now
+    notify = on_event or (lambda kind, entry, error: None)
+    events = {STATUS_SENT: "sent", STATUS_PENDING: "retry", STATUS_FAILED: "failed", STATUS_UNKNOWN: "unknown"}
+
+    def on_result(entry: OutboxEntry, status: str, error_message: Optional[str]) -> None:
+        if status == STATUS_SENT and config.AppConstants.OUTBOX_UPDATE_NOTION_AFTER_RESEND:
+            # 再送は確認する人がいないため、送信できた注文はそのまま「発注日」の更新待ちにする
+            request_notion_update([entry.id])
+        notify(events[status], entry, error_message)
+
+    sends = _claim("status = ?", (STATUS_PENDING,), now)
+    if sends:
+        logger.info(f"送信待ちのメールを送信します: {len(sends)}件")
+        send_entries(sends, on_result)
+
+    rows = _claim_notion_pages(now)
+    if rows:
+        logger.info(f"更新待ちのNotionページを一括更新します: {len(rows)}件")
+        result, done = _run_notion_update(rows, updater)
+        for entry in get_entries(list(dict.fromkeys(entry_id for entry_id, _, _ in rows))):
+            if entry.id in done:
+                notify("notion_updated", entry, None)
+            else:
+                failed = [page_id for page_id in entry.page_ids if page_id in result.failed]
+                notify("notion_retry", entry, result.failed[failed[0]] if failed else None)
+    return len(sends) + len(rows)
+
+
+class OutboxWorker:
+    """
+    送信待ちキューをバックグラウンドで定期的に処理するワーカー
+
+    起動時に前回の続きを再試行の対象に戻し、以降は OUTBOX_POLL_INTERVAL ごと（または wake() で即時）に処理する。
+    """
+
+    def __init__(self, updater: NotionUpdater, on_event: Optional[OutboxEventCallback] = None) -> None:
+        """
+        Args:
+            updater: Notionの「発注日」を更新する関数
+            on_event: バックグラウンドで処理した結果を通知する関数（ワーカースレッドから呼ばれる）
+        """
+        self._updater = updater
+        self._on_event = on_event
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> Tuple[int, int, int]:
+        """
+        ワーカーを起動する
+
+        Returns:
+            (送信待ちのメールの件数, 更新待ちのNotionの件数, 送信結果が不明のメールの件数)
+        """
+        counts = resume()
+        self._thread = threading.Thread(target=self._run, name="OutboxWorker", daemon=True)
+        self._thread.start()
+        return counts
+
+    def wake(self) -> None:
+        """待機中のワーカーに、すぐに処理させる"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """ワーカーを停止する（処理中の送信は完了を待たない）"""
+        self._stopped = True
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            try:
+                process_due(self._updater, self._on_event)
+            except Exception as e:
+                logger.error(f"送信待ちキューの処理中にエラーが発生しました: {e}", exc_info=True)
+            self._wake.wait(config.AppConstants.OUTBOX_POLL_INTERVAL)
+            self._wake.clear()
@@ -0,0 +1,158 @@
+"""
+注文書PDFのキャッシュモジュール
+注文内容・差出人・部署・テンプレートから求めたハッシュをキーに、生成済みPDFをAppData配下に保存して再利用する
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import config
+import logger_config
+import pdf_generator
+
+logger = logger_config.get_logger(__name__)
+
+# AppData/OrderMailer 配下に作成するフォルダ名
+PDF_CACHE_DIRNAME = "pdf_cache"
+
+_lock = threading.Lock()
+
+
+def _get_cache_dir() -> str:
+    """キャッシュフォルダのパスを返す（存在しない場合は作成する）"""
+    cache_dir = config._get_user_config_path(PDF_CACHE_DIRNAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def make_key(
+    supplier_name: str,
+    items: List[Dict[str, Any]],
+    sender_info: Dict[str, str],
+    selected_department: Optional[str] = None,
+) -> str:
+    """
+    PDFの内容を決める要素からキャッシュキーを作成する
+
+    発行日もキーに含めるため、再利用は同じ日の中に限られる。
+
+    Args:
+        supplier_name: 仕入先名
+        items: 注文アイテムのリスト
+        sender_info: 差出人情報
+        selected_department: 部署名
+
+    Returns:
+        キャッシュキー（SHA-256の16進文字列）
+    """
+    normalized = {
+        "template": pdf_generator.PDF_TEMPLATE_VERSION,
+        "font": pdf_generator.register_japanese_font(),
+        "company": config.AppConstants.COMPANY_INFO,
+        "issue_date": datetime.now().strftime("%Y/%m/%d"),
+        "supplier": supplier_name,
+        **pdf_generator.rendered_order_content(items),
+        "sender": {key: str(value) for key, value in sender_info.items()},
+        "department": selected_department or "",
+    }
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    """キャッシュキーに対応するファイルのパスを返す"""
+    return os.path.join(_get_cache_dir(), f"{key}.pdf")
+
+
+def restore(
+    key: str,
+    supplier_name: str,
+    selected_department: Optional[str] = None,
+    save_dir: Optional[str] = None,
+) -> Optional[str]:
+    """
+    キャッシュ済みのPDFを、通常の生成と同じファイル名で保存先にコピーする
+
+    Returns:
+        コピーしたPDFのパス（キャッシュに無い場合はNone）
+    """
+    entry_path = _entry_path(key)
+    if not os.path.exists(entry_path):
+        return None
+    pdf_path = pdf_generator.build_pdf_path(supplier_name, selected_department, save_dir)
+    if not pdf_path:
+        return None
+    try:
+        shutil.copyfile(entry_path, pdf_path)
+        # 最終利用時刻を更新し、LRUで削除されにくくする
+        os.utime(entry_path)
+    except OSError as e:
+        logger.warning(f"PDFキャッシュを利用できませんでした ({supplier_name}): {e}")
+        return None
+    logger.debug(f"PDFキャッシュを利用しました: {supplier_name}")
+    return pdf_path
+
+
+def store(key: str, pdf_path: str) -> None:
+    """
+    生成したPDFをキャッシュに保存し、上限サイズを超えた分を古い順に削除する
+
+    Args:
+        key: キャッシュキー
+        pdf_path: 生成したPDFのパス
+    """
+    entry_path = _entry_path(key)
+    temp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+    try:
+        shutil.copyfile(pdf_path, temp_path)
+        os.replace(temp_path, entry_path)
+    except OSError as e:
+        logger.warning(f"PDFキャッシュの保存に失敗しました: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+    evict(config.AppConstants.PDF_CACHE_MAX_BYTES)
+
+
+def evict(max_bytes: int) -> int:
+    """
+    キャッシュの合計サイズが max_bytes 以下になるまで、最終利用が古いものから削除する
+
+    Returns:
+        削除したファイル数
+    """
+    with _lock:
+        entries = []
+        total_bytes = 0
+        with os.scandir(_get_cache_dir()) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.endswith(".pdf"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_bytes += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_bytes <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+        if removed:
+            logger.info(f"PDFキャッシュを{removed}件削除しました（上限 {max_bytes // (1024 * 1024)}MB）")
+        return removed
+
+
+def clear() -> None:
+    """PDFキャッシュを全て削除する"""
+    with _lock:
+        shutil.rmtree(_get_cache_dir(), ignore_errors=True)
+    logger.info("PDFキャッシュをクリアしました")
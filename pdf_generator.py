@@ -1,11 +1,13 @@
 import os
 import re
+import threading
+from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Dict, Any, Optional, Tuple
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, portrait
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import mm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont, TTFError
@@ -21,49 +23,153 @@ logger = logger_config.get_logger(__name__)
 FONT_NAME = "MSPGothic"
 FONT_PATH = "C:\\Windows\\Fonts\\msgothic.ttc"
 FALLBACK_FONT_NAME = "Helvetica"
+# 注文書のレイアウトを変更した場合は更新する（PDFキャッシュのキーに含まれる）
+PDF_TEMPLATE_VERSION = "1"
+# 注文書に記載する注文アイテムの項目（PDFキャッシュのキーと事前生成の再生成判定で共通に使う）
+PDF_ITEM_FIELDS = ("db_part_number", "maker_name", "quantity", "remarks")
 
-# フォント登録をモジュール読み込み時に1回だけ実行（最適化）
+# 備考欄のURL（ハイパーリンクに変換する）とファイル名に使えない文字
+URL_PATTERN = re.compile(r'(https?://[\w\-./?%&=]+)')
+UNSAFE_FILENAME_PATTERN = re.compile(r'[\\/:*?"<>|]')
+
+# 注文書の定型文（フォントのサブセットを事前に作成する対象）
+TITLE_TEXT = "注 文 書"
+GREETING_LINES = (
+    "以下の通りご注文申し上げます。",
+    "2日以内に納期回答をご記入の上、ご返信頂けますよう宜しくお願い致します。",
+)
+ITEM_HEADERS = ("品番（品名）", "メーカー", "数量", "回答納期", "備考")
+TEMPLATE_LABELS = ("発行日: ", " 御中", " 様", "担当: ", "TEL: ", "（ガイダンス", "番）", "URL: ", "Email: ", "0123456789/")
+
+# フォントは初回のPDF生成時（または起動時のバックグラウンド読み込み）に1回だけ登録する
 _REGISTERED_FONT_NAME = FALLBACK_FONT_NAME
 _FONT_INITIALIZED = False
+_FONT_LOCK = threading.Lock()
+
+class TemplateSubsetTTFont(TTFont):
+    """
+    定型文の文字を各PDFのサブセットの先頭に固定で割り当てるTrueTypeフォント
+
+    定型文だけのサブセットは全てのPDFで同じ内容になるため、事前に作成したフォントデータを再利用する。
+    PDFごとのサブセット作成は、仕入先名や品番などの可変部分の文字だけになる。
+    """
+
+    def __init__(self, name: str, filename: str, template_text: str, subfontIndex: int = 0):
+        super().__init__(name, filename, subfontIndex=subfontIndex)
+        self.template_text = template_text
+        self._template_subsets: Dict[Tuple[int, ...], bytes] = {}
+        self._make_subset = self.face.makeSubset
+
+        def make_subset_cached(subset: List[int]) -> bytes:
+            cached = self._template_subsets.get(tuple(subset))
+            return cached if cached is not None else self._make_subset(subset)
+
+        self.face.makeSubset = make_subset_cached
+
+    def _seed_template_subset(self, doc: Any) -> None:
+        """定型文の文字を割り当て、可変部分の文字は次のサブセットから始まるようにする"""
+        TTFont.splitString(self, self.template_text, doc)
+        state = self.state[doc]
+        if state.nextCode & 0xFF:
+            state.nextCode = (state.nextCode | 0xFF) + 1
+
+    def splitString(self, text, doc, encoding='utf-8'):
+        if doc not in self.state:
+            self._seed_template_subset(doc)
+        return super().splitString(text, doc, encoding)
+
+    def precompute_template_subset(self) -> None:
+        """定型文のサブセットを事前に作成してキャッシュしておく"""
+        class _WarmupDoc:
+            pass
+        doc = _WarmupDoc()
+        self._seed_template_subset(doc)
+        self._template_subsets = {
+            tuple(subset): self._make_subset(subset) for subset in self.state.pop(doc).subsets
+        }
+
+
+def rendered_order_content(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """注文アイテムのうち注文書に記載する内容（宛先の営業担当者名と各アイテムの項目）を返す"""
+    return {
+        "sales_contact": str(items[0].get("sales_contact", "")) if items else "",
+        "items": [{field: str(item.get(field, "")) for field in PDF_ITEM_FIELDS} for item in items],
+    }
+
+
+def _get_template_text() -> str:
+    """サブセットを事前に作成する定型文（会社情報を含む）を返す"""
+    company_info = config.AppConstants.COMPANY_INFO
+    parts = [TITLE_TEXT, *GREETING_LINES, *ITEM_HEADERS, *TEMPLATE_LABELS]
+    parts.extend(str(value) for value in company_info.values())
+    return "".join(parts)
 
 # --- 日本語フォントの登録 ---
 def register_japanese_font() -> str:
     """
     日本語フォントを登録し、使用するフォント名を返す
-    モジュール読み込み時に1回だけ実行される（最適化）
+    最初の呼び出し時に1回だけ読み込み、同時に呼ばれた場合は読み込みの完了を待つ
     """
     global _REGISTERED_FONT_NAME, _FONT_INITIALIZED
     
     if _FONT_INITIALIZED:
         return _REGISTERED_FONT_NAME
     
-    if FONT_NAME in pdfmetrics.getRegisteredFontNames():
-        _REGISTERED_FONT_NAME = FONT_NAME
-        _FONT_INITIALIZED = True
-        logger.debug(f"フォント '{FONT_NAME}' は既に登録されています")
-        return _REGISTERED_FONT_NAME
-    
-    try:
-        if not os.path.exists(FONT_PATH):
-            raise FileNotFoundError(FONT_PATH)
-        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH, subfontIndex=1))
-        _REGISTERED_FONT_NAME = FONT_NAME
-        _FONT_INITIALIZED = True
-        logger.info(f"日本語フォント '{FONT_NAME}' を登録しました")
-    except (FileNotFoundError, TTFError) as err:
-        logger.warning(f"フォント登録に失敗しました ({err})。既定フォントを使用します。")
-        _REGISTERED_FONT_NAME = FALLBACK_FONT_NAME
+    with _FONT_LOCK:
+        if _FONT_INITIALIZED:
+            return _REGISTERED_FONT_NAME
+
+        if FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            _REGISTERED_FONT_NAME = FONT_NAME
+            _FONT_INITIALIZED = True
+            logger.debug(f"フォント '{FONT_NAME}' は既に登録されています")
+            return _REGISTERED_FONT_NAME
+        
+        try:
+            if not os.path.exists(FONT_PATH):
+                raise FileNotFoundError(FONT_PATH)
+            font = TemplateSubsetTTFont(FONT_NAME, FONT_PATH, _get_template_text(), subfontIndex=1)
+            font.precompute_template_subset()
+            pdfmetrics.registerFont(font)
+            _REGISTERED_FONT_NAME = FONT_NAME
+            logger.info(f"日本語フォント '{FONT_NAME}' を登録しました")
+        except (FileNotFoundError, TTFError) as err:
+            logger.warning(f"フォント登録に失敗しました ({err})。既定フォントを使用します。")
+            _REGISTERED_FONT_NAME = FALLBACK_FONT_NAME
         _FONT_INITIALIZED = True
     
     return _REGISTERED_FONT_NAME
 
-# モジュール読み込み時にフォントを初期化
-register_japanese_font()
+def preload_font_in_background() -> threading.Thread:
+    """
+    フォントの登録と共有設定の作成をバックグラウンドスレッドで開始する
+    起動時に呼び出し、ウィンドウ表示を待たせずに最初のPDF生成までに読み込みを済ませる
+    """
+    thread = threading.Thread(target=get_render_context, name="pdf-font-preload", daemon=True)
+    thread.start()
+    return thread
 
 # --- スタイルの定義 ---
-def get_custom_styles() -> Dict[str, ParagraphStyle]:
-    """PDF用のカスタムスタイルを返す"""
-    font_name = register_japanese_font()
+@dataclass(frozen=True)
+class RenderContext:
+    """
+    注文書PDFの生成に使う共有設定
+    フォントごとに1回だけ作成し、全てのPDFで使い回す（内容は変更しないこと）
+    """
+    font_name: str
+    styles: StyleSheet1
+    header_table_style: TableStyle
+    item_table_style: TableStyle
+    issue_date_col_widths: Tuple[float, ...]
+    header_col_widths: Tuple[float, ...]
+    item_col_widths: Tuple[float, ...]
+    item_headers: Tuple[str, ...]
+
+_RENDER_CONTEXTS: Dict[str, RenderContext] = {}
+_RENDER_CONTEXT_LOCK = threading.Lock()
+
+def _build_custom_styles(font_name: str) -> StyleSheet1:
+    """PDF用のカスタムスタイルを作成する"""
     styles = getSampleStyleSheet()
     
     leading = 15
@@ -82,6 +188,64 @@ def get_custom_styles() -> Dict[str, ParagraphStyle]:
 
     return styles
 
+def _build_render_context(font_name: str) -> RenderContext:
+    """フォントに応じた共有設定を作成する"""
+    return RenderContext(
+        font_name=font_name,
+        styles=_build_custom_styles(font_name),
+        header_table_style=TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('SPAN', (0,0), (0,1)), # 宛先のセルを縦に結合
+        ]),
+        item_table_style=TableStyle([
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONT', (0,0), (-1,0), font_name, 11), # ヘッダーフォント
+        ]),
+        issue_date_col_widths=(180*mm,),
+        header_col_widths=(110*mm, 70*mm),
+        item_col_widths=(65*mm, 40*mm, 15*mm, 25*mm, 35*mm),
+        item_headers=ITEM_HEADERS,
+    )
+
+def get_render_context() -> RenderContext:
+    """現在のフォントに対応する共有設定を返す（初回のみ作成する）"""
+    font_name = register_japanese_font()
+    with _RENDER_CONTEXT_LOCK:
+        context = _RENDER_CONTEXTS.get(font_name)
+        if context is None:
+            context = _build_render_context(font_name)
+            _RENDER_CONTEXTS[font_name] = context
+        return context
+
+def get_custom_styles() -> StyleSheet1:
+    """PDF用のカスタムスタイルを返す（共有オブジェクトのため変更しないこと）"""
+    return get_render_context().styles
+
+def build_pdf_path(
+    supplier_name: str,
+    selected_department: Optional[str] = None,
+    save_dir: Optional[str] = None
+) -> Optional[str]:
+    """
+    注文書PDFの保存先パスを決め、保存先フォルダを作成する
+    保存先が設定されていない場合はNoneを返す
+    """
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    safe_supplier_name = UNSAFE_FILENAME_PATTERN.sub('_', supplier_name)
+    pdf_filename = f"{timestamp}_{safe_supplier_name}_注文書.pdf"
+    
+    base_save_dir = save_dir if save_dir is not None else config.PDF_SAVE_DIR
+    if not base_save_dir: return None
+
+    target_save_dir = base_save_dir
+    if selected_department:
+        target_save_dir = os.path.join(base_save_dir, selected_department)
+
+    os.makedirs(target_save_dir, exist_ok=True)
+    return os.path.join(target_save_dir, pdf_filename)
+
 def create_order_pdf(
     supplier_name: str,
     items: List[Dict[str, Any]],
@@ -95,25 +259,13 @@ def create_order_pdf(
     """
     try:
         # --- ファイルパスの準備 ---
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        safe_supplier_name = re.sub(r'[\\/:*?"<>|]', '_', supplier_name)
-        pdf_filename = f"{timestamp}_{safe_supplier_name}_注文書.pdf"
-        
-        base_save_dir = save_dir if save_dir is not None else config.PDF_SAVE_DIR
-        if not base_save_dir: return None
-
-        target_save_dir = base_save_dir
-        if selected_department:
-            department_dir = os.path.join(base_save_dir, selected_department)
-            if not os.path.exists(department_dir): os.makedirs(department_dir, exist_ok=True)
-            target_save_dir = department_dir
-
-        if not os.path.exists(target_save_dir): os.makedirs(target_save_dir)
-        pdf_path = os.path.join(target_save_dir, pdf_filename)
+        pdf_path = build_pdf_path(supplier_name, selected_department, save_dir)
+        if not pdf_path: return None
 
         # --- ドキュメントとスタイルの準備 ---
         doc = SimpleDocTemplate(pdf_path, pagesize=portrait(A4), topMargin=15*mm, bottomMargin=15*mm, leftMargin=15*mm, rightMargin=15*mm)
-        styles = get_custom_styles()
+        context = get_render_context()
+        styles = context.styles
         story = []
 
         # --- 差出人情報 ---
@@ -146,11 +298,11 @@ def create_order_pdf(
 
         # --- レイアウトの構築 ---
         # 1. 発行日 (一番上、右寄せ)
-        issue_date_table = Table([[Paragraph(f"発行日: {datetime.now().strftime('%Y/%m/%d')}", styles['Right_J'])]], colWidths=[180*mm])
+        issue_date_table = Table([[Paragraph(f"発行日: {datetime.now().strftime('%Y/%m/%d')}", styles['Right_J'])]], colWidths=context.issue_date_col_widths)
         story.append(issue_date_table)
 
         # 2. タイトル
-        story.append(Paragraph("注 文 書", styles['Title_J']))
+        story.append(Paragraph(TITLE_TEXT, styles['Title_J']))
         story.append(Spacer(1, 8*mm))
 
         # 3. 宛先と差出人
@@ -165,29 +317,24 @@ def create_order_pdf(
             [supplier_p_list, ''], # 1行目: 宛先, (空)
             ['', sender_p_list]      # 2行目: (空), 差出人
         ]
-        header_table = Table(header_data, colWidths=[110*mm, 70*mm])
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('SPAN', (0,0), (0,1)), # 宛先のセルを縦に結合
-        ]))
+        header_table = Table(header_data, colWidths=context.header_col_widths)
+        header_table.setStyle(context.header_table_style)
         story.append(header_table)
         story.append(Spacer(1, 10*mm))
 
         # 4. 挨拶文
-        story.append(Paragraph("以下の通りご注文申し上げます。", styles['Normal_J']))
-        story.append(Paragraph("2日以内に納期回答をご記入の上、ご返信頂けますよう宜しくお願い致します。", styles['Normal_J']))
+        for line in GREETING_LINES:
+            story.append(Paragraph(line, styles['Normal_J']))
         story.append(Spacer(1, 5*mm))
 
         # 5. 注文明細テーブル
-        table_header = [Paragraph(h, styles['Center_J']) for h in ["品番（品名）", "メーカー", "数量", "回答納期", "備考"]]
+        table_header = [Paragraph(h, styles['Center_J']) for h in context.item_headers]
         table_data = [table_header]
-        
-        url_pattern = r'(https?://[\w\-./?%&=]+)'
 
         for item in items:
             remarks_text = str(item.get('remarks', ''))
             # URLを検出し、ハイパーリンクに変換
-            linked_remarks = re.sub(url_pattern, r'<a href="\1" color="blue">\1</a>', remarks_text)
+            linked_remarks = URL_PATTERN.sub(r'<a href="\1" color="blue">\1</a>', remarks_text)
 
             row = [
                 Paragraph(str(item.get('db_part_number', '')), styles['Normal_J']),
@@ -198,13 +345,8 @@ def create_order_pdf(
             ]
             table_data.append(row)
 
-        item_table = Table(table_data, colWidths=[65*mm, 40*mm, 15*mm, 25*mm, 35*mm], repeatRows=1)
-        item_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONT', (0,0), (-1,0), _REGISTERED_FONT_NAME, 11), # ヘッダーフォント
-        ]))
+        item_table = Table(table_data, colWidths=context.item_col_widths, repeatRows=1)
+        item_table.setStyle(context.item_table_style)
         story.append(item_table)
         
         doc.build(story)
@@ -241,3 +383,29 @@ def generate_order_pdf_flow(
         error_message = f"予期せぬエラーが発生しました: {e}"
         logger.error(f"PDF生成フロー中に{error_message}", exc_info=True)
         return None, None, error_message
+
+# --- プロセスプールでの生成用 ---
+def init_render_worker() -> None:
+    """
+    PDF生成用ワーカープロセスの初期化処理
+    フォントの登録と共有設定の作成をプロセス起動時に1回だけ行い、各PDFの生成では再利用する
+    """
+    get_render_context()
+
+def render_order_pdf_job(
+    supplier_name: str,
+    items: List[Dict[str, Any]],
+    sender_info: Dict[str, str],
+    selected_department: Optional[str] = None,
+    save_dir: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    ワーカープロセスで実行するPDF生成処理（引数・戻り値はpickle可能な値のみ）
+
+    Returns:
+        (PDFパス, エラーメッセージ)
+    """
+    pdf_path, _, error_message = generate_order_pdf_flow(
+        supplier_name, items, sender_info, selected_department=selected_department, save_dir=save_dir
+    )
+    return pdf_path, error_message
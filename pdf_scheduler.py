@@ -0,0 +1,191 @@
+"""
+注文書PDFの事前生成スケジューラー
+Notionからの取得と並行して、注文が判明した仕入先から順にPDFを生成する
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import logger_config
+import pdf_generator
+
+logger = logger_config.get_logger(__name__)
+
+# (仕入先名, 注文アイテム) -> (PDFパス, エラーメッセージ)
+RenderFunc = Callable[[str, List[Dict[str, Any]]], Tuple[Optional[str], Optional[str]]]
+
+
+class PdfRenderScheduler:
+    """
+    仕入先ごとのPDF生成を管理するスケジューラー
+
+    submit() は取得途中でも呼べる。生成中に同じ仕入先の注文が追加された場合は、
+    生成完了後に最新の注文で生成し直すため、完了時の結果は常に最後に渡した注文と一致する。
+    同じ仕入先のPDFを同時に生成することはない（出力ファイル名が同じため）。
+    """
+
+    def __init__(
+        self,
+        render: RenderFunc,
+        results: Optional[Dict[str, str]] = None,
+        max_workers: int = 4,
+    ) -> None:
+        """
+        Args:
+            render: PDFを生成する関数
+            results: 生成済みPDFのパスを書き込む辞書（仕入先名 -> パス）。古くなったパスは取り除く
+            max_workers: 同時に生成するPDFの最大数
+        """
+        self._render = render
+        self.results: Dict[str, str] = results if results is not None else {}
+        self.errors: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="PdfRender")
+        self._condition = threading.Condition()
+        self._running: Dict[str, bool] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._submitted_keys: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _items_key(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """注文アイテムの内容を識別するキー（ページIDの並びと、PDFキャッシュのキーと同じ注文書の記載内容）"""
+        return {
+            "page_ids": [str(item.get("page_id", "")) for item in items],
+            **pdf_generator.rendered_order_content(items),
+        }
+
+    def submit(self, supplier: str, items: List[Dict[str, Any]]) -> bool:
+        """
+        仕入先のPDF生成を予約する
+
+        Args:
+            supplier: 仕入先名
+            items: その時点で判明している仕入先の全注文アイテム
+
+        Returns:
+            生成を予約した場合はTrue（前回と同じ注文の場合はFalse）
+        """
+        key = self._items_key(items)
+        with self._condition:
+            if self._submitted_keys.get(supplier) == key:
+                return False
+            self._submitted_keys[supplier] = key
+            # 注文が変わったため、以前のPDFは表示・送信に使わせない
+            self.results.pop(supplier, None)
+            self.errors.pop(supplier, None)
+            self._pending[supplier] = list(items)
+            if not self._running.get(supplier):
+                self._start_locked(supplier)
+            return True
+
+    def _start_locked(self, supplier: str) -> None:
+        """保留中の注文で生成を開始する（ロック取得済みで呼ぶこと）"""
+        items = self._pending.pop(supplier)
+        try:
+            self._executor.submit(self._run, supplier, items)
+        except RuntimeError:
+            # close() 後（取得のやり直しなど）は新しい生成を始めない
+            self._running[supplier] = False
+            self._condition.notify_all()
+            return
+        self._running[supplier] = True
+
+    def _run(self, supplier: str, items: List[Dict[str, Any]]) -> None:
+        """PDFを生成し、その間に注文が更新されていれば生成し直す"""
+        try:
+            pdf_path, error_message = self._render(supplier, items)
+        except Exception as e:
+            logger.error(f"PDF生成中に例外が発生しました ({supplier}): {e}", exc_info=True)
+            pdf_path, error_message = None, f"PDF準備中に例外が発生しました: {e}"
+
+        with self._condition:
+            if supplier in self._pending:
+                self._start_locked(supplier)
+                return
+            self._running[supplier] = False
+            if pdf_path:
+                self.results[supplier] = pdf_path
+            else:
+                self.errors[supplier] = error_message or "PDF作成中にエラーが発生しました。"
+            self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        予約済みの生成が全て完了するまで待つ
+
+        Returns:
+            全て完了した場合はTrue（タイムアウトした場合はFalse）
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not any(self._running.values()), timeout)
+
+    def close(self, wait: bool = True) -> None:
+        """ワーカースレッドを終了する"""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+class PdfProcessPool:
+    """
+    PDF生成用のプロセスプール
+
+    reportlab のレイアウト処理はGILを手放さないため、スレッドでは並列にならない。
+    ワーカープロセスは起動時にフォントを登録し、以降は注文データ（dict）だけを受け取って生成する。
+    プロセスは最初の生成時に起動し、アプリケーション終了まで使い回す。
+    """
+
+    def __init__(self, processes: int = 0) -> None:
+        """
+        Args:
+            processes: ワーカープロセス数（0ならCPUコア数）
+        """
+        self.processes = processes if processes > 0 else (os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """プロセスプールを必要に応じて起動する"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, initializer=pdf_generator.init_render_worker
+                )
+            return self._executor
+
+    def render(
+        self,
+        supplier_name: str,
+        items: List[Dict[str, Any]],
+        sender_info: Dict[str, str],
+        selected_department: Optional[str] = None,
+        save_dir: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        ワーカープロセスでPDFを生成し、完了まで待つ
+
+        Returns:
+            (PDFパス, エラーメッセージ)
+        """
+        executor = self._get_executor()
+        try:
+            future = executor.submit(
+                pdf_generator.render_order_pdf_job, supplier_name, items, sender_info, selected_department, save_dir
+            )
+            return future.result()
+        except BrokenProcessPool as e:
+            # ワーカープロセスが異常終了した場合は、次回の生成で作り直し、今回はこのプロセスで生成する
+            logger.warning(f"PDF生成プロセスが停止しました ({e})。アプリ内で生成します。")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return pdf_generator.render_order_pdf_job(
+                supplier_name, items, sender_info, selected_department, save_dir
+            )
+
+    def close(self) -> None:
+        """ワーカープロセスを終了する"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
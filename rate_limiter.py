@@ -0,0 +1,157 @@
+"""
+レート制限モジュール
+トークンバケット方式で、複数スレッドからのAPI呼び出しを一定の速度に抑える
+「1分あたり最大N通」のような上限には、スライディングウィンドウ方式のリミッターを使う
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque
+
+
+class TokenBucket:
+    """
+    トークンバケット方式のレートリミッター
+
+    rate 個/秒 の速度でトークンが補充され、最大 capacity 個まで貯まる。
+    呼び出し側は acquire() でトークンを1つ消費してからリクエストを送る。
+    待機はトークン計算のみロック内で行い、スリープはロック外で行うため、
+    各スレッドのネットワーク待ち時間は互いに重なり合う。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Args:
+            rate: 1秒あたりに補充されるトークン数
+            capacity: バケットに貯められる最大トークン数（バースト許容量）
+            clock: 現在時刻を返す関数（テスト用に差し替え可能）
+            sleep: 待機関数（テスト用に差し替え可能）
+        """
+        if rate <= 0:
+            raise ValueError("rate は正の値である必要があります")
+        if capacity < 1:
+            raise ValueError("capacity は1以上である必要があります")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """経過時間に応じてトークンを補充する（ロック取得済みで呼ぶこと）"""
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        トークンを予約し、使用可能になるまでの待ち時間を返す
+
+        トークンは前借りされるため、戻り値の秒数だけ待ってからリクエストを送れば
+        設定した速度を超えない。
+
+        Args:
+            tokens: 消費するトークン数
+
+        Returns:
+            待機すべき秒数（0なら即時に送信してよい）
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        トークンが使用可能になるまで待機して消費する
+
+        Args:
+            tokens: 消費するトークン数
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        """
+        acquire() のasyncio版。イベントループを止めずにトークンを待つ
+
+        同じインスタンスを同期・非同期の呼び出し元で共有しても全体の速度は守られる。
+
+        Args:
+            tokens: 消費するトークン数
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class SlidingWindowLimiter:
+    """
+    スライディングウィンドウ方式のレートリミッター
+
+    どの period 秒間を切り取っても、許可する回数が limit 回を超えないようにする。
+    トークンバケットと異なり、バースト分と補充分を合わせて上限を超えることがないため、
+    メールサーバーの「1分あたりの送信数」のような厳密な上限に使う。
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        period: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Args:
+            limit: period 秒間に許可する最大回数
+            period: ウィンドウの長さ（秒）
+            clock: 現在時刻を返す関数（テスト用に差し替え可能）
+            sleep: 待機関数（テスト用に差し替え可能）
+        """
+        if limit < 1:
+            raise ValueError("limit は1以上である必要があります")
+        if period <= 0:
+            raise ValueError("period は正の値である必要があります")
+        self.limit = limit
+        self.period = float(period)
+        self._clock = clock
+        self._sleep = sleep
+        self._reserved: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        1回分の枠を予約し、使用可能になるまでの待ち時間を返す
+
+        Returns:
+            待機すべき秒数（0なら即時に送信してよい）
+        """
+        with self._lock:
+            now = self._clock()
+            while self._reserved and self._reserved[0] <= now - self.period:
+                self._reserved.popleft()
+            start = now
+            if len(self._reserved) >= self.limit:
+                # limit 回前の予約がウィンドウから外れる時刻まで待つ
+                start = max(self._reserved[-self.limit] + self.period, self._reserved[-1])
+            self._reserved.append(start)
+            return max(0.0, start - now)
+
+    def acquire(self) -> None:
+        """枠が使用可能になるまで待機して消費する"""
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
@@ -0,0 +1,170 @@
+"""
+リトライポリシーモジュール
+Notion API呼び出しの失敗を種類ごとに判定し、指数バックオフ（ジッター付き）で再試行する
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+import logger_config
+
+logger = logger_config.get_logger(__name__)
+
+
+class RetryExhaustedError(Exception):
+    """再試行可能なエラーが上限回数まで続いた場合に送出される例外"""
+
+    def __init__(self, message: str, attempts: int, last_error: BaseException) -> None:
+        super().__init__(message)
+        self.attempts = attempts
+        self.last_error = last_error
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After ヘッダー（秒数）を解釈する。解釈できない場合はNone"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class RetryPolicy:
+    """
+    エラー種別に応じた再試行ポリシー
+
+    - 429: Retry-After ヘッダーの秒数だけ待って再試行（ヘッダーが無ければバックオフ）
+    - 5xx / タイムアウト / ネットワークエラー: 指数バックオフ（フルジッター）で再試行
+    - その他の 4xx / 想定外の例外: 再試行せずにそのまま送出
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.35,
+        max_delay: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        """
+        Args:
+            max_attempts: 最大試行回数（初回を含む）
+            base_delay: バックオフの基準秒数
+            max_delay: 1回あたりの最大待機秒数
+            sleep: 待機関数（テスト用に差し替え可能）
+            rand: 0以上1未満の乱数を返す関数（テスト用に差し替え可能）
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._rand = rand
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """
+        再試行すべきエラーかどうかを判定する
+
+        Args:
+            error: 発生した例外
+
+        Returns:
+            再試行すべきならTrue
+        """
+        if isinstance(error, HTTPResponseError):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (RequestTimeoutError, httpx.TransportError))
+
+    def compute_delay(self, attempt: int, error: BaseException) -> float:
+        """
+        次の試行までの待機秒数を計算する
+
+        Args:
+            attempt: 失敗した試行の番号（0始まり）
+            error: 発生した例外
+
+        Returns:
+            待機秒数
+        """
+        if isinstance(error, HTTPResponseError) and error.status == 429:
+            retry_after = _parse_retry_after(error.headers.get("Retry-After"))
+            if retry_after is not None:
+                # 複数スレッドが同時に再開しないよう、わずかにずらす
+                return min(self.max_delay, retry_after) + self._rand() * self.base_delay
+        # フルジッター: 0 〜 base * 2^attempt の範囲でランダムに待つ
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return self._rand() * ceiling
+
+    def call(self, func: Callable[..., Any], *args: Any, description: str = "", **kwargs: Any) -> Any:
+        """
+        ポリシーに従って関数を実行する
+
+        Args:
+            func: 実行する関数
+            description: ログ用の処理名
+
+        Returns:
+            関数の戻り値
+
+        Raises:
+            RetryExhaustedError: 再試行可能なエラーが上限回数まで続いた場合
+            Exception: 再試行対象外のエラーはそのまま送出する
+        """
+        label = description or getattr(func, "__name__", "request")
+        for attempt in range(self.max_attempts):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    raise
+                if attempt == self.max_attempts - 1:
+                    raise RetryExhaustedError(
+                        f"{label} が{self.max_attempts}回失敗しました: {e}", self.max_attempts, e
+                    ) from e
+                delay = self.compute_delay(attempt, e)
+                logger.warning(
+                    f"{label} に失敗しました (試行 {attempt + 1}/{self.max_attempts})。{delay:.2f}秒後に再試行します: {e}"
+                )
+                self._sleep(delay)
+
+    async def call_async(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        description: str = "",
+        **kwargs: Any,
+    ) -> Any:
+        """
+        call() のasyncio版。待機は asyncio.sleep で行う
+
+        Args:
+            func: 実行するコルーチン関数
+            description: ログ用の処理名
+
+        Returns:
+            コルーチンの戻り値
+
+        Raises:
+            RetryExhaustedError: 再試行可能なエラーが上限回数まで続いた場合
+            Exception: 再試行対象外のエラーはそのまま送出する
+        """
+        label = description or getattr(func, "__name__", "request")
+        for attempt in range(self.max_attempts):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    raise
+                if attempt == self.max_attempts - 1:
+                    raise RetryExhaustedError(
+                        f"{label} が{self.max_attempts}回失敗しました: {e}", self.max_attempts, e
+                    ) from e
+                delay = self.compute_delay(attempt, e)
+                logger.warning(
+                    f"{label} に失敗しました (試行 {attempt + 1}/{self.max_attempts})。{delay:.2f}秒後に再試行します: {e}"
+                )
+                await asyncio.sleep(delay)
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinter.simpledialog import askstring
 import config
+import email_service
 import keyring
 from typing import Any, List
 
@@ -80,6 +81,9 @@ class AccountDialog(tk.Toplevel):
 
         # keyringにパスワードを保存
         keyring.set_password(SERVICE_NAME, sender_email, password)
+        email_service.invalidate_password_cache(sender_email)
+        if self.original_sender and self.original_sender != sender_email:
+            email_service.invalidate_password_cache(self.original_sender)
 
         self.result = {
             "key": key,
@@ -305,6 +309,7 @@ class SettingsWindow(tk.Toplevel):
                 except keyring.errors.PasswordDeleteError:
                     # エントリが存在しない場合は何もしない
                     pass
+                email_service.invalidate_password_cache(sender_email)
             
             # データからアカウントを削除
             if selected_key in self.accounts_data:
@@ -465,6 +470,8 @@ class SettingsWindow(tk.Toplevel):
 
         success, message = config.save_settings(current_json_data)
         if success:
+            # 保存したアカウント設定で送信するよう、メモリに保持したパスワードを破棄する
+            email_service.invalidate_password_cache()
             summary = self._build_change_summary(self.original_settings, current_json_data)
             if summary:
                 full_message = f"{message} 変更内容: {summary}"
@@ -0,0 +1,171 @@
+"""
+SMTP送信プールモジュール
+複数の常時接続のSMTPセッションで送信キューを処理し、サーバーごとの送信数上限を守る
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+import logger_config
+import rate_limiter
+
+logger = logger_config.get_logger(__name__)
+
+
+# ワーカーのSMTPセッション（email_service.SmtpSession）を受け取って1通を送信する処理
+SendJob = Callable[[Any], Any]
+
+# サーバーごとの送信数リミッター（一括送信をまたいで共有し、連続した一括送信でも上限を守る）
+_GOVERNORS: Dict[Tuple[str, int], rate_limiter.SlidingWindowLimiter] = {}
+_GOVERNORS_LOCK = threading.Lock()
+
+
+def get_rate_governor(smtp_server: str, messages_per_minute: int) -> Optional[rate_limiter.SlidingWindowLimiter]:
+    """
+    SMTPサーバーの送信数リミッターを返す（上限が0以下の場合は制限しないためNone）
+
+    Args:
+        smtp_server: SMTPサーバー名
+        messages_per_minute: 1分あたりの最大送信数
+    """
+    if messages_per_minute <= 0:
+        return None
+    key = (smtp_server, messages_per_minute)
+    with _GOVERNORS_LOCK:
+        governor = _GOVERNORS.get(key)
+        if governor is None:
+            governor = rate_limiter.SlidingWindowLimiter(limit=messages_per_minute, period=60.0)
+            _GOVERNORS[key] = governor
+        return governor
+
+
+class SmtpSenderPool:
+    """
+    N本のSMTPセッションで送信キューを処理する送信プール
+
+    各ワーカースレッドは自分のセッションを1本持ち、最初の送信時に接続・ログインしたまま使い回す。
+    送信前にサーバー共通のリミッターで待機するため、セッション数を増やしてもサーバーの送信数上限は超えない。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        size: int = 1,
+        governor: Optional[rate_limiter.SlidingWindowLimiter] = None,
+    ) -> None:
+        """
+        Args:
+            session_factory: ワーカーごとのSMTPセッションを作成する関数
+            size: 同時に使うSMTPセッション数
+            governor: 送信数を制限するリミッター（Noneなら制限しない）
+        """
+        self._session_factory = session_factory
+        self.size = max(1, size)
+        self._governor = governor
+        self._jobs: "queue.Queue[Optional[Tuple[SendJob, Future]]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> "SmtpSenderPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def submit(self, job: SendJob) -> Future:
+        """
+        送信処理をキューに追加する
+
+        Args:
+            job: ワーカーのSMTPセッションを受け取って1通を送信する関数
+
+        Returns:
+            job の戻り値（または例外）を受け取るFuture
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("送信プールは既に終了しています")
+            self._jobs.put((job, future))
+            self._futures.append(future)
+            # ワーカーは上限まで必要に応じて起動する（セッションは最初の送信時に接続する）
+            if len(self._threads) < self.size:
+                thread = threading.Thread(
+                    target=self._worker, name=f"SmtpSender-{len(self._threads) + 1}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+        return future
+
+    def _worker(self) -> None:
+        session: Optional[Any] = None
+        try:
+            while True:
+                entry = self._jobs.get()
+                if entry is None:
+                    return
+                job, future = entry
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if session is None:
+                        session = self._session_factory()
+                    if self._governor:
+                        self._governor.acquire()
+                    future.set_result(job(session))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            if session is not None:
+                session.close()
+
+    def cancel_pending(self) -> int:
+        """
+        まだ送信を始めていない処理を全て取り消す（認証エラーなど、以降の送信が全て失敗する場合に使う）
+
+        Returns:
+            取り消した件数
+        """
+        with self._lock:
+            futures = list(self._futures)
+        return sum(1 for future in futures if future.cancel())
+
+    def close(self, wait: bool = True) -> None:
+        """
+        キューに残った送信を終えてからセッションを閉じる
+
+        Args:
+            wait: ワーカーの終了を待つかどうか
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._jobs.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+def create_pool(session_factory: Callable[[], Any], smtp_server: Optional[str] = None) -> SmtpSenderPool:
+    """
+    email_accounts.json のサーバーごとの設定（smtp_limits）に従って送信プールを作成する
+
+    Args:
+        session_factory: ワーカーごとのSMTPセッションを作成する関数
+        smtp_server: SMTPサーバー名（省略時は設定中のサーバー）
+    """
+    smtp_server = smtp_server or config.SMTP_SERVER
+    limits = config.load_smtp_limits(smtp_server)
+    governor = get_rate_governor(smtp_server, limits["messages_per_minute"])
+    logger.debug(
+        f"SMTP送信プール: {smtp_server} セッション数={limits['max_connections']} "
+        f"上限={limits['messages_per_minute']}通/分"
+    )
+    return SmtpSenderPool(session_factory, size=limits["max_connections"], governor=governor)
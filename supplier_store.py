@@ -0,0 +1,179 @@
+"""
+仕入先ディレクトリの永続キャッシュモジュール
+Notionの仕入先DBの内容をAppData配下のSQLiteに保存し、起動時に読み込んで再利用する
+"""
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import config
+import logger_config
+
+logger = logger_config.get_logger(__name__)
+
+# AppData/OrderMailer 配下に作成するファイル名
+SUPPLIER_DB_FILENAME = "supplier_cache.db"
+
+# 保存する仕入先レコードの項目
+SUPPLIER_FIELDS = ("page_id", "supplier_name", "sales_contact", "email", "email_cc", "last_edited_time")
+
+# メモリ上の仕入先レコード（page_id -> レコード）
+_records: Dict[str, Dict[str, Any]] = {}
+_loaded = False
+_lock = threading.RLock()
+
+
+def _get_db_path() -> str:
+    """SQLiteファイルのパスを返す"""
+    return config._get_user_config_path(SUPPLIER_DB_FILENAME)
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    SQLiteに接続し、必要なテーブルを作成する
+
+    Returns:
+        SQLite接続
+    """
+    conn = sqlite3.connect(_get_db_path())
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS suppliers (
+            page_id TEXT PRIMARY KEY,
+            supplier_name TEXT NOT NULL DEFAULT '',
+            sales_contact TEXT NOT NULL DEFAULT '',
+            email TEXT NOT NULL DEFAULT '',
+            email_cc TEXT NOT NULL DEFAULT '',
+            last_edited_time TEXT NOT NULL DEFAULT ''
+        )
+        """
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+
+def load() -> int:
+    """
+    SQLiteから仕入先レコードをメモリに読み込む（2回目以降は何もしない）
+
+    Returns:
+        読み込まれている仕入先の件数
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return len(_records)
+        try:
+            with closing(_connect()) as conn:
+                rows = conn.execute(f"SELECT {', '.join(SUPPLIER_FIELDS)} FROM suppliers").fetchall()
+            _records.clear()
+            for row in rows:
+                record = dict(zip(SUPPLIER_FIELDS, row))
+                _records[record["page_id"]] = record
+            logger.info(f"仕入先キャッシュを読み込みました: {len(_records)}件")
+        except sqlite3.Error as e:
+            logger.warning(f"仕入先キャッシュの読み込みに失敗しました ({e})。Notionから再取得します。")
+            _records.clear()
+        _loaded = True
+        return len(_records)
+
+
+def get_supplier(page_id: str) -> Optional[Dict[str, Any]]:
+    """
+    仕入先レコードを取得する
+
+    Args:
+        page_id: 仕入先ページID
+
+    Returns:
+        仕入先レコード、またはNone
+    """
+    load()
+    with _lock:
+        return _records.get(page_id)
+
+
+def get_all_suppliers() -> Dict[str, Dict[str, Any]]:
+    """
+    全仕入先レコードのコピーを取得する
+
+    Returns:
+        page_id をキーとした仕入先レコード
+    """
+    load()
+    with _lock:
+        return dict(_records)
+
+
+def get_sync_state() -> Tuple[Optional[str], float]:
+    """
+    前回同期時のウォーターマークと全件同期時刻を取得する
+
+    Returns:
+        (ウォーターマーク(ISO8601) または None, 全件同期時刻(epoch秒、未同期なら0))
+    """
+    try:
+        with closing(_connect()) as conn:
+            state = dict(conn.execute("SELECT key, value FROM sync_state").fetchall())
+    except sqlite3.Error as e:
+        logger.warning(f"仕入先キャッシュの同期状態を読み込めませんでした: {e}")
+        return None, 0.0
+    return state.get("watermark"), float(state.get("full_synced_at") or 0)
+
+
+def save_suppliers(
+    records: Iterable[Dict[str, Any]],
+    watermark: Optional[str] = None,
+    replace_all: bool = False,
+) -> None:
+    """
+    仕入先レコードを保存する
+
+    Args:
+        records: 保存する仕入先レコード
+        watermark: 次回の差分取得に使うウォーターマーク(ISO8601)。Noneの場合は更新しない
+        replace_all: Trueの場合は既存レコードを全て置き換える（全件同期）
+    """
+    records = list(records)
+    with _lock:
+        load()
+        try:
+            with closing(_connect()) as conn, conn:
+                if replace_all:
+                    conn.execute("DELETE FROM suppliers")
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO suppliers ({', '.join(SUPPLIER_FIELDS)}) "
+                    f"VALUES ({', '.join('?' for _ in SUPPLIER_FIELDS)})",
+                    [tuple(record.get(field, "") or "" for field in SUPPLIER_FIELDS) for record in records],
+                )
+                if watermark is not None:
+                    conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('watermark', ?)", (watermark,))
+                if replace_all:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('full_synced_at', ?)",
+                        (str(time.time()),),
+                    )
+        except sqlite3.Error as e:
+            # 保存に失敗してもメモリ上のレコードは更新し、今回の取得処理は継続する
+            logger.warning(f"仕入先キャッシュの保存に失敗しました: {e}")
+
+        if replace_all:
+            _records.clear()
+        for record in records:
+            _records[record["page_id"]] = dict(record)
+
+
+def clear() -> None:
+    """仕入先キャッシュを削除し、次回は全件取得させる"""
+    with _lock:
+        try:
+            with closing(_connect()) as conn, conn:
+                conn.execute("DELETE FROM suppliers")
+                conn.execute("DELETE FROM sync_state")
+        except sqlite3.Error as e:
+            logger.warning(f"仕入先キャッシュの削除に失敗しました: {e}")
+        _records.clear()
+    logger.info("仕入先キャッシュをクリアしました")
+
@@ -0,0 +1,72 @@
+import pytest
+
+import cache_manager
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache_manager.clear_cache()
+    yield
+    cache_manager.clear_cache()
+
+
+def _age_entry(department_names, seconds):
+    """保存時刻を seconds 秒前にずらす"""
+    key = cache_manager._generate_cache_key(department_names)
+    cache_manager._cache[key]['timestamp'] -= seconds
+
+
+def test_expired_entry_is_returned_as_stale_until_stale_ttl():
+    """有効期限切れのデータは古いデータとして検索でき、通常の取得では返さないこと"""
+    data = {"all_orders": []}
+    cache_manager.set_cached_data(["営業部"], data)
+    assert cache_manager.lookup_cached_data(["営業部"]).stale is False
+
+    _age_entry(["営業部"], cache_manager.CACHE_TTL + 1)
+    cached = cache_manager.lookup_cached_data(["営業部"])
+    assert cached.stale is True and cached.data is data
+    assert cache_manager.get_cached_data(["営業部"]) is None
+
+    _age_entry(["営業部"], cache_manager.CACHE_STALE_TTL)
+    assert cache_manager.lookup_cached_data(["営業部"]) is None
+
+
+def test_revalidation_is_not_started_twice_for_same_key():
+    """同じ条件の再取得は重ねて開始しないこと"""
+    assert cache_manager.begin_revalidation(["営業部", "製造部"]) is True
+    assert cache_manager.begin_revalidation(["製造部", "営業部"]) is False
+    cache_manager.end_revalidation(["営業部", "製造部"])
+    assert cache_manager.begin_revalidation(["営業部", "製造部"]) is True
+    cache_manager.end_revalidation(["営業部", "製造部"])
+
+
+def test_least_recently_used_entry_is_evicted_over_byte_cap(monkeypatch):
+    """概算のバイト数が上限を超えたら、最近使っていないキャッシュから削除すること"""
+    data = {"all_orders": [{"page_id": f"page{i}", "remarks": "x" * 100} for i in range(10)]}
+    size = cache_manager._estimate_size(data)
+    monkeypatch.setattr(cache_manager.config.AppConstants, "NOTION_CACHE_MAX_BYTES", size * 2 + size // 2)
+
+    cache_manager.set_cached_data(["営業部"], data)
+    cache_manager.set_cached_data(["製造部"], dict(data))
+    assert cache_manager.get_cached_data(["営業部"]) is data  # 営業部を最近使ったことにする
+    cache_manager.set_cached_data(["品質保証部"], dict(data))
+
+    assert cache_manager.get_cached_data(["製造部"]) is None
+    assert cache_manager.get_cached_data(["営業部"]) is data
+    stats = cache_manager.get_cache_stats()
+    assert stats['total'] == 2
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 2 and stats['misses'] == 1
+    assert 0 < stats['bytes'] <= stats['max_bytes']
+
+
+def test_sweep_removes_entries_past_stale_ttl():
+    """古いデータとしても使えなくなったキャッシュは、読まれなくても削除されること"""
+    cache_manager.set_cached_data(["営業部"], {"all_orders": []})
+    cache_manager.set_cached_data(["製造部"], {"all_orders": []})
+    _age_entry(["営業部"], cache_manager.CACHE_TTL + cache_manager.CACHE_STALE_TTL + 1)
+
+    assert cache_manager.sweep_expired() == 1
+    stats = cache_manager.get_cache_stats()
+    assert stats['total'] == 1 and stats['expirations'] == 1
+    assert stats['bytes'] == cache_manager._estimate_size({"all_orders": []})
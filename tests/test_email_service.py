@@ -1,13 +1,30 @@
-﻿import unittest
-from unittest.mock import patch, MagicMock
+﻿import email
+import io
+import os
 import smtplib
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
 
 # 対象モジュール
 import email_service
 import config
 
+def _fake_server():
+    """MAIL/RCPT/DATAに成功を返すSMTPサーバーのモック"""
+    server = MagicMock()
+    server.mail.return_value = (250, b'ok')
+    server.rcpt.return_value = (250, b'ok')
+    server.docmd.return_value = (354, b'go ahead')
+    server.getreply.return_value = (250, b'queued')
+    return server
+
+
 class TestEmailService(unittest.TestCase):
 
+    def setUp(self):
+        email_service.invalidate_password_cache()
+
     @patch('email_service.os.path.exists')
     @patch('email_service.keyring.get_password')
     @patch('smtplib.SMTP')
@@ -17,8 +34,8 @@ class TestEmailService(unittest.TestCase):
         mock_get_password.return_value = 'dummy_password'
         mock_exists.return_value = True
 
-        mock_smtp_instance = MagicMock()
-        mock_smtp.return_value.__enter__.return_value = mock_smtp_instance
+        mock_smtp_instance = _fake_server()
+        mock_smtp.return_value = mock_smtp_instance
 
         account_key = 'test_account'
         sender_creds = {'sender': 'test@example.com', 'display_name': 'テスト担当'}
@@ -42,9 +59,12 @@ class TestEmailService(unittest.TestCase):
         mock_smtp.assert_called_once_with(config.SMTP_SERVER, config.SMTP_PORT)
         mock_smtp_instance.starttls.assert_called_once()
         mock_smtp_instance.login.assert_called_once_with('test@example.com', 'dummy_password')
-        call_args, _ = mock_smtp_instance.sendmail.call_args
-        self.assertEqual(call_args[0], 'test@example.com')
-        self.assertEqual(call_args[1], ['recipient@example.com', 'cc@example.com'])
+        # メッセージはDATAへ断片ごとに書き込むため、送信者・宛先は MAIL/RCPT で確認する
+        mock_smtp_instance.mail.assert_called_once_with('test@example.com')
+        self.assertEqual(
+            [call.args[0] for call in mock_smtp_instance.rcpt.call_args_list],
+            ['recipient@example.com', 'cc@example.com'],
+        )
 
     @patch('email_service.keyring.get_password')
     def test_send_fail_if_password_not_found(self, mock_get_password):
@@ -75,7 +95,7 @@ class TestEmailService(unittest.TestCase):
 
         mock_smtp_instance = MagicMock()
         mock_smtp_instance.login.side_effect = smtplib.SMTPAuthenticationError(535, b'Authentication failed')
-        mock_smtp.return_value.__enter__.return_value = mock_smtp_instance
+        mock_smtp.return_value = mock_smtp_instance
 
         account_key = 'test_account'
         sender_creds = {'sender': 'test@example.com', 'display_name': 'テスト担当'}
@@ -89,5 +109,251 @@ class TestEmailService(unittest.TestCase):
         self.assertFalse(success)
         self.assertIn('SMTP認証', message)
 
+    @patch('email_service.keyring.get_password')
+    def test_password_is_cached_until_invalidated(self, mock_get_password):
+        """パスワードは送信者ごとに1回だけOSから読み込み、破棄後は読み直す"""
+        mock_get_password.return_value = 'dummy_password'
+
+        for _ in range(3):
+            self.assertEqual(email_service._get_password('test@example.com'), ('dummy_password', None))
+        self.assertEqual(mock_get_password.call_count, 1)
+
+        email_service.invalidate_password_cache('test@example.com')
+        email_service._get_password('test@example.com')
+        self.assertEqual(mock_get_password.call_count, 2)
+
+    @patch('email_service.os.path.exists', return_value=True)
+    @patch('email_service.keyring.get_password', return_value='old_password')
+    @patch('smtplib.SMTP')
+    @patch('builtins.open', new_callable=unittest.mock.mock_open, read_data=b'dummy data')
+    def test_authentication_error_drops_cached_password(self, mock_open, mock_smtp, mock_get_password, mock_exists):
+        """SMTP認証に失敗した場合は、次回の送信でOSからパスワードを読み直す"""
+        mock_smtp.return_value.login.side_effect = smtplib.SMTPAuthenticationError(535, b'Authentication failed')
+        items = [{'email': 'recipient@example.com', 'supplier_name': 'テスト仕入先'}]
+        sender_creds = {'sender': 'test@example.com'}
+
+        email_service.prepare_and_send_order_email('test_account', sender_creds, items, 'dummy.pdf')
+        email_service.prepare_and_send_order_email('test_account', sender_creds, items, 'dummy.pdf')
+
+        self.assertEqual(mock_get_password.call_count, 2)
+
+
+class TestPreparedMail(unittest.TestCase):
+
+    info = {'supplier_name': 'テスト仕入先', 'sales_contact': 'テスト担当者', 'email': 'recipient@example.com'}
+
+    def setUp(self):
+        email_service.invalidate_password_cache()
+
+    @patch('builtins.open', new_callable=unittest.mock.mock_open, read_data=b'dummy data')
+    def test_prepared_mail_is_serialized_for_smtp(self, mock_open):
+        """組み立て済みのメールは、CRLF改行のバイト列として保持する"""
+        prepared = email_service.prepare_order_mail(self.info, 'dummy.pdf', 'test@example.com', 'テスト担当', 'テスト部署', {})
+
+        self.assertEqual(prepared.recipients, ['recipient@example.com'])
+        self.assertIsInstance(prepared.message, bytes)
+        self.assertIn(b'\r\n', prepared.message)
+        self.assertNotIn(b'\n', prepared.message.replace(b'\r\n', b''))
+        self.assertTrue(prepared.matches('dummy.pdf', 'test@example.com', 'テスト部署'))
+        self.assertFalse(prepared.matches('other.pdf', 'test@example.com', 'テスト部署'))
+
+    def test_prepared_mail_is_written_without_rebuilding(self):
+        """組み立て済みのメールがあれば、PDFを読み込まずにそのまま書き込む"""
+        prepared = email_service.PreparedMail('test@example.com', 'dummy.pdf', None, ['recipient@example.com'], b'prepared')
+        f = io.BytesIO()
+
+        with patch('email_service.build_order_message') as mock_build:
+            recipients = email_service.write_order_message(f, self.info, 'dummy.pdf', 'test@example.com', 'テスト担当', prepared=prepared)
+
+        mock_build.assert_not_called()
+        self.assertEqual(recipients, ['recipient@example.com'])
+        self.assertEqual(f.getvalue(), b'prepared')
+
+
+class TestStreamingSend(unittest.TestCase):
+
+    info = {'supplier_name': 'テスト仕入先', 'sales_contact': 'テスト担当者', 'email': 'recipient@example.com'}
+
+    def setUp(self):
+        email_service.invalidate_password_cache()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmpdir.name, '注文書.pdf')
+        self.pdf_data = os.urandom(200 * 1024)
+        with open(self.pdf_path, 'wb') as f:
+            f.write(self.pdf_data)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_stream_reproduces_the_attachment(self):
+        """ストリームで出力したメッセージから、元のPDFが復元できる"""
+        stream, recipients = email_service.stream_order_message(self.info, self.pdf_path, 'test@example.com', 'テスト担当', None, {})
+
+        chunks = list(stream())
+        parsed = email.message_from_bytes(b''.join(chunks))
+
+        self.assertEqual(recipients, ['recipient@example.com'])
+        self.assertTrue(all(chunk.endswith(b'\r\n') for chunk in chunks))
+        self.assertTrue(all(len(chunk) < 100 * 1024 for chunk in chunks))
+        attachment = parsed.get_payload()[1]
+        self.assertEqual(attachment.get_filename(), '注文書.pdf')
+        self.assertEqual(attachment.get_payload(decode=True), self.pdf_data)
+
+    def test_large_attachment_is_streamed_to_data(self):
+        """上限以上の添付ファイルは、組み立てずに保存し、DATAへ断片ごとに書き込む"""
+        server = _fake_server()
+        message_path = os.path.join(self.tmpdir.name, 'order.eml')
+        with patch.object(config.AppConstants, 'MAIL_STREAM_ATTACHMENT_BYTES', 1024), \
+                patch('email_service.build_order_message') as mock_build, \
+                open(message_path, 'wb') as f:
+            recipients = email_service.write_order_message(f, self.info, self.pdf_path, 'test@example.com', 'テスト担当')
+        mock_build.assert_not_called()
+
+        with patch('smtplib.SMTP', return_value=server):
+            with email_service.SmtpSession('test@example.com', 'dummy_password') as session:
+                session.sendmail(recipients, email_service.file_message_stream(message_path))
+
+        server.sendmail.assert_not_called()
+        server.mail.assert_called_once_with('test@example.com')
+        server.rcpt.assert_called_once_with('recipient@example.com')
+        sent = b''.join(call.args[0] for call in server.send.call_args_list)
+        self.assertTrue(sent.endswith(b'\r\n.\r\n'))
+        parsed = email.message_from_bytes(sent[:-len(b'.\r\n')])
+        self.assertEqual(parsed.get_payload()[1].get_payload(decode=True), self.pdf_data)
+
+    def test_stream_escapes_leading_dots(self):
+        """DATAに書き込む行頭の "." は ".." にエスケープする"""
+        server = _fake_server()
+        stream = lambda: iter([b'Subject: test\r\n\r\n', b'.line\r\nmid.dle\r\n', b'..two\r\n'])
+
+        email_service._send_message_stream(server, 'test@example.com', ['recipient@example.com'], stream)
+
+        sent = b''.join(call.args[0] for call in server.send.call_args_list)
+        self.assertEqual(sent, b'Subject: test\r\n\r\n..line\r\nmid.dle\r\n...two\r\n.\r\n')
+
+    def test_stream_raises_when_all_recipients_are_refused(self):
+        """全ての宛先が拒否された場合は、DATAを送らずに例外を送出する"""
+        server = _fake_server()
+        server.rcpt.return_value = (550, b'no such user')
+
+        with self.assertRaises(smtplib.SMTPRecipientsRefused):
+            email_service._send_message_stream(server, 'test@example.com', ['recipient@example.com'], lambda: iter([]))
+        server.docmd.assert_not_called()
+        server.rset.assert_called_once()
+
+
+class TestBatchSend(unittest.TestCase):
+
+    sender_creds = {'sender': 'test@example.com', 'display_name': 'テスト担当'}
+
+    def setUp(self):
+        email_service.invalidate_password_cache()
+
+    def _orders(self, count):
+        return [
+            email_service.OrderMail(
+                f'仕入先{i}',
+                [{'supplier_name': f'仕入先{i}', 'email': f'supplier{i}@example.com', 'page_id': f'p{i}'}],
+                'dummy.pdf',
+            )
+            for i in range(count)
+        ]
+
+    def _send(self, orders, mock_smtp, servers):
+        mock_smtp.side_effect = servers
+        received = []
+        limits = {'max_connections': 1, 'messages_per_minute': 0}
+        with patch('email_service.keyring.get_password', return_value='dummy_password'), \
+                patch('config.load_smtp_limits', return_value=limits), \
+                patch('email_service.os.path.exists', return_value=True), \
+                patch('builtins.open', unittest.mock.mock_open(read_data=b'dummy data')):
+            results = email_service.prepare_and_send_order_emails(
+                'test_account', self.sender_creds, orders,
+                on_result=lambda supplier, success, error: received.append((supplier, success)),
+            )
+        return results, received
+
+    @patch('smtplib.SMTP')
+    def test_batch_reuses_one_login_for_all_suppliers(self, mock_smtp):
+        """一括送信では、接続・TLS・ログインを1回だけ行い全ての仕入先へ送信する"""
+        server = _fake_server()
+        results, received = self._send(self._orders(3), mock_smtp, [server])
+
+        self.assertEqual(mock_smtp.call_count, 1)
+        server.starttls.assert_called_once()
+        server.login.assert_called_once_with('test@example.com', 'dummy_password')
+        self.assertEqual(server.mail.call_count, 3)
+        server.quit.assert_called_once()
+        self.assertEqual(received, [('仕入先0', True), ('仕入先1', True), ('仕入先2', True)])
+        self.assertTrue(all(success for success, _ in results.values()))
+
+    @patch('smtplib.SMTP')
+    def test_batch_stops_on_authentication_error(self, mock_smtp):
+        """SMTP認証に失敗した場合は、残りの仕入先も失敗として中止する"""
+        server = MagicMock()
+        server.login.side_effect = smtplib.SMTPAuthenticationError(535, b'Authentication failed')
+        results, received = self._send(self._orders(2), mock_smtp, [server])
+
+        self.assertEqual(mock_smtp.call_count, 1)
+        self.assertEqual(received, [('仕入先0', False), ('仕入先1', False)])
+        self.assertIn('SMTP認証', results['仕入先1'][1])
+
+
+class TestSmtpSession(unittest.TestCase):
+
+    @patch('smtplib.SMTP')
+    def test_session_reuses_one_login_for_all_messages(self, mock_smtp):
+        """接続・TLS・ログインは1回だけ行い、同じ接続で続けて送信する"""
+        server = mock_smtp.return_value = _fake_server()
+        with email_service.SmtpSession('test@example.com', 'dummy_password') as session:
+            for i in range(3):
+                session.sendmail([f'supplier{i}@example.com'], b'message')
+
+        self.assertEqual(mock_smtp.call_count, 1)
+        server.starttls.assert_called_once()
+        server.login.assert_called_once_with('test@example.com', 'dummy_password')
+        self.assertEqual(server.docmd.call_count, 3)
+        server.quit.assert_called_once()
+
+    @patch('smtplib.SMTP')
+    def test_reconnects_when_connection_drops_before_terminator(self, mock_smtp):
+        """メッセージの終端を送る前に接続が切れた場合は、接続し直して同じメールを再送する"""
+        dropped = _fake_server()
+        dropped.docmd.side_effect = smtplib.SMTPServerDisconnected('closed')
+        reconnected = _fake_server()
+        mock_smtp.side_effect = [dropped, reconnected]
+
+        with email_service.SmtpSession('test@example.com', 'dummy_password') as session:
+            session.sendmail(['supplier@example.com'], b'message')
+
+        self.assertEqual(mock_smtp.call_count, 2)
+        reconnected.rcpt.assert_called_once_with('supplier@example.com')
+        sent = b''.join(call.args[0] for call in reconnected.send.call_args_list)
+        self.assertEqual(sent, b'message\r\n.\r\n')
+
+    @patch('smtplib.SMTP')
+    def test_disconnect_after_terminator_is_not_resent(self, mock_smtp):
+        """メッセージの終端を送った後に接続が切れた場合は、再送せずに送信結果不明として通知する"""
+        server = mock_smtp.return_value = _fake_server()
+        server.getreply.side_effect = smtplib.SMTPServerDisconnected('closed')
+
+        with email_service.SmtpSession('test@example.com', 'dummy_password') as session:
+            with self.assertRaises(email_service.DeliveryUnknownError):
+                session.sendmail(['supplier@example.com'], b'message')
+
+        self.assertEqual(mock_smtp.call_count, 1)
+        server.docmd.assert_called_once()
+
+    @patch('smtplib.SMTP')
+    def test_authentication_error_is_not_retried(self, mock_smtp):
+        """SMTP認証に失敗した場合は、再接続せずに例外を送出する"""
+        mock_smtp.return_value.login.side_effect = smtplib.SMTPAuthenticationError(535, b'Authentication failed')
+
+        with email_service.SmtpSession('test@example.com', 'dummy_password') as session:
+            with self.assertRaises(smtplib.SMTPAuthenticationError):
+                session.sendmail(['supplier@example.com'], b'message')
+        self.assertEqual(mock_smtp.call_count, 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -14,18 +14,33 @@ def mock_notion_raw_data():
             # Supplier is None: 1 item
             {"supplier_name": None, "db_part_number": "PART-004", "page_id": "page4"},
         ],
-        "unlinked_count": 1
+        "unlinked_count": 1,
+        "unlinked_orders": [{"page_id": "page5", "departments": ["営業部"]}],
     }
 
 def test_fetch_and_process_orders(monkeypatch, mock_notion_raw_data):
     """
     fetch_and_process_orders関数が正しくデータをグループ化できるかテストする
     """
-    # notion_api.get_order_data_from_notionが、実際のAPI通信の代わりにダミーデータを返すように「すり替え」
-    monkeypatch.setattr("notion_api.get_order_data_from_notion", lambda department_names=None: mock_notion_raw_data)
+    # notion_api.iter_order_data_from_notionが、実際のAPI通信の代わりにダミーデータを2バッチに分けて返すように「すり替え」
+    def fake_batches(department_names=None):
+        orders = mock_notion_raw_data["orders"]
+        yield {"orders": orders[:2], "unlinked_count": 0, "unlinked_orders": []}
+        yield {
+            "orders": orders[2:],
+            "unlinked_count": mock_notion_raw_data["unlinked_count"],
+            "unlinked_orders": mock_notion_raw_data["unlinked_orders"],
+        }
+
+    monkeypatch.setattr("notion_api.iter_order_data_from_notion", fake_batches)
+    monkeypatch.setattr("cache_manager.lookup_cached_data", lambda department_names: None)
+    received_batches = []
 
     # テスト対象の関数を実行
-    result = fetch_and_process_orders(department_names=["営業部"])
+    result = fetch_and_process_orders(department_names=["営業部"], on_batch=received_batches.append)
+
+    # バッチごとに通知されること
+    assert len(received_batches) == 2
 
     # --- 結果を検証 ---
     # 全体の注文数は4件であること
@@ -45,3 +60,497 @@ def test_fetch_and_process_orders(monkeypatch, mock_notion_raw_data):
 
     # 仕入先がNoneのデータはグループに含まれないこと
     assert None not in result["orders_by_supplier"]
+
+
+def _make_order_page(page_id, status="要発注", departments=("営業部",)):
+    return {
+        "id": page_id,
+        "properties": {
+            "注文ステータス": {"formula": {"string": status}},
+            "部署名": {"multi_select": [{"name": name} for name in departments]},
+        },
+    }
+
+
+class _FakeDatabases:
+    """databases.query の呼び出しを記録し、フィルター種別に応じて結果を返すダミー"""
+
+    def __init__(self, full_results, delta_results):
+        self.full_results = full_results
+        self.delta_results = delta_results
+        self.calls = []
+
+    def query(self, **kwargs):
+        self.calls.append(kwargs)
+        is_delta = kwargs.get("filter", {}).get("timestamp") == "last_edited_time"
+        return {"results": self.delta_results if is_delta else self.full_results, "has_more": False}
+
+
+def _reset_sync_state():
+    """増分同期用のスナップショットとプロパティIDのキャッシュを破棄し、次回は全件取得させる"""
+    import notion_api
+
+    notion_api._SYNC_SNAPSHOTS.clear()
+    notion_api._PROPERTY_IDS.clear()
+
+
+def test_incremental_sync_merges_changes_into_snapshot(monkeypatch):
+    """
+    2回目以降の同期で last_edited_time 以降の変更だけを取得し、スナップショットにマージできるかテストする
+    """
+    import notion_api
+
+    _reset_sync_state()
+    monkeypatch.setattr(notion_api.config, "PAGE_ID_CONTAINING_DB", "db")
+    full_filter = {"property": "注文ステータス", "formula": {"string": {"contains": "要発注"}}}
+    databases = _FakeDatabases(
+        full_results=[_make_order_page("page1"), _make_order_page("page2")],
+        delta_results=[
+            _make_order_page("page2", status="発注済"),  # 要発注から外れた
+            _make_order_page("page3"),  # 新規
+            _make_order_page("page4", departments=("総務部",)),  # 対象外の部署
+        ],
+    )
+    client = type("FakeClient", (), {"databases": databases})()
+
+    def sync():
+        return sorted(
+            order["page_id"]
+            for batch in notion_api._iter_order_records(client, full_filter, ["営業部"], incremental=True)
+            for order in batch
+        )
+
+    assert sync() == ["page1", "page2"]
+    assert sync() == ["page1", "page3"]
+
+    # 1回目は全件取得フィルター、2回目は last_edited_time による増分フィルターの1回だけで問い合わせること
+    # （対象の確認は NOTION_MEMBERSHIP_CHECK_INTERVAL ごとのため、この同期では行わない）
+    assert len(databases.calls) == 2
+    assert databases.calls[0]["filter"] == full_filter
+    assert databases.calls[1]["filter"]["timestamp"] == "last_edited_time"
+    assert "on_or_after" in databases.calls[1]["filter"]["last_edited_time"]
+
+    _reset_sync_state()
+
+
+def test_resolve_suppliers_retrieves_only_uncached_pages(monkeypatch, tmp_path):
+    """
+    lazy結合で、キャッシュに無い仕入先だけを pages.retrieve で取得し、キャッシュに保存するかテストする
+    """
+    import notion_api
+    import supplier_store
+
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    monkeypatch.setattr(supplier_store, "_records", {})
+    monkeypatch.setattr(supplier_store, "_loaded", False)
+    supplier_store.save_suppliers([
+        {"page_id": "s1", "supplier_name": "仕入先A", "sales_contact": "", "email": "a@example.com", "email_cc": "", "last_edited_time": ""},
+    ])
+
+    retrieved = []
+
+    class _FakePages:
+        def retrieve(self, page_id):
+            retrieved.append(page_id)
+            return {
+                "id": page_id,
+                "last_edited_time": "2025-01-01T00:00:00.000Z",
+                "properties": {
+                    "仕入先名": {"title": [{"plain_text": "仕入先B"}]},
+                    "メール": {"email": "b@example.com"},
+                },
+            }
+
+    client = type("FakeClient", (), {"pages": _FakePages()})()
+
+    resolved = notion_api._resolve_suppliers(client, ["s1", "s2", "s2"])
+
+    # キャッシュ済みの s1 は取得せず、重複した s2 は1回だけ取得すること
+    assert retrieved == ["s2"]
+    assert resolved["s1"]["supplier_name"] == "仕入先A"
+    assert resolved["s2"]["supplier_name"] == "仕入先B"
+    assert supplier_store.get_supplier("s2")["email"] == "b@example.com"
+
+
+def test_get_all_pages_raises_instead_of_returning_partial_results(monkeypatch):
+    """
+    ページ送りの途中で取得に失敗した場合、途中までの結果を返さずに NotionAPIError を送出するかテストする
+    """
+    import notion_api
+
+    class _FailingDatabases:
+        def __init__(self):
+            self.calls = 0
+
+        def query(self, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                return {"results": [{"id": "page1"}], "has_more": True, "next_cursor": "cursor1"}
+            raise ValueError("invalid filter")
+
+    client = type("FakeClient", (), {"databases": _FailingDatabases()})()
+
+    with pytest.raises(notion_api.NotionAPIError):
+        notion_api._get_all_pages_from_db(client, "db")
+
+
+def test_get_all_pages_requests_only_projected_properties():
+    """
+    filter_properties でプロパティIDを指定して問い合わせ、ページを注文レコードに変換して返すかテストする
+    """
+    import notion_api
+
+    _reset_sync_state()
+
+    class _ProjectedDatabases:
+        def __init__(self):
+            self.retrieve_calls = 0
+            self.query_calls = []
+
+        def retrieve(self, database_id):
+            self.retrieve_calls += 1
+            return {
+                "properties": {
+                    name: {"id": f"id-{index}"} for index, name in enumerate(notion_api.ORDER_PROPERTIES)
+                } | {"未使用の列": {"id": "unused"}}
+            }
+
+        def query(self, **kwargs):
+            self.query_calls.append(kwargs)
+            page = _make_order_page("page1")
+            page["properties"]["数量"] = {"number": 3}
+            page["properties"]["DB_仕入先リスト"] = {"relation": [{"id": "s1"}]}
+            page["properties"]["発注日"] = {"date": {"start": "2024-05-01T09:00:00.000+09:00"}}
+            return {"results": [page], "has_more": False}
+
+    databases = _ProjectedDatabases()
+    client = type("FakeClient", (), {"databases": databases})()
+
+    for _ in range(2):
+        records = notion_api._get_all_pages_from_db(
+            client, "db", parse=notion_api.parse_order_page, properties=notion_api.ORDER_PROPERTIES
+        )
+
+    # スキーマの取得は1回だけで、未使用の列は要求しないこと
+    assert databases.retrieve_calls == 1
+    assert databases.query_calls[0]["filter_properties"] == [
+        f"id-{index}" for index in range(len(notion_api.ORDER_PROPERTIES))
+    ]
+    assert records == [
+        {
+            "page_id": "page1",
+            "status": "要発注",
+            "departments": ["営業部"],
+            "maker_name": "",
+            "db_part_number": "",
+            "quantity": 3,
+            "remarks": "",
+            "order_date": "2024-05-01",
+            "supplier_id": "s1",
+        }
+    ]
+
+    _reset_sync_state()
+
+
+def test_iter_database_pages_yields_each_batch_before_next_request():
+    """
+    ページ送りの各バッチを、次のリクエストを送る前に呼び出し側へ返すかテストする
+    """
+    import notion_api
+
+    class _PagedDatabases:
+        def __init__(self):
+            self.calls = 0
+
+        def query(self, **kwargs):
+            self.calls += 1
+            has_more = self.calls < 3
+            return {"results": [_make_order_page(f"page{self.calls}")], "has_more": has_more, "next_cursor": str(self.calls)}
+
+    databases = _PagedDatabases()
+    client = type("FakeClient", (), {"databases": databases})()
+
+    batches = notion_api._iter_database_pages(client, "db", parse=notion_api.parse_order_page)
+    first = next(batches)
+
+    assert databases.calls == 1
+    assert [order["page_id"] for order in first] == ["page1"]
+    assert [order["page_id"] for batch in batches for order in batch] == ["page2", "page3"]
+
+
+def test_update_notion_pages_returns_failed_page_ids(monkeypatch):
+    """
+    一部のページの更新に失敗した場合、失敗したページIDを結果に残すかテストする
+    """
+    import notion_api
+
+    class _Pages:
+        def __init__(self):
+            self.updated = []
+
+        def update(self, page_id, properties):
+            if page_id == "page2":
+                raise ValueError("validation error")
+            self.updated.append(page_id)
+
+    client = type("FakeClient", (), {"pages": _Pages()})()
+    monkeypatch.setattr(notion_api, "_get_notion_client", lambda: client)
+
+    result = notion_api.update_notion_pages(["page1", "page2", "page1", "page3"])
+
+    assert sorted(result.updated) == ["page1", "page3"]
+    assert list(result.failed) == ["page2"]
+    # 重複したページIDは1回だけ更新する
+    assert sorted(client.pages.updated) == ["page1", "page3"]
+
+
+def test_update_notion_pages_skips_pages_already_ordered_today(monkeypatch):
+    """
+    取得済みの発注日が既に当日のページには更新リクエストを送らないかテストする
+    """
+    import notion_api
+    from datetime import datetime
+
+    class _Pages:
+        def __init__(self):
+            self.updated = []
+
+        def update(self, page_id, properties):
+            self.updated.append(page_id)
+
+    client = type("FakeClient", (), {"pages": _Pages()})()
+    monkeypatch.setattr(notion_api, "_get_notion_client", lambda: client)
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    result = notion_api.update_notion_pages(
+        ["page1", "page2", "page3"],
+        current_order_dates={"page1": today, "page2": "2024-01-01"},
+    )
+
+    assert sorted(client.pages.updated) == ["page2", "page3"]
+    assert result.skipped == ["page1"]
+    assert not result.failed
+
+
+def test_fetch_returns_stale_cache_and_pushes_delta_after_revalidation(monkeypatch):
+    """
+    期限切れのキャッシュをすぐに返し、バックグラウンドで再取得した差分を通知するかテストする
+    """
+    import threading
+
+    import cache_manager
+    import notion_api
+
+    cache_manager.clear_cache()
+    stale_orders = [
+        {"page_id": "page1", "supplier_name": "仕入先A", "quantity": 1},
+        {"page_id": "page2", "supplier_name": "仕入先B", "quantity": 1},
+    ]
+    cache_manager.set_cached_data(["営業部"], {"orders_by_supplier": {}, "all_orders": stale_orders, "unlinked_count": 0})
+    cache_manager._cache[cache_manager._generate_cache_key(["営業部"])]["timestamp"] -= cache_manager.CACHE_TTL + 1
+
+    def fake_batches(department_names=None):
+        yield {
+            "orders": [
+                {"page_id": "page1", "supplier_name": "仕入先A", "quantity": 2},
+                {"page_id": "page3", "supplier_name": "仕入先C", "quantity": 1},
+            ],
+            "unlinked_count": 0,
+        }
+
+    monkeypatch.setattr("notion_api.iter_order_data_from_notion", fake_batches)
+    revalidated = threading.Event()
+    received = []
+
+    def on_revalidated(result, delta):
+        received.append((result, delta))
+        revalidated.set()
+
+    result = notion_api.fetch_and_process_orders(department_names=["営業部"], on_revalidated=on_revalidated)
+
+    assert result["stale"] is True
+    assert result["all_orders"] == stale_orders
+    assert revalidated.wait(5)
+    fresh, delta = received[0]
+    assert [order["page_id"] for order in delta["added"]] == ["page3"]
+    assert [order["page_id"] for order in delta["changed"]] == ["page1"]
+    assert [order["page_id"] for order in delta["removed"]] == ["page2"]
+    # 再取得した結果はキャッシュに保存され、次回はそのまま返すこと
+    assert notion_api.fetch_and_process_orders(department_names=["営業部"], on_revalidated=on_revalidated) is fresh
+    cache_manager.clear_cache()
+
+
+def test_failed_revalidation_is_reported(monkeypatch):
+    """
+    バックグラウンドでの再取得に失敗した場合に、呼び出し側へ通知するかテストする
+    """
+    import threading
+
+    import cache_manager
+    import notion_api
+
+    cache_manager.clear_cache()
+    cache_manager.set_cached_data(["営業部"], {"orders_by_supplier": {}, "all_orders": [], "unlinked_count": 0})
+    cache_manager._cache[cache_manager._generate_cache_key(["営業部"])]["timestamp"] -= cache_manager.CACHE_TTL + 1
+
+    def failing_batches(department_names=None):
+        raise notion_api.NotionAPIError("接続できません")
+        yield
+
+    monkeypatch.setattr("notion_api.iter_order_data_from_notion", failing_batches)
+    failed = threading.Event()
+    errors = []
+
+    def on_failed(error):
+        errors.append(error)
+        failed.set()
+
+    result = notion_api.fetch_and_process_orders(
+        department_names=["営業部"], on_revalidated=lambda result, delta: None, on_revalidation_failed=on_failed
+    )
+
+    assert result["stale"] is True
+    assert failed.wait(5)
+    assert "接続できません" in errors[0]
+    cache_manager.clear_cache()
+
+
+def test_overlapping_revalidations_fetch_each_department_once(monkeypatch):
+    """
+    選択の異なる取得が同じ部署を再取得する場合に、その部署は一度だけ取得して結果を共有するかテストする
+    """
+    import threading
+
+    import cache_manager
+    import notion_api
+
+    cache_manager.clear_cache()
+    for department in ("営業部", "製造部"):
+        cache_manager.set_cached_data([department], {"orders_by_supplier": {}, "all_orders": [], "unlinked_count": 0})
+        cache_manager._cache[cache_manager._generate_cache_key([department])]["timestamp"] -= cache_manager.CACHE_TTL + 1
+
+    fetched_departments = []
+    release_fetch = threading.Event()
+
+    def slow_batches(department_names=None):
+        fetched_departments.append(department_names)
+        release_fetch.wait(5)
+        yield {"orders": [{"page_id": department_names[0], "supplier_name": "仕入先A"}], "unlinked_count": 0}
+
+    monkeypatch.setattr("notion_api.iter_order_data_from_notion", slow_batches)
+    done = threading.Semaphore(0)
+    received = []
+
+    def on_revalidated(result, delta):
+        received.append(result)
+        done.release()
+
+    notion_api.fetch_and_process_orders(department_names=["営業部", "製造部"], on_revalidated=on_revalidated)
+    notion_api.fetch_and_process_orders(department_names=["営業部"], on_revalidated=on_revalidated)
+    release_fetch.set()
+
+    assert done.acquire(timeout=5) and done.acquire(timeout=5)
+    assert sorted(map(tuple, fetched_departments)) == [("営業部",), ("製造部",)]
+    assert sorted(len(result["all_orders"]) for result in received) == [1, 2]
+    cache_manager.clear_cache()
+
+
+def test_multi_department_query_fetches_only_uncached_departments(monkeypatch):
+    """
+    部署ごとのキャッシュを組み合わせ、キャッシュにない部署だけをまとめて1回で取得するかテストする
+    """
+    import cache_manager
+    import notion_api
+
+    cache_manager.clear_cache()
+    orders = [
+        {"page_id": "page1", "supplier_name": "仕入先A", "departments": ["営業部"]},
+        {"page_id": "page2", "supplier_name": "仕入先B", "departments": ["営業部", "製造部"]},
+        {"page_id": "page3", "supplier_name": "仕入先B", "departments": ["製造部"]},
+        {"page_id": "page4", "supplier_name": "仕入先C", "departments": ["品質保証部"]},
+    ]
+    unlinked_orders = [
+        {"page_id": "page8", "departments": ["製造部"]},
+        {"page_id": "page9", "departments": ["営業部", "製造部"]},
+    ]
+    fetched_departments = []
+
+    def fake_batches(department_names=None):
+        fetched_departments.append(department_names)
+        matches = lambda order: any(name in order["departments"] for name in department_names)
+        selected_unlinked = [order for order in unlinked_orders if matches(order)]
+        yield {
+            "orders": [order for order in orders if matches(order)],
+            "unlinked_count": len(selected_unlinked),
+            "unlinked_orders": selected_unlinked,
+        }
+
+    monkeypatch.setattr("notion_api.iter_order_data_from_notion", fake_batches)
+
+    notion_api.fetch_and_process_orders(department_names=["営業部"])
+    received_batches = []
+    result = notion_api.fetch_and_process_orders(
+        department_names=["営業部", "製造部", "品質保証部"], on_batch=received_batches.append
+    )
+
+    # キャッシュにない部署は1回の問い合わせでまとめて取得すること
+    assert fetched_departments == [["営業部"], ["製造部", "品質保証部"]]
+    assert [order["page_id"] for order in result["all_orders"]] == ["page1", "page2", "page3", "page4"]
+    assert [order["page_id"] for order in result["orders_by_supplier"]["仕入先B"]] == ["page2", "page3"]
+    # 仕入先が未設定の注文も、複数の部署に含まれるものは一度だけ数えること
+    assert result["unlinked_count"] == 2
+    # キャッシュ済みの部署の注文も先に通知し、重複する注文は一度だけ通知すること
+    assert [order["page_id"] for batch in received_batches for order in batch["orders"]] == [
+        "page1", "page2", "page3", "page4"
+    ]
+
+    # まとめて取得した結果は部署ごとに分けてキャッシュし、選択を変えても再取得しないこと
+    assert [order["page_id"] for order in notion_api.fetch_and_process_orders(["製造部"])["all_orders"]] == [
+        "page2", "page3"
+    ]
+    assert notion_api.fetch_and_process_orders(["製造部"])["unlinked_page_ids"] == ["page8", "page9"]
+    notion_api.fetch_and_process_orders(department_names=["品質保証部", "営業部"])
+    assert fetched_departments == [["営業部"], ["製造部", "品質保証部"]]
+    cache_manager.clear_cache()
+
+
+def test_incremental_sync_follows_formula_status_changes_without_edits(monkeypatch):
+    """
+    ページを編集せずに要発注（数式）が変わった注文も、次の増分同期で反映されるかテストする
+    """
+    import notion_api
+
+    _reset_sync_state()
+    monkeypatch.setattr(notion_api.config, "PAGE_ID_CONTAINING_DB", "db")
+    monkeypatch.setattr(notion_api.config.AppConstants, "NOTION_MEMBERSHIP_CHECK_INTERVAL", 0)
+    full_filter = {"property": "注文ステータス", "formula": {"string": {"contains": "要発注"}}}
+    # 2回目の同期時点のサーバー側の対象: page1 は数式の結果で対象外になり、page3 は編集なしで対象になった
+    pending_ids = [["page1", "page2"], ["page2", "page3"]]
+
+    class Databases:
+        def query(self, **kwargs):
+            if kwargs.get("filter", {}).get("timestamp") == "last_edited_time":
+                return {"results": [], "has_more": False}
+            return {"results": [_make_order_page(page_id) for page_id in pending_ids.pop(0)], "has_more": False}
+
+    class Pages:
+        retrieved = []
+
+        def retrieve(self, page_id, **kwargs):
+            Pages.retrieved.append(page_id)
+            return _make_order_page(page_id)
+
+    client = type("FakeClient", (), {"databases": Databases(), "pages": Pages()})()
+
+    def sync():
+        return [
+            order["page_id"]
+            for batch in notion_api._iter_order_records(client, full_filter, [], incremental=True)
+            for order in batch
+        ]
+
+    assert sorted(sync()) == ["page1", "page2"]
+    assert sorted(sync()) == ["page2", "page3"]
+    assert Pages.retrieved == ["page3"]
+    _reset_sync_state()
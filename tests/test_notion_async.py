@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import notion_api
+import notion_async
+import rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(notion_api, "NOTION_RATE_LIMITER", rate_limiter.TokenBucket(1000, 1000))
+
+
+class _FakeAsyncDatabases:
+    def __init__(self, batches):
+        self.batches = batches
+        self.events = []
+
+    async def query(self, **kwargs):
+        index = int(kwargs.get("start_cursor") or 0)
+        self.events.append(f"fetch{index}")
+        await asyncio.sleep(0)
+        return {
+            "results": self.batches[index],
+            "has_more": index + 1 < len(self.batches),
+            "next_cursor": str(index + 1),
+        }
+
+
+class _FakeAsyncClient:
+    def __init__(self, databases=None):
+        self.databases = databases
+        self.pages = self
+        self.updated = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def update(self, page_id, properties):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        self.updated.append(page_id)
+
+
+def test_aiter_database_pages_prefetches_next_page():
+    databases = _FakeAsyncDatabases([[{"id": "a"}], [{"id": "b"}], [{"id": "c"}]])
+    client = _FakeAsyncClient(databases)
+
+    async def collect():
+        ids = []
+        async for batch in notion_async._aiter_database_pages(client, "db"):
+            await asyncio.sleep(0)
+            databases.events.append(f"processed{len(ids)}")
+            ids.extend(page["id"] for page in batch)
+        return ids
+
+    assert asyncio.run(collect()) == ["a", "b", "c"]
+    # 1ページ目の処理が終わる前に2ページ目の取得が始まっていること
+    assert databases.events.index("fetch1") < databases.events.index("processed0")
+
+
+def test_update_notion_pages_async_limits_concurrency():
+    loop = notion_async.NotionEventLoop()
+    client = _FakeAsyncClient()
+
+    async def get_client():
+        return client
+
+    loop.get_client = get_client
+    try:
+        loop.run(notion_async.update_notion_pages_async(loop, [f"p{i}" for i in range(5)], concurrency=2), timeout=5)
+    finally:
+        loop.close()
+
+    assert sorted(client.updated) == [f"p{i}" for i in range(5)]
+    assert client.max_in_flight == 2
@@ -0,0 +1,256 @@
+import os
+import smtplib
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import config
+import email_service
+import notion_api
+import outbox
+
+
+class FakeSession:
+    """送信したメッセージを記録し、設定したエラーを順に送出するSMTPセッション"""
+    sent = []
+    errors = []
+
+    def __init__(self, sender_email, password):
+        pass
+
+    def sendmail(self, recipients, message):
+        if FakeSession.errors:
+            raise FakeSession.errors.pop(0)
+        FakeSession.sent.append((recipients, b"".join(message())))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def isolated_outbox(monkeypatch, tmp_path):
+    """AppDataを一時ディレクトリに差し替え、SMTP送信を記録用のセッションに置き換える"""
+    monkeypatch.setenv("APPDATA", str(tmp_path / "appdata"))
+    monkeypatch.setattr(email_service, "SmtpSession", FakeSession)
+    monkeypatch.setattr(email_service, "_get_password", lambda sender_email: ("dummy_password", None))
+    monkeypatch.setattr(config, "load_smtp_limits", lambda smtp_server=None: {"max_connections": 1, "messages_per_minute": 0})
+    FakeSession.sent = []
+    FakeSession.errors = []
+    yield
+
+
+SENDER = {"sender": "sender@example.com", "display_name": "発注者"}
+
+
+def _recording_updater(updated_pages, failing=()):
+    """更新したページを記録し、failing のページは失敗として返す更新関数"""
+    def update(page_ids):
+        updated_pages.extend(page_ids)
+        return notion_api.NotionUpdateResult(
+            [page_id for page_id in page_ids if page_id not in failing],
+            {page_id: "error" for page_id in page_ids if page_id in failing},
+            [],
+        )
+    return update
+
+
+def _enqueue(tmp_path, supplier="仕入先A", page_ids=("p1",)):
+    pdf_path = tmp_path / f"{supplier}.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+    items = [
+        {"page_id": page_id, "supplier_name": supplier, "email": "to@example.com", "sales_contact": "担当者"}
+        for page_id in page_ids
+    ]
+    order = email_service.OrderMail(supplier, items, str(pdf_path), "部署A")
+    return outbox.enqueue_order("account", SENDER, order)
+
+
+def test_enqueued_message_is_sent_and_removed(tmp_path):
+    """記録したメールが保存したメッセージから送信され、送信済みになること"""
+    entry_id = _enqueue(tmp_path, page_ids=("p1", "p2"))
+    entry = outbox.get_entries([entry_id])[0]
+    assert entry.status == outbox.STATUS_PENDING
+    assert entry.recipients == ["to@example.com"]
+    assert [pending.id for pending in outbox.find_pending(["p2"])] == [entry_id]
+
+    results = outbox.send_entries([entry])
+
+    assert results == {entry_id: (outbox.STATUS_SENT, None)}
+    recipients, message = FakeSession.sent[0]
+    assert recipients == ["to@example.com"]
+    assert message.endswith(b"\r\n") and b"JVBERi0xLjQgdGVzdA==" in message  # 添付PDFのbase64
+    assert not os.path.exists(entry.message_path)
+    assert outbox.find_pending(["p1"]) == []
+
+
+def test_transient_error_is_retried_in_background(tmp_path):
+    """一時的なエラーは再試行待ちになり、期限が来たらワーカーが再送してNotionも更新すること"""
+    entry_id = _enqueue(tmp_path)
+    FakeSession.errors = [smtplib.SMTPServerDisconnected("切断")]
+
+    status, _ = outbox.send_entries(outbox.get_entries([entry_id]))[entry_id]
+    entry = outbox.get_entries([entry_id])[0]
+    assert status == outbox.STATUS_PENDING
+    assert entry.attempts == 1 and os.path.exists(entry.message_path)
+
+    updated_pages = []
+    events = []
+    # 期限前は何もしない
+    assert outbox.process_due(_recording_updater(updated_pages), lambda kind, e, error: events.append(kind)) == 0
+
+    outbox.process_due(_recording_updater(updated_pages), lambda kind, e, error: events.append(kind), now=10**10)
+
+    entry = outbox.get_entries([entry_id])[0]
+    assert entry.status == outbox.STATUS_SENT
+    assert entry.notion_status == outbox.NOTION_DONE
+    assert updated_pages == ["p1"]
+    assert events == ["sent", "notion_updated"]
+
+
+def test_permanent_error_is_not_retried(tmp_path):
+    """宛先の拒否などの恒久的なエラーは再試行しないこと"""
+    entry_id = _enqueue(tmp_path)
+    FakeSession.errors = [smtplib.SMTPRecipientsRefused({"to@example.com": (550, b"no such user")})]
+
+    status, _ = outbox.send_entries(outbox.get_entries([entry_id]))[entry_id]
+
+    assert status == outbox.STATUS_FAILED
+    assert outbox.get_entries([entry_id])[0].status == outbox.STATUS_FAILED
+    assert outbox.process_due(_recording_updater([]), now=10**10) == 0
+
+
+def test_missing_password_fails_without_sending(tmp_path, monkeypatch):
+    """OSにパスワードが保存されていない場合は、送信せずに失敗とすること"""
+    entry_id = _enqueue(tmp_path)
+    monkeypatch.setattr(email_service, "_get_password", lambda sender_email: (None, "パスワードがOSに保存されていません。"))
+
+    status, error_message = outbox.send_entries(outbox.get_entries([entry_id]))[entry_id]
+
+    assert status == outbox.STATUS_FAILED
+    assert "パスワード" in error_message
+    assert FakeSession.sent == []
+
+
+def test_authentication_error_cancels_rest_of_sender_group(tmp_path):
+    """SMTP認証に失敗した場合は、同じ送信者の残りのメールも送信せずに失敗とすること"""
+    entry_ids = [_enqueue(tmp_path, supplier=f"仕入先{i}", page_ids=(f"p{i}",)) for i in range(3)]
+    FakeSession.errors = [smtplib.SMTPAuthenticationError(535, b"Authentication failed")]
+
+    results = outbox.send_entries(outbox.get_entries(entry_ids))
+
+    assert [results[entry_id][0] for entry_id in entry_ids] == [outbox.STATUS_FAILED] * 3
+    assert all("SMTP認証" in results[entry_id][1] for entry_id in entry_ids)
+    assert FakeSession.sent == []
+
+
+def test_unknown_delivery_is_not_resent_until_confirmed(tmp_path):
+    """サーバーが受け付けたか分からないメールは自動で再送せず、確認後にのみ送信済み・再送可能にすること"""
+    entry_id = _enqueue(tmp_path)
+    FakeSession.errors = [email_service.DeliveryUnknownError("終端の送信後に切断")]
+
+    status, _ = outbox.send_entries(outbox.get_entries([entry_id]))[entry_id]
+
+    entry = outbox.get_entries([entry_id])[0]
+    assert status == entry.status == outbox.STATUS_UNKNOWN
+    assert os.path.exists(entry.message_path)
+    assert outbox.process_due(_recording_updater([]), now=10**10) == 0
+    assert [pending.id for pending in outbox.find_pending(["p1"])] == [entry_id]
+
+    outbox.resolve_unknown([entry], delivered=True)
+    assert outbox.get_entries([entry_id])[0].status == outbox.STATUS_SENT
+    assert not os.path.exists(entry.message_path)
+    assert outbox.find_pending(["p1"]) == []
+
+
+def test_mail_being_sent_when_app_stopped_is_not_resent(tmp_path):
+    """送信中に終了したメールは、次回起動時に再送せず送信結果が不明として扱うこと"""
+    entry_id = _enqueue(tmp_path)
+    outbox.mark_sending(outbox.get_entries([entry_id])[0])
+
+    assert outbox.resume() == (0, 0, 1)
+    assert outbox.get_entries([entry_id])[0].status == outbox.STATUS_UNKNOWN
+    assert outbox.process_due(_recording_updater([]), now=10**10) == 0
+    assert FakeSession.sent == []
+
+
+def test_failed_notion_update_is_kept_until_it_succeeds(tmp_path):
+    """Notionの更新に失敗した場合も更新待ちのまま残り、後で再試行されること"""
+    entry_id = _enqueue(tmp_path)
+    outbox.send_entries(outbox.get_entries([entry_id]))
+
+    def failing_update(page_ids):
+        raise RuntimeError("Notion API error")
+
+    assert outbox.update_notion([entry_id], failing_update).failed == {"p1": "Notion API error"}
+    assert outbox.get_entries([entry_id])[0].notion_status == outbox.NOTION_PENDING
+
+    updated_pages = []
+    outbox.process_due(_recording_updater(updated_pages), now=10**10)
+    assert updated_pages == ["p1"]
+    assert outbox.get_entries([entry_id])[0].notion_status == outbox.NOTION_DONE
+
+
+def test_resume_picks_up_work_left_by_previous_run(tmp_path):
+    """前回起動時に送信中だったメールと、更新の確認前に終了した注文を再開すること"""
+    unsent_id = _enqueue(tmp_path, supplier="仕入先A", page_ids=("p1",))
+    sent_id = _enqueue(tmp_path, supplier="仕入先B", page_ids=("p2",))
+    outbox.send_entries(outbox.get_entries([sent_id]))
+
+    assert outbox.resume() == (1, 1, 0)
+
+    with closing(sqlite3.connect(outbox._get_db_path())) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM outbox WHERE claimed = 1").fetchone()[0] == 0
+
+    updated_pages = []
+    outbox.process_due(_recording_updater(updated_pages))
+    assert outbox.get_entries([unsent_id])[0].status == outbox.STATUS_SENT
+    assert sorted(updated_pages) == ["p1", "p2"]
+
+
+def test_only_failed_pages_are_retried(tmp_path):
+    """一括更新で失敗したページだけが再試行され、全ページ更新できた時点で更新済みになること"""
+    entry_id = _enqueue(tmp_path, page_ids=("p1", "p2", "p3"))
+    outbox.send_entries(outbox.get_entries([entry_id]))
+
+    result = outbox.update_notion([entry_id], _recording_updater([], failing=("p2",)))
+    assert result.failed == {"p2": "error"}
+    assert outbox.get_entries([entry_id])[0].notion_status == outbox.NOTION_PENDING
+
+    retried = []
+    # 期限前は再試行しない
+    assert outbox.process_due(_recording_updater(retried)) == 0
+    outbox.process_due(_recording_updater(retried), now=10**10)
+    assert retried == ["p2"]
+    assert outbox.get_entries([entry_id])[0].notion_status == outbox.NOTION_DONE
+
+
+def test_update_does_not_take_over_pages_claimed_by_worker(tmp_path):
+    """ワーカーが処理中の更新待ちのページは重ねて更新せず、失敗回数も残すこと"""
+    entry_id = _enqueue(tmp_path, page_ids=("p1", "p2"))
+    outbox.send_entries(outbox.get_entries([entry_id]))
+    outbox.request_notion_update([entry_id])
+    with closing(sqlite3.connect(outbox._get_db_path())) as conn, conn:
+        conn.execute("UPDATE notion_updates SET claimed = 1, attempts = 2 WHERE page_id = 'p1'")
+
+    updated_pages = []
+    result = outbox.update_notion([entry_id], _recording_updater(updated_pages))
+
+    assert updated_pages == ["p2"] and result.updated == ["p2"]
+    with closing(sqlite3.connect(outbox._get_db_path())) as conn:
+        assert conn.execute("SELECT page_id, attempts, claimed FROM notion_updates").fetchall() == [("p1", 2, 1)]
+
+
+def test_update_raises_when_pages_cannot_be_queued(tmp_path, monkeypatch):
+    """更新待ちを記録できない場合は、更新しないまま成功として扱わずに例外を送出すること"""
+    entry_id = _enqueue(tmp_path)
+    outbox.send_entries(outbox.get_entries([entry_id]))
+
+    def broken_queue(conn, entries):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(outbox, "_queue_notion_pages", broken_queue)
+    updated_pages = []
+    with pytest.raises(sqlite3.Error):
+        outbox.update_notion([entry_id], _recording_updater(updated_pages))
+    assert updated_pages == []
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import config
+import pdf_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    """AppDataを一時ディレクトリに差し替える"""
+    monkeypatch.setenv("APPDATA", str(tmp_path / "appdata"))
+    yield
+
+
+def _items(quantity="1"):
+    return [{"page_id": "p1", "db_part_number": "A-1", "maker_name": "メーカー", "quantity": quantity, "remarks": "", "sales_contact": "担当者"}]
+
+
+SENDER = {"name": "発注者", "email": "sender@example.com", "guidance_number": "123"}
+
+
+def test_key_ignores_unrelated_fields_and_tracks_content():
+    """PDFに影響しない項目はキーに含めず、注文内容・部署の変更はキーを変えること"""
+    base = pdf_cache.make_key("仕入先A", _items(), SENDER, "部署A")
+    items_with_other_page = [dict(_items()[0], page_id="p9")]
+
+    assert pdf_cache.make_key("仕入先A", items_with_other_page, SENDER, "部署A") == base
+    assert pdf_cache.make_key("仕入先A", _items("2"), SENDER, "部署A") != base
+    assert pdf_cache.make_key("仕入先A", _items(), SENDER, "部署B") != base
+
+
+def test_stored_pdf_is_restored_under_a_new_name(tmp_path):
+    """保存したPDFが、通常の生成と同じ命名規則で保存先にコピーされること"""
+    save_dir = tmp_path / "out"
+    key = pdf_cache.make_key("仕入先A", _items(), SENDER, "部署A")
+    assert pdf_cache.restore(key, "仕入先A", "部署A", str(save_dir)) is None
+
+    rendered = tmp_path / "rendered.pdf"
+    rendered.write_bytes(b"%PDF-1.4 test")
+    pdf_cache.store(key, str(rendered))
+
+    restored = pdf_cache.restore(key, "仕入先A", "部署A", str(save_dir))
+    assert restored is not None
+    assert os.path.dirname(restored) == str(save_dir / "部署A")
+    assert restored.endswith("_仕入先A_注文書.pdf")
+    with open(restored, "rb") as f:
+        assert f.read() == b"%PDF-1.4 test"
+
+
+def test_evict_removes_least_recently_used_first(tmp_path, monkeypatch):
+    """上限を超えた場合、最終利用が古いものから削除されること"""
+    monkeypatch.setattr(config.AppConstants, "PDF_CACHE_MAX_BYTES", 10**9)
+    rendered = tmp_path / "rendered.pdf"
+    rendered.write_bytes(b"x" * 100)
+    for index, key in enumerate(["old", "new"]):
+        pdf_cache.store(key, str(rendered))
+        os.utime(pdf_cache._entry_path(key), (1000 + index, 1000 + index))
+
+    assert pdf_cache.evict(150) == 1
+    assert not os.path.exists(pdf_cache._entry_path("old"))
+    assert os.path.exists(pdf_cache._entry_path("new"))
@@ -1,7 +1,13 @@
+import io
+import os
 import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
 import pdf_generator
 import config
 
@@ -50,6 +56,41 @@ class TestPdfGenerator(unittest.TestCase):
             )
         self.assertIsNone(result)
 
+    def test_render_context_is_built_once_and_shared(self):
+        first = pdf_generator.get_render_context()
+        second = pdf_generator.get_render_context()
+
+        self.assertIs(first, second)
+        self.assertIs(pdf_generator.get_custom_styles(), first.styles)
+        self.assertEqual(first.styles['Normal_J'].fontName, first.font_name)
+
+    def test_template_subset_is_built_once_and_shared_between_documents(self):
+        """定型文のサブセットは事前に1回だけ作成し、可変部分の文字だけをPDFごとに作成する"""
+        vera_path = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+        font = pdf_generator.TemplateSubsetTTFont("VeraTemplateTest", vera_path, "注文書 éàü")
+        make_subset = MagicMock(side_effect=font._make_subset)
+        font._make_subset = make_subset
+        font.precompute_template_subset()
+        pdfmetrics.registerFont(font)
+        self.assertEqual(make_subset.call_count, 1)
+
+        original_make_subset = font.face.makeSubset
+        built_subsets = []
+        font.face.makeSubset = lambda subset: built_subsets.append(list(subset)) or original_make_subset(subset)
+        for text in ("éà Ø", "ü ÿ"):
+            pdf_canvas = canvas.Canvas(io.BytesIO())
+            pdf_canvas.setFont("VeraTemplateTest", 12)
+            pdf_canvas.drawString(10, 10, text)
+            pdf_canvas.save()
+
+        template_subset = list(next(iter(font._template_subsets)))
+        self.assertEqual(len(built_subsets), 4)
+        self.assertEqual(built_subsets[0], template_subset)
+        self.assertEqual(built_subsets[2], template_subset)
+        self.assertEqual(built_subsets[1], [0, ord("Ø")])
+        self.assertEqual(built_subsets[3], [0, ord("ÿ")])
+        self.assertEqual(make_subset.call_count, 3)
+
 
 if __name__ == '__main__':
     unittest.main()
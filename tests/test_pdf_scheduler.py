@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from pdf_scheduler import PdfProcessPool, PdfRenderScheduler
+
+
+class TestPdfRenderScheduler(unittest.TestCase):
+
+    def test_rerenders_with_latest_orders_when_updated_during_render(self):
+        """生成中に注文が追加された仕入先は、完了後に最新の注文で生成し直す"""
+        first_render_started = threading.Event()
+        release_first_render = threading.Event()
+        rendered = []
+
+        def render(supplier, items):
+            rendered.append((supplier, [item["page_id"] for item in items]))
+            if len(rendered) == 1:
+                first_render_started.set()
+                release_first_render.wait(5)
+            return f"{supplier}-{len(items)}.pdf", None
+
+        results = {}
+        scheduler = PdfRenderScheduler(render, results=results, max_workers=2)
+        try:
+            scheduler.submit("仕入先A", [{"page_id": "p1"}])
+            self.assertTrue(first_render_started.wait(5))
+            scheduler.submit("仕入先A", [{"page_id": "p1"}, {"page_id": "p2"}])
+            release_first_render.set()
+            self.assertTrue(scheduler.wait(5))
+        finally:
+            scheduler.close()
+
+        self.assertEqual(rendered, [("仕入先A", ["p1"]), ("仕入先A", ["p1", "p2"])])
+        self.assertEqual(results, {"仕入先A": "仕入先A-2.pdf"})
+
+    def test_same_orders_are_not_rendered_twice(self):
+        """注文が変わっていない仕入先は再生成しない"""
+        rendered = []
+
+        def render(supplier, items):
+            rendered.append(supplier)
+            return None, "テンプレートエラー"
+
+        scheduler = PdfRenderScheduler(render)
+        try:
+            self.assertTrue(scheduler.submit("仕入先B", [{"page_id": "p3"}]))
+            scheduler.wait(5)
+            self.assertFalse(scheduler.submit("仕入先B", [{"page_id": "p3"}]))
+            scheduler.wait(5)
+        finally:
+            scheduler.close()
+
+        self.assertEqual(rendered, ["仕入先B"])
+        self.assertEqual(scheduler.errors, {"仕入先B": "テンプレートエラー"})
+
+    def test_changed_sales_contact_is_rendered_again(self):
+        """PDFに記載する営業担当者名が変わった仕入先は再生成する"""
+        rendered = []
+
+        def render(supplier, items):
+            rendered.append(items[0]["sales_contact"])
+            return f"{supplier}.pdf", None
+
+        scheduler = PdfRenderScheduler(render)
+        try:
+            self.assertTrue(scheduler.submit("仕入先B", [{"page_id": "p3", "sales_contact": "担当者A"}]))
+            scheduler.wait(5)
+            self.assertTrue(scheduler.submit("仕入先B", [{"page_id": "p3", "sales_contact": "担当者B"}]))
+            scheduler.wait(5)
+        finally:
+            scheduler.close()
+
+        self.assertEqual(rendered, ["担当者A", "担当者B"])
+
+
+class TestPdfProcessPool(unittest.TestCase):
+
+    def test_renders_pdf_in_worker_process(self):
+        """ワーカープロセスで注文書PDFを生成し、パスを返す"""
+        items = [{"page_id": "p1", "db_part_number": "PN-001", "maker_name": "MakerA", "quantity": 2,
+                  "remarks": "", "sales_contact": "担当者"}]
+        sender_info = {"name": "Sender", "email": "sender@example.com", "guidance_number": ""}
+
+        pool = PdfProcessPool(processes=1)
+        try:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                pdf_path, error_message = pool.render("仕入先C", items, sender_info, None, tmpdir)
+                self.assertIsNone(error_message)
+                self.assertTrue(pdf_path.startswith(tmpdir))
+                self.assertTrue(os.path.getsize(pdf_path) > 0)
+        finally:
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+
+from rate_limiter import SlidingWindowLimiter, TokenBucket
+
+
+class _FakeClock:
+    """sleep で時間が進む疑似時計"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_is_immediate_then_rate_limited(self):
+        """バースト分は待たずに通し、それ以降は rate に従って待機させる"""
+        clock = _FakeClock()
+        bucket = TokenBucket(rate=3.0, capacity=3, clock=clock.time, sleep=clock.sleep)
+
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+        bucket.acquire()
+        self.assertEqual(len(clock.sleeps), 1)
+        self.assertAlmostEqual(clock.sleeps[0], 1 / 3)
+
+    def test_sustained_throughput_matches_rate(self):
+        """60回のリクエストがおよそ (60 - バースト) / rate 秒で完了する"""
+        clock = _FakeClock()
+        bucket = TokenBucket(rate=3.0, capacity=3, clock=clock.time, sleep=clock.sleep)
+
+        for _ in range(60):
+            bucket.acquire()
+
+        self.assertAlmostEqual(clock.now, (60 - 3) / 3.0, places=6)
+
+    def test_reservations_queue_up_for_concurrent_callers(self):
+        """トークンを使い切った後の予約は、後の呼び出しほど長く待つ"""
+        clock = _FakeClock()
+        bucket = TokenBucket(rate=2.0, capacity=1, clock=clock.time, sleep=clock.sleep)
+
+        waits = [bucket.reserve() for _ in range(3)]
+
+        self.assertEqual(waits, [0.0, 0.5, 1.0])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0, capacity=1)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, capacity=0)
+
+
+class TestSlidingWindowLimiter(unittest.TestCase):
+
+    def test_never_exceeds_limit_within_any_window(self):
+        """どの period 秒間を切り取っても limit 回を超えない"""
+        clock = _FakeClock()
+        limiter = SlidingWindowLimiter(limit=30, period=60.0, clock=clock.time, sleep=clock.sleep)
+        sent_at = []
+        for _ in range(75):
+            limiter.acquire()
+            sent_at.append(clock.now)
+
+        self.assertEqual(sent_at[:30], [0.0] * 30)
+        self.assertEqual(sent_at[30], 60.0)
+        for index in range(len(sent_at) - 30):
+            self.assertGreaterEqual(sent_at[index + 30] - sent_at[index], 60.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+import httpx
+from notion_client.errors import APIErrorCode, APIResponseError
+
+from retry_policy import RetryExhaustedError, RetryPolicy
+
+
+def _api_error(status, headers=None):
+    response = httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", "https://api.notion.com"))
+    return APIResponseError(response, "error", APIErrorCode.RateLimited)
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=30.0, sleep=self.sleeps.append, rand=lambda: 0.5)
+
+    def test_rate_limited_request_waits_for_retry_after(self):
+        """429はRetry-Afterの秒数（＋わずかなジッター）だけ待って再試行する"""
+        responses = [_api_error(429, {"Retry-After": "7"}), "ok"]
+
+        def func():
+            result = responses.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        self.assertEqual(self.policy.call(func), "ok")
+        self.assertEqual(self.sleeps, [7.5])
+
+    def test_server_errors_use_exponential_backoff(self):
+        """5xxは指数バックオフ（フルジッター）で再試行し、上限到達で型付きの例外を送出する"""
+        def func():
+            raise _api_error(503)
+
+        with self.assertRaises(RetryExhaustedError) as ctx:
+            self.policy.call(func)
+
+        self.assertEqual(ctx.exception.attempts, 3)
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+
+    def test_network_errors_are_retried(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) == 1:
+                raise httpx.ConnectError("connection refused")
+            return "ok"
+
+        self.assertEqual(self.policy.call(func), "ok")
+        self.assertEqual(len(calls), 2)
+
+    def test_client_errors_are_not_retried(self):
+        """429以外の4xxは再試行せず、元の例外をそのまま送出する"""
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise _api_error(400)
+
+        with self.assertRaises(APIResponseError):
+            self.policy.call(func)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.sleeps, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
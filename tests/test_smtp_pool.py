@@ -0,0 +1,70 @@
+import threading
+import unittest
+
+from smtp_pool import SmtpSenderPool
+
+
+class _FakeSession:
+
+    def __init__(self, created):
+        created.append(self)
+        self.sent = []
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestSmtpSenderPool(unittest.TestCase):
+
+    def test_sessions_are_reused_and_limited_to_pool_size(self):
+        """セッションはワーカーごとに1本だけ作成して使い回し、終了時に閉じる"""
+        created = []
+        with SmtpSenderPool(lambda: _FakeSession(created), size=2) as pool:
+            futures = [pool.submit(lambda session, i=i: session.sent.append(i)) for i in range(10)]
+        for future in futures:
+            future.result()
+
+        self.assertLessEqual(len(created), 2)
+        self.assertEqual(sorted(i for session in created for i in session.sent), list(range(10)))
+        self.assertTrue(all(session.closed for session in created))
+
+    def test_cancel_pending_skips_queued_jobs(self):
+        """送信前の処理を取り消すと、キューに残った分は実行されない"""
+        started = threading.Event()
+        release = threading.Event()
+        executed = []
+
+        def slow_job(session):
+            started.set()
+            release.wait(5)
+            executed.append("slow")
+
+        with SmtpSenderPool(lambda: _FakeSession([]), size=1) as pool:
+            first = pool.submit(slow_job)
+            self.assertTrue(started.wait(5))
+            queued = [pool.submit(lambda session: executed.append("queued")) for _ in range(3)]
+            self.assertEqual(pool.cancel_pending(), 3)
+            release.set()
+
+        first.result()
+        self.assertEqual(executed, ["slow"])
+        self.assertTrue(all(future.cancelled() for future in queued))
+
+    def test_governor_is_acquired_before_each_send(self):
+        """送信のたびにサーバー共通のリミッターで待機する"""
+        acquired = []
+
+        class _Governor:
+            def acquire(self):
+                acquired.append(True)
+
+        with SmtpSenderPool(lambda: _FakeSession([]), size=3, governor=_Governor()) as pool:
+            for _ in range(5):
+                pool.submit(lambda session: None)
+
+        self.assertEqual(len(acquired), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
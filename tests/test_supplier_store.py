@@ -0,0 +1,51 @@
+import pytest
+
+import supplier_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_store(monkeypatch, tmp_path):
+    """AppDataを一時ディレクトリに差し替え、メモリ上の状態も初期化する"""
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    monkeypatch.setattr(supplier_store, "_records", {})
+    monkeypatch.setattr(supplier_store, "_loaded", False)
+    yield
+
+
+def _record(page_id, name, edited="2025-01-01T00:00:00.000Z"):
+    return {
+        "page_id": page_id,
+        "supplier_name": name,
+        "sales_contact": "担当者",
+        "email": f"{page_id}@example.com",
+        "email_cc": "",
+        "last_edited_time": edited,
+    }
+
+
+def test_saved_suppliers_survive_reload(monkeypatch):
+    """保存した仕入先と同期状態が、再起動後（メモリ初期化後）も読み込めること"""
+    supplier_store.save_suppliers([_record("s1", "仕入先A"), _record("s2", "仕入先B")], "2025-01-01T00:00:00+00:00", replace_all=True)
+
+    monkeypatch.setattr(supplier_store, "_records", {})
+    monkeypatch.setattr(supplier_store, "_loaded", False)
+
+    assert supplier_store.load() == 2
+    assert supplier_store.get_supplier("s1")["supplier_name"] == "仕入先A"
+    watermark, full_synced_at = supplier_store.get_sync_state()
+    assert watermark == "2025-01-01T00:00:00+00:00"
+    assert full_synced_at > 0
+
+
+def test_incremental_save_upserts_and_full_save_replaces():
+    """差分保存は既存レコードを更新・追加し、全件保存は古いレコードを取り除くこと"""
+    supplier_store.save_suppliers([_record("s1", "仕入先A"), _record("s2", "仕入先B")], "w1", replace_all=True)
+    supplier_store.save_suppliers([_record("s2", "仕入先B(新)"), _record("s3", "仕入先C")], "w2")
+
+    suppliers = supplier_store.get_all_suppliers()
+    assert sorted(suppliers) == ["s1", "s2", "s3"]
+    assert suppliers["s2"]["supplier_name"] == "仕入先B(新)"
+
+    supplier_store.save_suppliers([_record("s3", "仕入先C")], "w3", replace_all=True)
+    assert sorted(supplier_store.get_all_suppliers()) == ["s3"]
+    assert supplier_store.get_sync_state()[0] == "w3"
@@ -1,7 +1,8 @@
 """中央のデータ表示領域 (仕入先リストと注文データ) のUI"""
+import bisect
 import tkinter as tk
 from tkinter import ttk
-from typing import TYPE_CHECKING, Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, Iterable, List, Optional
 
 if TYPE_CHECKING:
     from controllers.app_controller import Application
@@ -30,6 +31,8 @@ class MiddlePane(ttk.PanedWindow):
         supplier_vsb = ttk.Scrollbar(supplier_pane, orient="vertical", command=self.supplier_listbox.yview, style="Vertical.TScrollbar")
         self.supplier_listbox.config(yscrollcommand=supplier_vsb.set)
         supplier_vsb.pack(side=tk.RIGHT, fill=tk.Y, pady=1)
+        # 表示中の仕入先名（行の並び順と同じ名前順）。Tk は数値に見える値を int で返すため、行の値ではなくこちらで比較する
+        self.supplier_names: List[str] = []
 
         # --- 注文データテーブル ---
         columns = ("maker", "part_num", "qty")
@@ -42,10 +45,29 @@ class MiddlePane(ttk.PanedWindow):
         vsb.pack(side=tk.RIGHT, fill=tk.Y, pady=1); hsb.pack(side=tk.BOTTOM, fill=tk.X, padx=1); self.tree.pack(fill=tk.BOTH, expand=True, padx=1, pady=(1,0))
 
     def update_supplier_list(self, data: List[Dict[str, Any]]) -> None:
-        """仕入先リストを更新する"""
-        self.supplier_listbox.delete(*self.supplier_listbox.get_children())
-        suppliers = sorted(list(set(i["supplier_name"] for i in data)))
-        for s in suppliers: self.supplier_listbox.insert('', tk.END, values=(s,))
+        """仕入先リストを更新する（表示済みの行と選択状態は残し、差分だけを反映する）"""
+        suppliers = set(i["supplier_name"] for i in data)
+        for iid, name in zip(self.supplier_listbox.get_children(), self.supplier_names):
+            if name not in suppliers:
+                self.supplier_listbox.delete(iid)
+        self.supplier_names = [name for name in self.supplier_names if name in suppliers]
+        self.add_suppliers(suppliers)
+
+    def add_suppliers(self, supplier_names: Iterable[str]) -> None:
+        """未表示の仕入先を、並び順（名前順）を保つ位置に挿入する"""
+        for name in sorted(set(supplier_names)):
+            index = bisect.bisect_left(self.supplier_names, name)
+            if index < len(self.supplier_names) and self.supplier_names[index] == name:
+                continue
+            self.supplier_listbox.insert('', index, values=(name,))
+            self.supplier_names.insert(index, name)
+
+    def get_selected_supplier(self) -> Optional[str]:
+        """選択中の仕入先名を返す"""
+        selected_iids = self.supplier_listbox.selection()
+        if not selected_iids:
+            return None
+        return self.supplier_names[self.supplier_listbox.index(selected_iids[0])]
 
     def update_table_for_supplier(self, supplier_name: str) -> None:
         """指定された仕入先の注文データをテーブルに表示する"""
@@ -56,14 +78,15 @@ class MiddlePane(ttk.PanedWindow):
 
     def mark_supplier_as_sent(self, supplier: str) -> None:
         """仕入先を送信済みとしてマークする"""
-        for iid in self.supplier_listbox.get_children():
-            if self.supplier_listbox.item(iid, 'values')[0] == supplier:
-                self.supplier_listbox.item(iid, tags=('sent',))
-                self.supplier_listbox.selection_remove(iid)
-                break
+        index = bisect.bisect_left(self.supplier_names, supplier)
+        if index < len(self.supplier_names) and self.supplier_names[index] == supplier:
+            iid = self.supplier_listbox.get_children()[index]
+            self.supplier_listbox.item(iid, tags=('sent',))
+            self.supplier_listbox.selection_remove(iid)
 
     def clear_displays(self) -> None:
         """表示をクリアする"""
         self.tree.delete(*self.tree.get_children())
         self.supplier_listbox.delete(*self.supplier_listbox.get_children())
+        self.supplier_names = []
 